@@ -1,13 +1,44 @@
 import sys
-import subprocess
-import json
 import os
+import multiprocessing
+import sqlite3
+import threading
+import time
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QLineEdit, QFileDialog,
-    QVBoxLayout, QTabWidget, QTextEdit, QHBoxLayout, QMessageBox
+    QVBoxLayout, QTabWidget, QTextEdit, QHBoxLayout, QMessageBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QSpinBox, QCheckBox,
+    QProgressBar, QComboBox
 )
 
-CONFIG_FILE = "config.json"
+import conversao
+import historico
+import lasheader
+import previa
+import progresso
+import servidor
+from conversao import DEFAULT_MAX_JOBS
+
+# Altura da prévia na aba de conversão, em pixels
+PREVIEW_HEIGHT = 240
+# Execuções mostradas na aba de histórico
+HISTORY_ROWS = 100
+
+
+def short_duration(seconds):
+    """Durações curtas com décimos, que o format_duration arredondaria para 0s"""
+    return f"{seconds:.1f}s" if seconds < 60 else progresso.format_duration(seconds)
+
+
+class JobSignals(QObject):
+    """Sinais emitidos pelas threads de execução para a interface"""
+    output = pyqtSignal(str)
+    started = pyqtSignal(int)
+    finished = pyqtSignal(int, bool)
+    progress = pyqtSignal(int, object)
+    preview = pyqtSignal(str, object)
 
 
 class PotreeApp(QWidget):
@@ -20,13 +51,22 @@ class PotreeApp(QWidget):
         self.tabs = QTabWidget()
         self.tab_convert = QWidget()
         self.tab_config = QWidget()
+        self.tab_history = QWidget()
 
         self.tabs.addTab(self.tab_convert, "Conversão")
         self.tabs.addTab(self.tab_config, "Propriedades")
+        self.tabs.addTab(self.tab_history, "Histórico")
 
         # Criar abas
         self.create_convert_tab()
         self.create_config_tab()
+        self.create_history_tab()
+
+        # Progresso do job em andamento
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        self.progress_label = QLabel("")
 
         # Terminal (logs)
         self.terminal = QTextEdit()
@@ -35,15 +75,58 @@ class PotreeApp(QWidget):
         # Layout principal
         layout = QVBoxLayout()
         layout.addWidget(self.tabs)
+        layout.addWidget(self.progress_label)
+        layout.addWidget(self.progress_bar)
         layout.addWidget(QLabel("Terminal de execução:"))
         layout.addWidget(self.terminal)
         self.setLayout(layout)
 
+        # Execução em segundo plano
+        # Os callbacks rodam nas threads do engine; os sinais levam para a thread da interface
+        self.signals = JobSignals()
+        self.signals.output.connect(self.log)
+        self.signals.started.connect(self.job_started)
+        self.signals.finished.connect(self.job_finished)
+        self.signals.progress.connect(self.job_progress)
+        self.signals.preview.connect(self.show_preview)
+        self.engine = conversao.ConversionEngine(
+            on_output=self.signals.output.emit,
+            on_started=self.signals.started.emit,
+            on_finished=self.signals.finished.emit,
+            on_progress=self.signals.progress.emit,
+        )
+        self.jobs = {}
+        self.server = None
+        # Relatórios rodam à parte para não esperar atrás das conversões
+        self.report_engine = conversao.ConversionEngine(on_output=self.signals.output.emit)
+
         # Carregar configurações salvas
         self.config = self.load_config()
+        try:
+            self.cache = conversao.open_cache(self.config)
+        except (OSError, sqlite3.Error) as e:
+            # Sem o cache as conversões funcionam normalmente, só não são reaproveitadas
+            self.log(f"Cache desativado: {e}")
+            self.cache = None
+        try:
+            self.engine.history = conversao.open_history(self.config)
+        except (OSError, sqlite3.Error) as e:
+            self.log(f"Histórico desativado: {e}")
+            self.engine.history = None
+        self.refresh_history()
         self.input_lastools.setText(self.config.get("lastools", ""))
         self.input_potree.setText(self.config.get("potree", ""))
         self.input_output.setText(self.config.get("output_dir", ""))
+        self.input_max_jobs.setValue(self.config.get("max_jobs", DEFAULT_MAX_JOBS))
+        self.engine.set_max_workers(self.input_max_jobs.value())
+        self.input_tiles.setValue(self.config.get("tiles", 1))
+        self.check_merge_tiles.setChecked(self.config.get("merge_tiles", True))
+        self.check_in_place.setChecked(self.config.get("repair_in_place", False))
+        self.check_scratch.setChecked(self.config.get("stream_repair", False))
+        self.check_shared_libs.setChecked(self.config.get("shared_libs", False))
+        self.check_precompress.setChecked(self.config.get("precompress", False))
+        self.input_preset.addItems(list(conversao.presets(self.config)))
+        self.input_preset.setCurrentText(self.config.get("preset", conversao.DEFAULT_PRESET))
 
     def create_convert_tab(self):
         layout = QVBoxLayout()
@@ -51,13 +134,30 @@ class PotreeApp(QWidget):
         # Arquivo LAS/LAZ
         hlayout_file = QHBoxLayout()
         self.label_file = QLabel("Arquivo LAS/LAZ:")
-        self.add_info_icon(self.label_file, "Selecione o arquivo .las ou .laz que será convertido.")
+        self.add_info_icon(self.label_file, "Selecione o arquivo .las ou .laz que será convertido. "
+                                            "Uma pasta é convertida numa única nuvem com todos os arquivos dela.")
         self.input_file = QLineEdit()
+        self.input_file.editingFinished.connect(self.show_file_info)
         self.btn_file = QPushButton("Procurar")
         self.btn_file.clicked.connect(self.select_file)
         hlayout_file.addWidget(self.label_file)
         hlayout_file.addWidget(self.input_file)
         hlayout_file.addWidget(self.btn_file)
+        self.btn_report = QPushButton("Relatório")
+        self.btn_report.clicked.connect(self.report_file)
+        hlayout_file.addWidget(self.btn_report)
+        self.btn_preview = QPushButton("Prévia")
+        self.btn_preview.clicked.connect(self.preview_file)
+        hlayout_file.addWidget(self.btn_preview)
+
+        # Dados do arquivo lidos do cabeçalho
+        self.label_file_info = QLabel("")
+        self.label_file_info.setWordWrap(True)
+
+        # Prévia em planta (elevação sombreada pela densidade)
+        self.label_preview = QLabel("")
+        self.label_preview.setAlignment(Qt.AlignCenter)
+        self.label_preview.setVisible(False)
 
         # Pasta de saída
         hlayout_folder = QHBoxLayout()
@@ -69,6 +169,9 @@ class PotreeApp(QWidget):
         hlayout_folder.addWidget(self.label_folder)
         hlayout_folder.addWidget(self.input_output)
         hlayout_folder.addWidget(self.btn_folder)
+        self.btn_serve = QPushButton("Servir")
+        self.btn_serve.clicked.connect(self.toggle_server)
+        hlayout_folder.addWidget(self.btn_serve)
 
         # Nome do projeto
         hlayout_name = QHBoxLayout()
@@ -77,15 +180,51 @@ class PotreeApp(QWidget):
         self.input_name = QLineEdit()
         hlayout_name.addWidget(self.label_name)
         hlayout_name.addWidget(self.input_name)
+        self.label_preset = QLabel("Predefinição:")
+        self.label_preset.setToolTip("Método de amostragem, encoding e atributos passados ao PotreeConverter "
+                                     "(predefinições em config.json, chave \"presets\").")
+        self.input_preset = QComboBox()
+        hlayout_name.addWidget(self.label_preset)
+        hlayout_name.addWidget(self.input_preset)
 
         # Botão converter
         self.btn_convert = QPushButton("Converter")
         self.btn_convert.clicked.connect(self.convert_file)
 
+        # Fila de conversão em lote
+        hlayout_queue = QHBoxLayout()
+        self.btn_add_files = QPushButton("Adicionar arquivos")
+        self.btn_add_files.clicked.connect(self.add_files)
+        self.btn_add_folder = QPushButton("Adicionar pasta")
+        self.btn_add_folder.clicked.connect(self.add_folder)
+        self.btn_clear_queue = QPushButton("Limpar fila")
+        self.btn_clear_queue.clicked.connect(self.clear_queue)
+        self.btn_convert_queue = QPushButton("Converter fila")
+        self.btn_convert_queue.clicked.connect(self.convert_queue)
+        self.btn_convert_queue_one = QPushButton("Converter fila numa nuvem")
+        self.btn_convert_queue_one.setToolTip("Todos os arquivos pendentes viram uma única nuvem com o nome do projeto, "
+                                              "numa só chamada do PotreeConverter.")
+        self.btn_convert_queue_one.clicked.connect(self.convert_queue_as_one)
+        hlayout_queue.addWidget(self.btn_add_files)
+        hlayout_queue.addWidget(self.btn_add_folder)
+        hlayout_queue.addWidget(self.btn_clear_queue)
+        hlayout_queue.addWidget(self.btn_convert_queue)
+        hlayout_queue.addWidget(self.btn_convert_queue_one)
+
+        self.queue_table = QTableWidget(0, 3)
+        self.queue_table.setHorizontalHeaderLabels(["Arquivo", "Projeto", "Status"])
+        self.queue_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.queue_table.verticalHeader().setVisible(False)
+
         layout.addLayout(hlayout_file)
+        layout.addWidget(self.label_file_info)
+        layout.addWidget(self.label_preview)
         layout.addLayout(hlayout_folder)
         layout.addLayout(hlayout_name)
         layout.addWidget(self.btn_convert)
+        layout.addWidget(QLabel("Fila de conversão:"))
+        layout.addLayout(hlayout_queue)
+        layout.addWidget(self.queue_table)
 
         self.tab_convert.setLayout(layout)
 
@@ -114,16 +253,108 @@ class PotreeApp(QWidget):
         hlayout_potree.addWidget(self.input_potree)
         hlayout_potree.addWidget(self.btn_potree)
 
+        # Conversões simultâneas
+        hlayout_max_jobs = QHBoxLayout()
+        self.label_max_jobs = QLabel("Conversões simultâneas:")
+        self.add_info_icon(self.label_max_jobs, "Quantos arquivos da fila são convertidos ao mesmo tempo.")
+        self.input_max_jobs = QSpinBox()
+        self.input_max_jobs.setRange(1, os.cpu_count() or 1)
+        hlayout_max_jobs.addWidget(self.label_max_jobs)
+        hlayout_max_jobs.addWidget(self.input_max_jobs)
+        hlayout_max_jobs.addStretch()
+
+        # Conversão em blocos espaciais
+        hlayout_tiles = QHBoxLayout()
+        self.label_tiles = QLabel("Blocos por arquivo:")
+        self.add_info_icon(self.label_tiles, "Divide cada arquivo LAS em blocos espaciais convertidos em paralelo "
+                                             "e gera uma página que carrega todos. Os blocos são células da "
+                                             "octree: o número é arredondado para baixo para 8, 64 ou 512 "
+                                             "(de 2 a 7, 8 blocos). 1 = sem divisão.")
+        self.input_tiles = QSpinBox()
+        self.input_tiles.setRange(1, 512)
+        hlayout_tiles.addWidget(self.label_tiles)
+        hlayout_tiles.addWidget(self.input_tiles)
+        self.check_merge_tiles = QCheckBox("Juntar os blocos numa única nuvem")
+        hlayout_tiles.addWidget(self.check_merge_tiles)
+        hlayout_tiles.addStretch()
+
+        # Correção do bbox no arquivo original
+        self.check_in_place = QCheckBox("Corrigir bounding box no próprio arquivo (sem criar _fixed.las)")
+
+        # Intermediário do las2las em área temporária
+        self.check_scratch = QCheckBox("Gravar o arquivo corrigido como LAZ temporário (apagado após a conversão)")
+
+        # Libs do Potree publicadas uma vez por pasta de saída
+        self.check_shared_libs = QCheckBox("Compartilhar as libs do Potree entre os projetos da pasta de saída")
+
+        # Versões .br/.gz dos arquivos da página
+        self.check_precompress = QCheckBox("Gravar versões comprimidas (.br/.gz) dos arquivos da página")
+
         # Botão salvar configs
         self.btn_save = QPushButton("Salvar Configurações")
         self.btn_save.clicked.connect(self.save_config)
 
         layout.addLayout(hlayout_lastools)
         layout.addLayout(hlayout_potree)
+        layout.addLayout(hlayout_max_jobs)
+        layout.addLayout(hlayout_tiles)
+        layout.addWidget(self.check_in_place)
+        layout.addWidget(self.check_scratch)
+        layout.addWidget(self.check_shared_libs)
+        layout.addWidget(self.check_precompress)
         layout.addWidget(self.btn_save)
 
         self.tab_config.setLayout(layout)
 
+    def create_history_tab(self):
+        layout = QVBoxLayout()
+
+        # Execuções mais recentes primeiro
+        self.history_table = QTableWidget(0, 7)
+        self.history_table.setHorizontalHeaderLabels(
+            ["Data", "Projeto", "Status", "Pontos", "Tempo", "CPU", "Pico de memória"])
+        self.history_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.history_table.verticalHeader().setVisible(False)
+
+        # Percentis por etapa e regressões de vazão
+        self.history_report = QTextEdit()
+        self.history_report.setReadOnly(True)
+
+        self.btn_refresh_history = QPushButton("Atualizar")
+        self.btn_refresh_history.clicked.connect(self.refresh_history)
+
+        layout.addWidget(self.history_table)
+        layout.addWidget(self.history_report)
+        layout.addWidget(self.btn_refresh_history)
+        self.tab_history.setLayout(layout)
+
+    def refresh_history(self):
+        history = self.engine.history
+        if history is None:
+            self.history_report.setPlainText("Histórico desativado (\"history\": false no config.json "
+                                             "ou banco inacessível; veja o terminal).")
+            return
+        try:
+            runs = history.runs(HISTORY_ROWS)
+            report = historico.report(history)
+        except sqlite3.Error as e:
+            self.history_report.setPlainText(f"Erro ao ler o histórico: {e}")
+            return
+        self.history_table.setRowCount(len(runs))
+        for row, run in enumerate(runs):
+            values = [
+                time.strftime("%d/%m/%Y %H:%M", time.localtime(run["started"])),
+                run["project_name"],
+                "Concluído" if run["ok"] else "Erro",
+                f"{run['input_points']:,}".replace(",", "."),
+                short_duration(run["wall"]),
+                short_duration(run["cpu"]) if run["cpu"] is not None else "-",
+                f"{run['peak_rss'] / 1024 ** 2:.0f} MB" if run["peak_rss"] else "-",
+            ]
+            for column, value in enumerate(values):
+                self.history_table.setItem(row, column, QTableWidgetItem(value))
+        self.history_report.setPlainText("\n".join(report))
+
     def add_info_icon(self, text, message):
         """Retorna um QWidget com label + botão de info"""
         label = QLabel(text)
@@ -144,12 +375,83 @@ class PotreeApp(QWidget):
         file, _ = QFileDialog.getOpenFileName(self, "Selecionar LAS/LAZ", "", "LAS/LAZ Files (*.las *.laz)")
         if file:
             self.input_file.setText(file)
+            self.show_file_info()
+
+    def show_file_info(self):
+        las_file = self.input_file.text()
+        if not las_file:
+            self.label_file_info.setText("")
+            return
+        if os.path.isdir(las_file):
+            count = len(conversao.find_inputs([las_file]))
+            self.label_file_info.setText(f"Pasta com {count} arquivos LAS/LAZ, convertidos numa única nuvem")
+            return
+        try:
+            header = lasheader.read_header(las_file)
+        except (OSError, ValueError) as e:
+            self.label_file_info.setText(f"Não foi possível ler o cabeçalho: {e}")
+            return
+        self.label_file_info.setText("\n".join(lasheader.describe(header)))
 
     def select_folder(self):
         dir = QFileDialog.getExistingDirectory(self, "Selecione a pasta de saída")
         if dir:
             self.input_output.setText(dir)
 
+    def toggle_server(self):
+        """Liga/desliga o servidor HTTP embutido na pasta de saída"""
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
+            self.btn_serve.setText("Servir")
+            self.log("Servidor parado.")
+            return
+
+        output_dir = self.input_output.text()
+        if not output_dir:
+            self.log("Erro: Selecione uma pasta de saída para servir!")
+            return
+        self.server = servidor.ServerThread(output_dir, port=self.config.get("server_port", servidor.DEFAULT_PORT),
+                                            log=self.signals.output.emit)
+        self.server.start()
+        self.server.ready.wait()
+        if self.server.error is not None:
+            self.log(f"Erro ao iniciar o servidor: {self.server.error}")
+            self.server = None
+            return
+        self.btn_serve.setText("Parar")
+
+    def add_files(self):
+        files, _ = QFileDialog.getOpenFileNames(self, "Selecionar LAS/LAZ", "", "LAS/LAZ Files (*.las *.laz)")
+        for file in files:
+            self.add_to_queue(file)
+
+    def add_folder(self):
+        dir = QFileDialog.getExistingDirectory(self, "Selecione a pasta com arquivos LAS/LAZ")
+        if not dir:
+            return
+        for las_file in conversao.find_inputs([dir]):
+            self.add_to_queue(las_file)
+
+    def add_to_queue(self, las_file):
+        project_name = os.path.splitext(os.path.basename(las_file))[0]
+        row = self.queue_table.rowCount()
+        self.queue_table.insertRow(row)
+        self.queue_table.setItem(row, 0, QTableWidgetItem(las_file))
+        self.queue_table.setItem(row, 1, QTableWidgetItem(project_name))
+        self.queue_table.setItem(row, 2, QTableWidgetItem("Pendente"))
+
+    def clear_queue(self):
+        # Linhas já enviadas continuam rodando; só some o que ainda não foi enviado
+        for row in reversed(range(self.queue_table.rowCount())):
+            if self.queue_table.item(row, 2).text() in ("Pendente", "Concluído", "Erro"):
+                self.queue_table.removeRow(row)
+
+    def set_status(self, row_item, status):
+        row = self.queue_table.row(row_item)
+        if row >= 0:
+            self.queue_table.item(row, 2).setText(status)
+
     def select_lastools(self):
         file, _ = QFileDialog.getOpenFileName(self, "Selecionar LAStools", "", "Executável (*.exe)")
         if file:
@@ -163,48 +465,190 @@ class PotreeApp(QWidget):
     def log(self, message):
         self.terminal.append(message)
 
+    def report_file(self):
+        las_file = self.input_file.text()
+        if not las_file:
+            self.log("Erro: Selecione um arquivo LAS para o relatório!")
+            return
+        self.report_engine.submit(os.path.basename(las_file), conversao.report_job(las_file))
+
+    def preview_file(self):
+        las_file = self.input_file.text()
+        if not las_file:
+            self.log("Erro: Selecione um arquivo LAS/LAZ para a prévia!")
+            return
+        self.btn_preview.setEnabled(False)
+        las_tools = self.input_lastools.text()
+
+        # Em thread separada: um LAZ depende do las2las. Qualquer falha volta
+        # pelo sinal; uma exceção solta aqui deixaria o botão desabilitado
+        def run():
+            result = None
+            try:
+                result = previa.preview(las_file, las_tools)
+            except Exception as e:
+                result = e
+            finally:
+                self.signals.preview.emit(las_file, result)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_preview(self, las_file, result):
+        try:
+            if result is None:
+                self.log(f"Prévia de {os.path.basename(las_file)} interrompida")
+                return
+            if isinstance(result, Exception):
+                self.log(f"Erro na prévia de {os.path.basename(las_file)}: {type(result).__name__}: {result}")
+                return
+            height, width, _ = result.image.shape
+            image = QImage(result.image.data, width, height, 3 * width, QImage.Format_RGB888).copy()
+            self.label_preview.setPixmap(QPixmap.fromImage(image).scaled(
+                PREVIEW_HEIGHT * 2, PREVIEW_HEIGHT, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            self.label_preview.setToolTip(result.describe())
+            self.label_preview.setVisible(True)
+            self.log(f"{os.path.basename(las_file)}: {result.describe()}")
+        finally:
+            self.btn_preview.setEnabled(True)
+
     def convert_file(self):
         las_file = self.input_file.text()
         output_dir = self.input_output.text()
         project_name = self.input_name.text()
-        las_tools = self.input_lastools.text()
-        potree = self.input_potree.text()
 
-        if not (las_file and output_dir and project_name and las_tools and potree):
+        if not (las_file and output_dir and project_name and self.tools_configured()):
             self.log("Erro: Preencha todos os campos e configure os executáveis!")
             return
 
-        fixed_file = las_file.replace(".las", "_fixed.las").replace(".laz", "_fixed.las")
+        if os.path.isdir(las_file):
+            # Uma pasta vira uma única nuvem com todos os arquivos dela
+            las_file = conversao.find_inputs([las_file])
+            if not las_file:
+                self.log("Erro: Nenhum arquivo LAS/LAZ na pasta!")
+                return
+        self.submit_conversion(las_file, output_dir, project_name)
 
-        try:
-            self.log("Corrigindo arquivo LAS/LAZ...")
-            subprocess.run([las_tools, "-i", las_file, "-o", fixed_file], check=True)
+    def convert_queue(self):
+        output_dir = self.input_output.text()
+        if not (output_dir and self.tools_configured()):
+            self.log("Erro: Escolha a pasta de saída e configure os executáveis!")
+            return
 
-            self.log("Convertendo para Potree...")
-            subprocess.run([potree, fixed_file, "-o", output_dir, "--generate-page", project_name], check=True)
+        for row in range(self.queue_table.rowCount()):
+            if self.queue_table.item(row, 2).text() not in ("Pendente", "Erro"):
+                continue
+            las_file = self.queue_table.item(row, 0).text()
+            project_name = self.queue_table.item(row, 1).text()
+            self.queue_table.item(row, 2).setText("Na fila")
+            self.submit_conversion(las_file, output_dir, project_name, [self.queue_table.item(row, 0)])
 
-            self.log(f"Conversão concluída! Página: {output_dir}\\{project_name}.html")
-        except subprocess.CalledProcessError as e:
-            self.log(f"Erro na execução: {e}")
+    def convert_queue_as_one(self):
+        """Converte os arquivos pendentes da fila numa única nuvem, com o nome do projeto"""
+        output_dir = self.input_output.text()
+        project_name = self.input_name.text()
+        if not (output_dir and project_name and self.tools_configured()):
+            self.log("Erro: Escolha a pasta de saída, o nome do projeto e configure os executáveis!")
+            return
+
+        rows = [row for row in range(self.queue_table.rowCount())
+                if self.queue_table.item(row, 2).text() in ("Pendente", "Erro")]
+        if not rows:
+            self.log("Erro: Nenhum arquivo pendente na fila!")
+            return
+        for row in rows:
+            self.queue_table.item(row, 2).setText("Na fila")
+        las_files = [self.queue_table.item(row, 0).text() for row in rows]
+        self.submit_conversion(las_files, output_dir, project_name, [self.queue_table.item(row, 0) for row in rows])
+
+    def tools_configured(self):
+        return bool(self.input_lastools.text() and self.input_potree.text())
+
+    def submit_conversion(self, las_file, output_dir, project_name, row_items=()):
+        config = dict(
+            self.config,
+            lastools=self.input_lastools.text(),
+            potree=self.input_potree.text(),
+            repair_in_place=self.check_in_place.isChecked(),
+            stream_repair=self.check_scratch.isChecked(),
+            tiles=self.input_tiles.value(),
+            merge_tiles=self.check_merge_tiles.isChecked(),
+            shared_libs=self.check_shared_libs.isChecked(),
+            precompress=self.check_precompress.isChecked(),
+            preset=self.input_preset.currentText(),
+        )
+        steps = conversao.conversion_job(las_file, output_dir, project_name, config, self.cache)
+        job_id = self.engine.submit(project_name, steps, *conversao.input_totals(las_file),
+                                    details=conversao.run_details(las_file, config))
+        self.jobs[job_id] = (project_name, f"{output_dir}\\{project_name}.html", list(row_items))
+        self.log(f"Conversão de {project_name} adicionada à fila.")
+
+    def job_started(self, job_id):
+        _, _, row_items = self.jobs[job_id]
+        for row_item in row_items:
+            self.set_status(row_item, "Convertendo")
+
+    def job_progress(self, job_id, snapshot):
+        if job_id not in self.jobs:
+            return
+        project_name, _, row_items = self.jobs[job_id]
+        if snapshot["percent"] is None:
+            # Etapa sem progresso conhecido (verificação, las2las): barra indeterminada
+            self.progress_bar.setRange(0, 0)
+        else:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(int(snapshot["percent"]))
+        self.progress_label.setText(f"{project_name}: {progresso.describe(snapshot)}")
+        if snapshot["percent"] is not None:
+            for row_item in row_items:
+                self.set_status(row_item, f"Convertendo {int(snapshot['percent'])}%")
+
+    def job_finished(self, job_id, ok):
+        project_name, page, row_items = self.jobs.pop(job_id)
+        if not self.jobs:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(100 if ok else 0)
+            self.progress_label.setText("")
+        for row_item in row_items:
+            self.set_status(row_item, "Concluído" if ok else "Erro")
+        if ok:
+            self.log(f"Conversão concluída! Página: {page}")
+            if self.server is not None:
+                self.log(f"No servidor: http://{self.server.server.host}:{self.server.server.port}/{project_name}.html")
+        else:
+            self.log(f"Conversão de {project_name} falhou.")
+        self.refresh_history()
+
+    def closeEvent(self, event):
+        self.engine.shutdown()
+        self.report_engine.shutdown()
+        if self.server is not None:
+            self.server.stop()
+        super().closeEvent(event)
 
     def save_config(self):
-        self.config = {
+        self.config.update({
             "lastools": self.input_lastools.text(),
             "potree": self.input_potree.text(),
-            "output_dir": self.input_output.text()
-        }
-        with open(CONFIG_FILE, "w") as f:
-            json.dump(self.config, f)
+            "output_dir": self.input_output.text(),
+            "max_jobs": self.input_max_jobs.value(),
+            "repair_in_place": self.check_in_place.isChecked(),
+            "stream_repair": self.check_scratch.isChecked(),
+            "tiles": self.input_tiles.value(),
+            "merge_tiles": self.check_merge_tiles.isChecked(),
+            "shared_libs": self.check_shared_libs.isChecked(),
+            "precompress": self.check_precompress.isChecked(),
+            "preset": self.input_preset.currentText()
+        })
+        self.engine.set_max_workers(self.input_max_jobs.value())
+        conversao.save_config(self.config)
         self.log("Configurações salvas com sucesso!")
 
     def load_config(self):
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, "r") as f:
-                return json.load(f)
-        return {}
+        return conversao.load_config()
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = PotreeApp()
     window.show()
@@ -0,0 +1,92 @@
+"""Teste de carga do servidor estático simulando o visualizador do Potree.
+
+Abre várias conexões keep-alive simultâneas e pede faixas aleatórias de um
+arquivo (por padrão o octree.bin de uma nuvem), como o Potree faz ao
+carregar os nós. Funciona contra qualquer servidor HTTP, então serve também
+para comparar com o xampp:
+
+    python bench_servidor.py http://127.0.0.1:8000/pointclouds/projeto/octree.bin -c 200 -n 50
+"""
+import argparse
+import asyncio
+import random
+import time
+import urllib.parse
+
+
+async def request(reader, writer, host, path, start, stop):
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\nRange: bytes={start}-{stop - 1}\r\n\r\n".encode("latin-1")
+    )
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+    return status, length
+
+
+async def client(url, size, requests, range_size, latencies, errors):
+    parts = urllib.parse.urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80, limit=1 << 20)
+    received = 0
+    try:
+        for _ in range(requests):
+            start = random.randrange(0, max(1, size - range_size))
+            began = time.perf_counter()
+            status, length = await request(reader, writer, parts.netloc, parts.path, start, min(size, start + range_size))
+            latencies.append(time.perf_counter() - began)
+            if status != 206:
+                errors.append(status)
+            received += length
+    finally:
+        writer.close()
+    return received
+
+
+async def file_size(url):
+    parts = urllib.parse.urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    writer.write(f"HEAD {parts.path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+    head = await reader.readuntil(b"\r\n\r\n")
+    writer.close()
+    for line in head.split(b"\r\n")[1:]:
+        if line.lower().startswith(b"content-length:"):
+            return int(line.split(b":", 1)[1])
+    raise ValueError(f"{url}: servidor não informou o tamanho")
+
+
+async def run(url, connections, requests, range_size):
+    size = await file_size(url)
+    latencies = []
+    errors = []
+    began = time.perf_counter()
+    received = await asyncio.gather(*(client(url, size, requests, range_size, latencies, errors)
+                                      for _ in range(connections)))
+    elapsed = time.perf_counter() - began
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"{connections} conexões x {requests} requisições de {range_size} bytes em {elapsed:.2f}s")
+    print(f"{total / elapsed:.0f} req/s, {sum(received) / 1e6 / elapsed:.1f} MB/s")
+    print(f"latência p50 {latencies[total // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[min(total - 1, total * 99 // 100)] * 1000:.1f} ms")
+    if errors:
+        print(f"{len(errors)} respostas sem 206 (ex.: {errors[0]})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench_servidor", description="Teste de carga com requisições Range")
+    parser.add_argument("url", help="URL de um arquivo grande, por exemplo o octree.bin de uma nuvem")
+    parser.add_argument("-c", "--connections", type=int, default=200, help="conexões simultâneas")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="requisições por conexão")
+    parser.add_argument("--range-size", type=int, default=64 * 1024, help="bytes por requisição")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.url, args.connections, args.requests, args.range_size))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
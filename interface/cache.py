@@ -0,0 +1,139 @@
+"""Cache das saídas do PotreeConverter indexado pelo conteúdo da entrada."""
+import hashlib
+import os
+import shutil
+import sqlite3
+import time
+from contextlib import closing
+
+from lasrepair import clone_file
+
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_GB = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    project_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def copy_tree(src, dst):
+    """Copia a árvore usando reflink por arquivo quando disponível"""
+    for root, _, files in os.walk(src):
+        target = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            clone_file(os.path.join(root, name), os.path.join(target, name))
+
+
+class ConversionCache:
+    """Guarda cópias das saídas em ``<base>/cache`` com índice em ``<base>/cache.sqlite``.
+
+    A chave combina o hash do conteúdo das entradas, o hash do executável do
+    PotreeConverter e os parâmetros da conversão. Quando o tamanho total passa
+    de ``max_bytes``, as entradas usadas há mais tempo são apagadas.
+    """
+
+    def __init__(self, base_dir, max_bytes=DEFAULT_MAX_GB * 1024 ** 3):
+        self.root = os.path.join(base_dir, "cache")
+        self.index = os.path.join(base_dir, "cache.sqlite")
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        with closing(self.connect()) as db, db:
+            db.executescript(SCHEMA)
+
+    def connect(self):
+        # Uma conexão por operação: o cache é usado por várias threads de conversão
+        return sqlite3.connect(self.index, timeout=30)
+
+    def hash_file(self, path):
+        """Hash blake2b em blocos; reaproveitado enquanto tamanho e mtime não mudam"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with closing(self.connect()) as db:
+            row = db.execute("SELECT size, mtime_ns, digest FROM hashes WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+
+        with closing(self.connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)",
+                       (path, stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+
+    def key(self, inputs, potree, flags):
+        key = hashlib.blake2b(digest_size=20)
+        for path in inputs:
+            key.update(self.hash_file(path).encode())
+        key.update(self.hash_file(potree).encode())
+        for flag in flags:
+            key.update(b"\0" + flag.encode())
+        return key.hexdigest()
+
+    def restore(self, key, output_dir, project_name, libs_dir=None):
+        """Copia a saída guardada para ``output_dir``; retorna False se não houver entrada"""
+        entry = os.path.join(self.root, key)
+        with closing(self.connect()) as db, db:
+            row = db.execute("SELECT project_name FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or not os.path.isdir(entry):
+                return False
+            db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+
+        cloud_dir = os.path.join(output_dir, "pointclouds", project_name)
+        if os.path.isdir(cloud_dir):
+            shutil.rmtree(cloud_dir)
+        copy_tree(os.path.join(entry, "pointclouds", row[0]), cloud_dir)
+        clone_file(os.path.join(entry, f"{row[0]}.html"), os.path.join(output_dir, f"{project_name}.html"))
+
+        # A página depende das libs do Potree ao lado dela
+        if libs_dir and os.path.isdir(libs_dir) and not os.path.isdir(os.path.join(output_dir, "libs")):
+            shutil.copytree(libs_dir, os.path.join(output_dir, "libs"))
+        return True
+
+    def store(self, key, output_dir, project_name):
+        entry = os.path.join(self.root, key)
+        if os.path.isdir(entry):
+            shutil.rmtree(entry)
+        copy_tree(os.path.join(output_dir, "pointclouds", project_name),
+                  os.path.join(entry, "pointclouds", project_name))
+        clone_file(os.path.join(output_dir, f"{project_name}.html"), os.path.join(entry, f"{project_name}.html"))
+
+        now = time.time()
+        with closing(self.connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                       (key, project_name, directory_size(entry), now, now))
+        self.evict()
+
+    def evict(self):
+        with closing(self.connect()) as db, db:
+            rows = db.execute("SELECT key, size FROM entries ORDER BY last_used DESC").fetchall()
+            total = 0
+            for key, size in rows:
+                total += size
+                if total > self.max_bytes:
+                    shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+                    db.execute("DELETE FROM entries WHERE key = ?", (key,))
@@ -0,0 +1,161 @@
+"""Versões pré-comprimidas (.gz e .br) dos arquivos de texto das páginas do Potree.
+
+Os arquivos comprimidos ficam ao lado do original (potree.js.gz,
+potree.js.br) e são servidos por negociação de conteúdo, pelo servidor
+embutido ou pelo Apache do xampp com o .htaccess gerado aqui, sem gastar
+CPU comprimindo a cada requisição.
+
+O Brotli é opcional (pacote ``brotli``); sem ele só o .gz é gerado.
+
+O Apache não tem como conferir se o .gz/.br é mais novo que o original, então
+toda conversão apaga antes as versões comprimidas da nuvem e da página que
+vai reescrever (``discard``); com ``precompress`` elas são geradas de novo.
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# octree.bin e hierarchy.bin ficam de fora: o Potree sempre os pede com
+# Range, e faixas precisam ser servidas sem compressão
+EXTENSIONS = (".js", ".mjs", ".css", ".json", ".html", ".svg", ".wasm")
+# Abaixo disso o ganho não compensa mais um arquivo
+MIN_SIZE = 1024
+# Só guarda a versão comprimida se ela economizar pelo menos 10%
+MAX_RATIO = 0.9
+# Sufixos de todas as versões, inclusive .br gerados numa máquina com brotli
+SUFFIXES = (".br", ".gz")
+
+HTACCESS = """# Gerado pelo PotreeConverte: serve os .br/.gz pré-comprimidos (mod_rewrite e mod_headers)
+<IfModule mod_rewrite.c>
+    RewriteEngine On
+    RewriteCond %{HTTP:Range} ^$
+    RewriteCond %{HTTP:Accept-Encoding} br
+    RewriteCond %{REQUEST_FILENAME}.br -f
+    RewriteRule ^(.+)$ $1.br [L]
+    RewriteCond %{HTTP:Range} ^$
+    RewriteCond %{HTTP:Accept-Encoding} gzip
+    RewriteCond %{REQUEST_FILENAME}.gz -f
+    RewriteRule ^(.+)$ $1.gz [L]
+</IfModule>
+<FilesMatch "\\.(js|mjs|css|json|html|svg|wasm)\\.br$">
+    RemoveType .br
+    Header set Content-Encoding br
+    Header append Vary Accept-Encoding
+</FilesMatch>
+<FilesMatch "\\.(js|mjs|css|json|html|svg|wasm)\\.gz$">
+    RemoveType .gz
+    Header set Content-Encoding gzip
+    Header append Vary Accept-Encoding
+</FilesMatch>
+<IfModule mod_mime.c>
+    AddType text/javascript .js.br .js.gz .mjs.br .mjs.gz
+    AddType text/css .css.br .css.gz
+    AddType application/json .json.br .json.gz
+    AddType text/html .html.br .html.gz
+    AddType image/svg+xml .svg.br .svg.gz
+    AddType application/wasm .wasm.br .wasm.gz
+</IfModule>
+"""
+
+
+def compressors():
+    """(encoding, sufixo, função) disponíveis, do mais eficiente para o menos"""
+    available = []
+    if brotli is not None:
+        available.append(("br", ".br", lambda data: brotli.compress(data, quality=11)))
+    available.append(("gzip", ".gz", lambda data: gzip.compress(data, 9, mtime=0)))
+    return available
+
+
+def is_fresh(sibling, source_stat):
+    try:
+        return os.stat(sibling).st_mtime_ns >= source_stat.st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def compress_file(path):
+    """Gera as versões comprimidas de ``path`` que estiverem desatualizadas; retorna (bytes antes, depois)"""
+    stat = os.stat(path)
+    if stat.st_size < MIN_SIZE:
+        return 0, 0
+    data = None
+    smallest = stat.st_size
+    for _, suffix, compress in compressors():
+        sibling = path + suffix
+        if is_fresh(sibling, stat):
+            smallest = min(smallest, os.path.getsize(sibling))
+            continue
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        compressed = compress(data)
+        if len(compressed) > stat.st_size * MAX_RATIO:
+            if os.path.exists(sibling):
+                os.remove(sibling)
+            continue
+        with open(sibling, "wb") as f:
+            f.write(compressed)
+        smallest = min(smallest, len(compressed))
+    return stat.st_size, smallest
+
+
+def discard(paths):
+    """Apaga as versões comprimidas de ``paths`` (arquivos, ou pastas inteiras); retorna quantas"""
+    siblings = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                siblings += [os.path.join(root, name) for name in names
+                             if name.endswith(SUFFIXES) and os.path.splitext(name)[0] in names]
+        else:
+            siblings += [path + suffix for suffix in SUFFIXES if os.path.exists(path + suffix)]
+    for sibling in siblings:
+        os.remove(sibling)
+    return len(siblings)
+
+
+def text_files(path):
+    """``path`` se for um arquivo de texto, ou os arquivos de texto da pasta (recursivo)"""
+    if not os.path.isdir(path):
+        if path.lower().endswith(EXTENSIONS) and os.path.isfile(path):
+            yield path
+        return
+    for root, _, names in os.walk(path):
+        for name in names:
+            if name.lower().endswith(EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def compress_paths(paths):
+    """Comprime os arquivos de texto de ``paths`` (arquivos, ou pastas inteiras); retorna (arquivos, bytes antes, depois)"""
+    count = before = after = 0
+    for path in paths:
+        for name in text_files(path):
+            original, compressed = compress_file(name)
+            if original:
+                count += 1
+                before += original
+                after += compressed
+    return count, before, after
+
+
+def install_htaccess(folder):
+    """Grava o .htaccess de negociação em ``folder``, se ainda não houver um"""
+    htaccess = os.path.join(folder, ".htaccess")
+    # Não sobrescreve um .htaccess do usuário
+    if not os.path.exists(htaccess):
+        with open(htaccess, "w") as f:
+            f.write(HTACCESS)
+
+
+def precompress(folder, write_htaccess=True):
+    """Comprime os arquivos de texto de ``folder`` (recursivo); retorna (arquivos, bytes antes, depois)"""
+    totals = compress_paths([folder])
+    if write_htaccess:
+        install_htaccess(folder)
+    return totals
@@ -0,0 +1,1194 @@
+"""Núcleo da conversão LAS/LAZ -> Potree, sem dependência do Qt.
+
+Usado pela interface (PotreeConverte.py) e pela linha de comando:
+
+    python -m conversao converter arquivo.laz -o C:/xampp/htdocs/potree -n projeto
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import cache
+import compactar
+import extrair
+import hierarquia
+import historico
+import lasheader
+import laspoints
+import lasrepair
+import lasstats
+import mesclar
+import pagina
+import progresso
+import servidor
+import tiles
+import validar
+import vigia
+
+CONFIG_FILE = "config.json"
+DEFAULT_MAX_JOBS = 2
+# Abaixo do limite de 32767 caracteres da linha de comando do Windows
+MAX_COMMAND_LINE = 30000
+
+# Predefinições de conversão; o config.json pode acrescentar ou substituir em "presets".
+# "method" e "encoding" vão direto para o PotreeConverter; "attributes" lista os
+# atributos gravados e "drop_attributes" os que saem da lista do arquivo.
+DEFAULT_PRESET = "padrão"
+UNUSED_ATTRIBUTES = ["gps-time", "scan angle", "scan angle rank", "point source id", "user data"]
+PRESETS = {
+    DEFAULT_PRESET: {},
+    "rápido": {"method": "random"},
+    "leve": {"drop_attributes": UNUSED_ATTRIBUTES},
+    "compacto": {"encoding": "BROTLI", "drop_attributes": UNUSED_ATTRIBUTES},
+}
+
+
+def load_config(path=CONFIG_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def save_config(config, path=CONFIG_FILE):
+    with open(path, "w") as f:
+        json.dump(config, f)
+
+
+def open_cache(config, config_file=CONFIG_FILE):
+    """Cache de conversões ao lado do config.json, ou None se desativado"""
+    if not config.get("cache", True):
+        return None
+    return cache.ConversionCache(
+        os.path.dirname(os.path.abspath(config_file)),
+        config.get("cache_max_gb", cache.DEFAULT_MAX_GB) * 1024 ** 3,
+    )
+
+
+def open_history(config, config_file=CONFIG_FILE):
+    """Histórico de execuções ao lado do config.json, ou None se desativado"""
+    if not config.get("history", True):
+        return None
+    return historico.RunHistory(os.path.join(os.path.dirname(os.path.abspath(config_file)), historico.HISTORY_FILE))
+
+
+# Opções do config que entram no histórico de cada execução
+RUN_OPTIONS = ("preset", "tiles", "merge_tiles", "shared_libs", "repair_mode", "repair_in_place",
+               "stream_repair", "precompress")
+
+
+def run_details(las_file, config):
+    """Entradas e opções de uma conversão, guardadas no histórico"""
+    inputs = [las_file] if isinstance(las_file, str) else list(las_file)
+    details = {"inputs": [os.path.abspath(path) for path in inputs],
+               "options": {key: config[key] for key in RUN_OPTIONS if key in config}}
+    try:
+        stat = os.stat(config["potree"])
+        # Tamanho e data do executável identificam a versão do PotreeConverter
+        details["potree"] = {"path": config["potree"], "size": stat.st_size, "mtime": stat.st_mtime}
+    except (KeyError, OSError):
+        pass
+    return details
+
+
+def fixed_file_name(las_file):
+    # splitext: com .LAS/.LAZ em maiúsculas um replace devolveria o próprio arquivo de entrada
+    return os.path.splitext(las_file)[0] + "_fixed.las"
+
+
+def scratch_directory(las_file, config, needed):
+    """Pasta de rascunho com espaço para ``needed`` bytes.
+
+    Com ``scratch_dir`` igual a "auto" usa o tmpfs (/dev/shm) quando há
+    espaço, senão a pasta temporária do sistema; sem espaço em nenhuma,
+    a pasta do próprio arquivo. Com ``scratch_beside_input`` desligado (o
+    vigia, que não pode escrever na pasta vigiada) o último recurso é a
+    pasta temporária do sistema.
+    """
+    choice = config.get("scratch_dir", "auto")
+    candidates = [choice]
+    if choice == "auto":
+        candidates = ["/dev/shm", tempfile.gettempdir()]
+    for directory in candidates:
+        if os.path.isdir(directory) and os.access(directory, os.W_OK) \
+                and shutil.disk_usage(directory).free > needed * 1.2:
+            return directory
+    if not config.get("scratch_beside_input", True):
+        return tempfile.gettempdir()
+    return os.path.dirname(os.path.abspath(las_file))
+
+
+def scratch_file(las_file, config, suffix="_fixed.laz"):
+    """Arquivo temporário para a saída do las2las no modo de rascunho.
+
+    Por padrão a saída é LAZ: o PotreeConverter lê LAZ direto e o
+    intermediário fica ~5x menor.
+    """
+    # Estimativa do arquivo gerado: LAS comprime ~5x em LAZ
+    needed = os.path.getsize(las_file)
+    input_laz = las_file.lower().endswith(".laz")
+    output_laz = suffix.lower().endswith(".laz")
+    if output_laz and not input_laz:
+        needed //= 4
+    elif input_laz and not output_laz:
+        needed *= 5
+
+    stem = os.path.splitext(os.path.basename(las_file))[0]
+    fd, path = tempfile.mkstemp(prefix=f"{stem}_", suffix=suffix, dir=scratch_directory(las_file, config, needed))
+    os.close(fd)
+    return path
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def presets(config):
+    """Predefinições embutidas mais as do config.json"""
+    return dict(PRESETS, **config.get("presets", {}))
+
+
+def converter_attributes(las_file):
+    """Atributos que o PotreeConverter grava para o formato de ponto do arquivo (sem a posição)"""
+    header = lasheader.read_header(las_file)
+    point_format = header.point_format
+    if point_format >= 6:
+        names = ["intensity", "return number", "number of returns", "classification flags", "classification",
+                 "user data", "scan angle", "point source id", "gps-time"]
+    else:
+        names = ["intensity", "return number", "number of returns", "classification", "scan angle rank",
+                 "user data", "point source id"]
+        if point_format in (1, 3, 4, 5):
+            names.append("gps-time")
+    if point_format in (2, 3, 5, 7, 8, 10):
+        names.append("rgb")
+    return names + [name for name, _ in laspoints.extra_bytes_fields(las_file, header)]
+
+
+def preset_flags(las_files, preset):
+    """Argumentos do PotreeConverter para a predefinição ``preset`` (dict)"""
+    flags = []
+    if preset.get("method"):
+        flags += ["--method", preset["method"]]
+    if preset.get("encoding"):
+        flags += ["--encoding", preset["encoding"]]
+    attributes = preset.get("attributes")
+    if not attributes and preset.get("drop_attributes"):
+        # Com vários arquivos, só os atributos presentes em todos
+        present = [converter_attributes(las_file) for las_file in las_files]
+        attributes = [name for name in present[0]
+                      if name not in preset["drop_attributes"] and all(name in names for names in present)]
+    if attributes:
+        flags += ["--attributes"] + list(attributes)
+    return flags
+
+
+def libs_dir(potree):
+    """Pasta de libs do Potree que acompanha o executável do PotreeConverter"""
+    return os.path.join(os.path.dirname(potree), "resources", "page_template", "libs")
+
+
+def input_totals(las_file):
+    """(bytes, pontos) da entrada (um arquivo ou uma lista), usados no cálculo de vazão"""
+    if not isinstance(las_file, str):
+        totals = [input_totals(path) for path in las_file]
+        return sum(size for size, _ in totals), sum(points for _, points in totals)
+    try:
+        return os.path.getsize(las_file), lasheader.read_header(las_file).point_count
+    except (OSError, ValueError):
+        return 0, 0
+
+
+def check_inputs(las_files):
+    """Problemas de cada arquivo (``lasheader.check_file``), verificados em paralelo em processos"""
+    if len(las_files) == 1:
+        return [lasheader.check_file(las_files[0])]
+    with ProcessPoolExecutor(min(len(las_files), os.cpu_count() or 1)) as pool:
+        return list(pool.map(lasheader.check_file, las_files))
+
+
+def patch_files(pairs, log):
+    """Corrige o bbox no cabeçalho de cada (origem, destino), em paralelo em processos"""
+    if len(pairs) == 1:
+        results = [lasrepair.patch_bounds(*pairs[0])]
+    else:
+        with ProcessPoolExecutor(min(len(pairs), os.cpu_count() or 1)) as pool:
+            results = list(pool.map(lasrepair.patch_bounds, *zip(*pairs)))
+    for (src, _), (lo, hi) in zip(pairs, results):
+        prefix = f"{os.path.basename(src)}: " if len(pairs) > 1 else ""
+        log(f"{prefix}Novo bounding box: min {lo}, max {hi}")
+
+
+def converter_inputs(sources, workdirs, log):
+    """(entradas do PotreeConverter, etapas que as preparam).
+
+    Se a linha de comando ficar longa demais, o conversor recebe uma pasta
+    com links para os arquivos, preenchida depois das correções. A pasta é
+    criada na primeira de ``workdirs`` que aceitar escrita; no mesmo volume
+    das entradas os links são hardlinks, sem cópia.
+    """
+    if sum(len(source) + 3 for source in sources) < MAX_COMMAND_LINE:
+        return sources, []
+    for workdir in workdirs:
+        try:
+            folder = tempfile.mkdtemp(prefix="entradas_", dir=workdir)
+            break
+        except OSError:
+            continue
+    else:
+        raise ValueError("nenhuma pasta com permissão de escrita para as entradas do PotreeConverter")
+    log.at_exit(lambda: shutil.rmtree(folder, ignore_errors=True))
+
+    def link(log):
+        for i, source in enumerate(sources):
+            # Prefixo: arquivos de pastas diferentes podem ter o mesmo nome
+            pagina.link_file(source, os.path.join(folder, f"{i:05d}_{os.path.basename(source)}"))
+        log(f"{len(sources)} arquivos passados ao PotreeConverter pela pasta {folder}")
+
+    return [folder], [aux_step("Preparando entradas do PotreeConverter...", link)]
+
+
+def source_points(sources):
+    """Pontos das entradas que chegam ao PotreeConverter (já corrigidas), ou None se algum cabeçalho falhar"""
+    try:
+        return sum(lasheader.read_header(path).point_count for path in sources)
+    except (OSError, ValueError):
+        return None
+
+
+def aux_step(description, command):
+    """Etapa que não lê a entrada; o resumo não calcula vazão para ela"""
+    return (description, command, False)
+
+
+def validate_output(cloud_root, expected_points, log):
+    """Valida a nuvem em ``cloud_root`` e registra o relatório; ValueError se a saída tiver problemas.
+
+    Sem metadata.json na pasta, valida cada subpasta (nuvens de blocos não
+    juntados); nesse caso a contagem é conferida só dentro de cada bloco.
+    """
+    folders = [cloud_root]
+    if not os.path.isfile(os.path.join(cloud_root, "metadata.json")) and os.path.isdir(cloud_root):
+        folders = [os.path.join(cloud_root, name) for name in sorted(os.listdir(cloud_root))]
+        expected_points = None
+
+    failed = 0
+    for folder in folders:
+        problems, lines = validar.validate(folder, expected_points)
+        for line in lines:
+            log(line)
+        for _, message in problems:
+            log(f"Problema na saída {os.path.basename(folder)}: {message}")
+        failed += bool(problems)
+    if failed:
+        raise ValueError(f"saída inválida em {failed} de {len(folders)} nuvens")
+
+
+class ConversionJob:
+    """Parâmetros de uma conversão, lidos do config uma única vez e compartilhados pelas etapas"""
+
+    __slots__ = ("inputs", "output_dir", "project_name", "config", "cache", "las_tools", "potree",
+                 "tile_count", "merge_tiles", "shared_libs", "preset", "converter_flags", "cloud_root")
+
+    def __init__(self, las_file, output_dir, project_name, config, conversion_cache=None):
+        self.inputs = [las_file] if isinstance(las_file, str) else list(las_file)
+        self.output_dir = output_dir
+        self.project_name = project_name
+        self.config = config
+        self.cache = conversion_cache
+        self.las_tools = config["lastools"]
+        self.potree = config["potree"]
+        # A divisão em blocos vale para um único arquivo
+        self.tile_count = config.get("tiles", 1) if len(self.inputs) == 1 else 1
+        self.merge_tiles = config.get("merge_tiles", True)
+        self.shared_libs = config.get("shared_libs", False)
+        self.preset = presets(config)[config.get("preset", DEFAULT_PRESET)]
+        # Preenchidos na verificação: os atributos dependem do formato de ponto
+        self.converter_flags = []
+        self.cloud_root = os.path.join(output_dir, "pointclouds", project_name)
+
+    def cache_flags(self):
+        """Opções que mudam a saída e entram na chave do cache"""
+        flags = ["--generate-page", self.project_name]
+        if self.tile_count > 1:
+            flags += ["--tiles", str(self.tile_count)] + (["--merge"] if self.merge_tiles else [])
+        if self.shared_libs:
+            flags.append("--shared-libs")
+        return flags + self.converter_flags
+
+
+def conversion_job(las_file, output_dir, project_name, config, conversion_cache=None):
+    """Etapas da conversão de um arquivo (ou de uma lista, numa única nuvem), no formato do ConversionEngine.
+
+    Só a primeira etapa é montada aqui (``plan_steps``): ela verifica os
+    arquivos e consulta o cache antes de decidir o resto do job.
+    """
+    job = ConversionJob(las_file, output_dir, project_name, config, conversion_cache)
+    description = ("Verificando arquivo LAS/LAZ..." if len(job.inputs) == 1
+                   else f"Verificando {len(job.inputs)} arquivos LAS/LAZ...")
+    return [(description, lambda log: plan_steps(job, log))]
+
+
+def plan_steps(job, log):
+    """Apaga .gz/.br antigos, escolhe as opções do PotreeConverter e restaura do cache ou monta a conversão"""
+    if job.tile_count > 1 and job.merge_tiles and job.preset.get("encoding") == "UNCOMPRESSED":
+        # Recusado antes da divisão: a junção só lê nós DEFAULT e gravaria DEFAULT
+        raise ValueError("a junção dos blocos não suporta o encoding UNCOMPRESSED; "
+                         "use outra predefinição ou converta os blocos sem junção")
+    # .gz/.br antigos seriam servidos pelo Apache no lugar dos arquivos novos
+    discarded = compactar.discard([job.cloud_root, os.path.join(job.output_dir, f"{job.project_name}.html")])
+    if discarded:
+        log(f"{discarded} versões comprimidas antigas apagadas")
+    job.converter_flags[:] = preset_flags(job.inputs, job.preset)
+    if job.converter_flags:
+        log(f"Opções do PotreeConverter: {subprocess.list2cmdline(job.converter_flags)}")
+    publish = publish_steps(job)
+    if job.cache is None:
+        return conversion_steps(job, log) + publish
+
+    key = job.cache.key(job.inputs, job.potree, job.cache_flags())
+    libs = None if job.shared_libs else libs_dir(job.potree)
+    if job.cache.restore(key, job.output_dir, job.project_name, libs):
+        log("Saída encontrada no cache, conversão dispensada.")
+        if job.shared_libs:
+            pagina.deploy_libs(libs_dir(job.potree), job.output_dir)
+        return publish
+
+    def store(log):
+        job.cache.store(key, job.output_dir, job.project_name)
+
+    return conversion_steps(job, log) + [aux_step("Guardando saída no cache...", store)] + publish
+
+
+def conversion_steps(job, log):
+    """Correção, conversão (inteira ou em blocos), página e validação"""
+    steps, sources = repair_steps(job, log)
+    validate = validate_step(job, sources)
+    if job.tile_count > 1:
+        return steps + [("Dividindo em blocos...", lambda log: tile_steps(job, log, sources[0], validate))]
+    if len(sources) > 1:
+        workdirs = [os.path.dirname(os.path.abspath(job.inputs[0])), job.output_dir]
+        sources, prepare = converter_inputs(sources, workdirs, log)
+        steps = steps + prepare
+    if job.shared_libs:
+        return steps + [
+            ("Convertendo para Potree...", [job.potree, *sources, "-o", job.cloud_root] + job.converter_flags),
+            page_step(job, [(job.project_name, os.path.join("pointclouds", job.project_name))]),
+            validate,
+        ]
+    return steps + [
+        ("Convertendo para Potree...",
+         [job.potree, *sources, "-o", job.output_dir, "--generate-page", job.project_name] + job.converter_flags),
+        tune_page_step(job),
+        validate,
+    ]
+
+
+def repair_steps(job, log):
+    """Etapas de correção e os arquivos que seguem para a conversão"""
+    config = job.config
+    patch_mode = config.get("repair_mode", "patch") == "patch"
+    multiple = len(job.inputs) > 1
+    patches = []
+    commands = []
+    sources = []
+    for path, problems in zip(job.inputs, check_inputs(job.inputs)):
+        if not problems:
+            sources.append(path)
+            continue
+        prefix = f"{os.path.basename(path)}: " if multiple else ""
+        for _, message in problems:
+            log(f"{prefix}Correção necessária: {message}")
+
+        if patch_mode and lasrepair.can_patch(path, problems):
+            target = path
+            if not config.get("repair_in_place", False):
+                target = repair_target(job, log, path, "_fixed.las", prefix)
+            patches.append((path, target))
+            sources.append(target)
+            continue
+
+        # A divisão em blocos só lê LAS sem compressão
+        target = repair_target(job, log, path, "_fixed.las" if job.tile_count > 1 else "_fixed.laz", prefix)
+        commands.append((os.path.basename(path), [job.las_tools, "-i", path, "-o", target]))
+        sources.append(target)
+
+    steps = []
+    if patches:
+        steps.append(("Corrigindo bounding box no cabeçalho...", lambda log: patch_files(patches, log)))
+    if len(commands) == 1 and not multiple:
+        steps.append(("Corrigindo arquivo LAS/LAZ...", commands[0][1]))
+    elif commands:
+        steps.append((f"Corrigindo {len(commands)} arquivos LAS/LAZ em paralelo...", commands))
+    if not steps:
+        if multiple:
+            log(f"Cabeçalhos dos {len(job.inputs)} arquivos consistentes com os pontos, correção dispensada.")
+        else:
+            log("Cabeçalho consistente com os pontos, correção dispensada.")
+    elif multiple:
+        log(f"{len(patches) + len(commands)} de {len(job.inputs)} arquivos precisam de correção.")
+    return steps, sources
+
+
+def repair_target(job, log, path, scratch_suffix, prefix=""):
+    """Arquivo corrigido de ``path``: ao lado dele, ou no rascunho com ``stream_repair``"""
+    if not job.config.get("stream_repair", False):
+        return fixed_file_name(path)
+    # O PotreeConverter relê a entrada em várias passadas com seek, então um
+    # pipe não serve; o intermediário vai para o rascunho e é apagado ao fim
+    # do job, mesmo em caso de erro
+    target = scratch_file(path, job.config, scratch_suffix)
+    log.at_exit(lambda: remove_file(target))
+    log(f"{prefix}Arquivo intermediário temporário: {target}")
+    return target
+
+
+def tile_steps(job, log, source, validate):
+    """Divide ``source`` em blocos e monta a conversão paralela, a junção, a página e a validação"""
+    header = lasheader.read_header(source)
+    # Com a junção, as saídas dos blocos também ficam no rascunho
+    needed = header.file_size * (2 if job.merge_tiles else 1)
+    tile_dir = tempfile.mkdtemp(prefix=f"{job.project_name}_blocos_",
+                                dir=scratch_directory(source, job.config, needed))
+    log.at_exit(lambda: shutil.rmtree(tile_dir, ignore_errors=True))
+    paths = tiles.split_file(source, header, tile_dir, job.tile_count)
+    log(f"{len(paths)} blocos gerados em {tile_dir}")
+
+    if os.path.isdir(job.cloud_root):
+        shutil.rmtree(job.cloud_root)
+    merge = job.merge_tiles and len(paths) > 1
+    if merge and job.preset.get("encoding", "DEFAULT") != "DEFAULT":
+        log(f"Blocos mantidos separados: a junção não suporta o encoding {job.preset['encoding']}")
+        merge = False
+    clouds = []
+    commands = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        folder = os.path.join("pointclouds", job.project_name, name)
+        clouds.append((name, folder))
+        target = os.path.join(tile_dir, "potree", name) if merge else os.path.join(job.output_dir, folder)
+        commands.append((name, [job.potree, path, "-o", target] + job.converter_flags))
+
+    steps = [(f"Convertendo {len(commands)} blocos em paralelo...", commands)]
+    if merge:
+        steps.append(merge_step(job, [command[-1] for _, command in commands]))
+        clouds = [(job.project_name, os.path.join("pointclouds", job.project_name))]
+    return steps + [page_step(job, clouds), validate]
+
+
+def merge_step(job, folders):
+    """Junta as nuvens dos blocos em ``folders`` numa única octree na pasta do projeto"""
+    def merge(log):
+        merged = mesclar.merge(folders, job.cloud_root, job.project_name)
+        log(f"Nuvem única com {merged['points']:,} pontos em {job.cloud_root}".replace(",", "."))
+
+    return aux_step("Juntando os blocos numa única octree...", merge)
+
+
+def page_step(job, clouds):
+    """Gera a página com ``clouds`` (nome, pasta), com as libs copiadas ou compartilhadas"""
+    def page(log):
+        libs = "libs"
+        if job.shared_libs:
+            libs = pagina.deploy_libs(libs_dir(job.potree), job.output_dir)
+            log(f"Libs do Potree compartilhadas em {os.path.join(job.output_dir, libs)}")
+        elif not os.path.isdir(os.path.join(job.output_dir, libs)) and os.path.isdir(libs_dir(job.potree)):
+            shutil.copytree(libs_dir(job.potree), os.path.join(job.output_dir, libs))
+        pagina.write_page(job.output_dir, job.project_name, clouds, pagina.template_file(job.potree), libs)
+
+    return aux_step("Gerando página...", page)
+
+
+def tune_page_step(job):
+    """Ajusta a página gerada pelo ``--generate-page`` aos dados da nuvem"""
+    def tune(log):
+        pagina.tune_page(job.output_dir, job.project_name,
+                         [(job.project_name, os.path.join("pointclouds", job.project_name))])
+
+    return aux_step("Ajustando página...", tune)
+
+
+def validate_step(job, sources):
+    """Valida a nuvem do projeto contra a contagem de pontos de ``sources``"""
+    # A contagem esperada vem das entradas corrigidas: o las2las descarta
+    # os pontos que faltam num arquivo truncado
+    sources = list(sources)
+    return aux_step("Validando saída...", lambda log: validate_output(job.cloud_root, source_points(sources), log))
+
+
+def publish_steps(job):
+    """Compressão dos arquivos de texto do job, se ``precompress`` estiver ligado.
+
+    Só a nuvem, a página e as libs deste job: varrer a pasta de saída inteira
+    custaria mais a cada nuvem publicada e comprimiria arquivos que outros
+    jobs ainda estão escrevendo.
+    """
+    if not job.config.get("precompress", False):
+        return []
+
+    def precompress(log):
+        libs = pagina.libs_name(libs_dir(job.potree)) if job.shared_libs else "libs"
+        paths = [job.cloud_root, os.path.join(job.output_dir, f"{job.project_name}.html"),
+                 os.path.join(job.output_dir, libs)]
+        count, before, after = compactar.compress_paths(paths)
+        compactar.install_htaccess(job.output_dir)
+        if count:
+            log(f"{count} arquivos comprimidos: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+
+    return [aux_step("Comprimindo arquivos da página...", precompress)]
+
+
+class JobLog:
+    """Função de log passada às etapas Python de um job.
+
+    Também registra funções de limpeza com ``at_exit``, chamadas quando o
+    job termina, com ou sem erro.
+    """
+
+    def __init__(self, write):
+        self.write = write
+        self.cleanups = []
+
+    def __call__(self, message):
+        self.write(message)
+
+    def at_exit(self, func):
+        self.cleanups.append(func)
+
+    def cleanup(self):
+        while self.cleanups:
+            try:
+                self.cleanups.pop()()
+            except OSError as e:
+                self.write(f"Erro na limpeza: {e}")
+
+
+class JobCancelled(Exception):
+    """O engine foi encerrado com o job em andamento"""
+
+
+class ConversionEngine:
+    """Executa os jobs de conversão em threads de fundo.
+
+    Cada job é uma lista de etapas (descrição, comando). As etapas de um
+    job rodam em sequência e a saída dos processos é repassada linha a
+    linha para ``on_output``. Até ``max_workers`` jobs rodam ao mesmo
+    tempo; os demais ficam na fila do executor.
+
+    As linhas também alimentam um ``ProgressTracker`` por job; cada mudança
+    de progresso é enviada a ``on_progress`` e o resumo de tempos e vazão
+    das etapas vai para o log ao final.
+
+    O comando pode ser também uma função ``comando(log)``, executada na
+    própria thread do job; a lista de etapas que ela retornar é inserida
+    logo em seguida. ``log`` é um ``JobLog``.
+
+    Uma lista de pares (nome, comando) forma uma etapa em grupo: os
+    processos rodam ao mesmo tempo, até um por núcleo, e o progresso da
+    etapa é a média do progresso de cada um.
+
+    Etapas que não leem a entrada (página, validação, cache) levam False
+    numa terceira posição (ver ``aux_step``): no resumo e no histórico elas
+    aparecem só com o tempo, sem vazão sobre o tamanho da entrada.
+
+    Com ``history`` (um ``historico.RunHistory``), os jobs enviados com
+    ``details`` são gravados no histórico ao terminar, com tempo, CPU,
+    memória e I/O de cada etapa.
+
+    Depois de ``shutdown`` nenhum processo novo é iniciado: os jobs em
+    andamento param antes da próxima etapa (ou do próximo processo de um
+    grupo) e terminam como cancelados, com ``on_finished(job_id, False)``.
+    """
+
+    def __init__(self, max_workers=1, on_output=print, on_started=None, on_finished=None, on_progress=None,
+                 history=None):
+        self.history = history
+        self.on_output = on_output
+        self.on_progress = on_progress or (lambda job_id, snapshot: None)
+        self.on_started = on_started or (lambda job_id: None)
+        self.on_finished = on_finished or (lambda job_id, ok: None)
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # Executores substituídos por set_max_workers, ainda com jobs na fila
+        self.retired = []
+        self.processes = set()
+        self.futures = []
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.stopped = False
+
+    def set_max_workers(self, max_workers):
+        if max_workers == self.max_workers:
+            return
+        # O executor atual termina o que já está na fila; novos jobs usam o novo limite
+        self.executor.shutdown(wait=False)
+        self.retired.append(self.executor)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.max_workers = max_workers
+
+    def submit(self, name, steps, input_bytes=0, input_points=0, details=None):
+        with self.lock:
+            self.next_id += 1
+            job_id = self.next_id
+        tracker = progresso.ProgressTracker(input_bytes, input_points)
+        # Descarta os já concluídos: o vigia de pasta envia jobs indefinidamente
+        self.futures = [future for future in self.futures if not future.done()]
+        self.futures.append(self.executor.submit(self._run, job_id, name, steps, tracker, details))
+        return job_id
+
+    def wait(self):
+        """Bloqueia até todos os jobs enviados terminarem"""
+        # Futures cancelados pelo shutdown nunca notificam o wait(); ficam de fora
+        wait([future for future in self.futures if not future.cancelled()])
+
+    def shutdown(self):
+        # Sob a trava: nenhum Popen começa depois daqui sem ver ``stopped``
+        with self.lock:
+            self.stopped = True
+            processes = list(self.processes)
+        for executor in self.retired + [self.executor]:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+
+    def _run(self, job_id, name, steps, tracker, details=None):
+        self.on_started(job_id)
+        steps = list(steps)
+        started = time.time()
+        stages = []
+
+        log = JobLog(lambda message: self.on_output(f"[{name}] {message}"))
+
+        def output(line):
+            log(line)
+            if tracker.feed(line):
+                self.on_progress(job_id, tracker.snapshot())
+
+        ok = False
+        try:
+            ok = self._run_steps(job_id, steps, tracker, log, output, stages)
+        except JobCancelled:
+            log("Conversão cancelada.")
+        except Exception as e:
+            # Falha fora do previsto (arquivo malformado, erro do SQLite, bug):
+            # o job termina com erro em vez de sumir sem avisar a interface
+            log(f"Erro inesperado: {type(e).__name__}: {e}")
+        finally:
+            try:
+                log.cleanup()
+                if self.history is not None and details is not None:
+                    try:
+                        self.history.record(name, started, time.time() - started, ok,
+                                            tracker.input_bytes, tracker.input_points, details, stages)
+                    except sqlite3.Error as e:
+                        log(f"Erro ao gravar o histórico: {e}")
+            finally:
+                self.on_finished(job_id, ok)
+        return ok
+
+    def _run_steps(self, job_id, steps, tracker, log, output, stages):
+        try:
+            while steps:
+                if self.stopped:
+                    raise JobCancelled()
+                description, command, *flags = steps.pop(0)
+                reads_input = flags[0] if flags else True
+                log(description)
+                tracker.start_stage(description, reads_input)
+                self.on_progress(job_id, tracker.snapshot())
+                # Tempo e uso de recursos da etapa, para o histórico
+                stage = {"description": description, "processes": 0, "wall": 0.0, "reads_input": reads_input}
+                stages.append(stage)
+                began = time.perf_counter()
+                if callable(command):
+                    # Etapas Python: CPU da própria thread (usuário + sistema)
+                    cpu = time.thread_time()
+                    try:
+                        steps[:0] = command(log) or []
+                    finally:
+                        stage["wall"] = time.perf_counter() - began
+                        stage["cpu_user"] = time.thread_time() - cpu
+                    continue
+                if command and isinstance(command[0], tuple):
+                    ok = self._run_group(job_id, command, tracker, log, stage)
+                    stage["wall"] = time.perf_counter() - began
+                    if not ok:
+                        return False
+                    continue
+                returncode, usage = self._run_process(output, command)
+                stage["wall"] = time.perf_counter() - began
+                stage["processes"] = 1
+                historico.add_usage(stage, usage)
+                if returncode != 0:
+                    if self.stopped:
+                        raise JobCancelled()
+                    log(f"Erro na execução: {command[0]} retornou código {returncode}")
+                    return False
+        except (OSError, ValueError) as e:
+            log(f"Erro na execução: {e}")
+            return False
+
+        for line in tracker.summary():
+            log(f"Resumo: {line}")
+        return True
+
+    def _run_group(self, job_id, commands, tracker, log, stage):
+        trackers = [progresso.ProgressTracker() for _ in commands]
+        lock = threading.Lock()
+
+        def run(index):
+            name, command = commands[index]
+
+            def output(line):
+                log(f"{name}: {line}")
+                with lock:
+                    if trackers[index].feed(line):
+                        tracker.combine(trackers)
+                        self.on_progress(job_id, tracker.snapshot())
+
+            returncode, usage = self._run_process(output, command)
+            with lock:
+                historico.add_usage(stage, usage)
+            return returncode
+
+        stage["processes"] = len(commands)
+        with ThreadPoolExecutor(max_workers=min(len(commands), os.cpu_count() or 1)) as pool:
+            returncodes = list(pool.map(run, range(len(commands))))
+
+        failed = [name for (name, _), returncode in zip(commands, returncodes) if returncode != 0]
+        if failed and self.stopped:
+            raise JobCancelled()
+        if failed:
+            log(f"Erro na execução: {len(failed)} de {len(commands)} processos falharam ({', '.join(failed)})")
+            return False
+        return True
+
+    def _run_process(self, log, command):
+        with self.lock:
+            if self.stopped:
+                raise JobCancelled()
+            # stdin explícito: no executável sem console (PyInstaller) não há stdin válido
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                errors="replace",
+                bufsize=1,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+            self.processes.add(process)
+        monitor = historico.ProcessMonitor(process)
+        try:
+            with process.stdout:
+                for line in process.stdout:
+                    line = line.rstrip()
+                    if line:
+                        log(line)
+            return monitor.wait()
+        finally:
+            self.processes.discard(process)
+
+
+def find_inputs(paths):
+    """Expande pastas em arquivos .las/.laz, ignorando saídas da correção (*_fixed.las/.laz)"""
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith((".las", ".laz")) and not lasrepair.is_fixed_output(name):
+                    inputs.append(os.path.join(path, name))
+        else:
+            inputs.append(path)
+    return inputs
+
+
+def cmd_convert(args, config):
+    for key in ("lastools", "potree"):
+        if getattr(args, key):
+            config[key] = getattr(args, key)
+    output_dir = args.output or config.get("output_dir", "")
+    if not (config.get("lastools") and config.get("potree") and output_dir):
+        print("Erro: configure lastools, potree e a pasta de saída (config.json ou opções)", file=sys.stderr)
+        return 2
+    if args.no_cache:
+        config["cache"] = False
+    if args.scratch:
+        config["stream_repair"] = True
+        config["scratch_dir"] = args.scratch
+    if args.tiles:
+        config["tiles"] = args.tiles
+    if args.no_merge:
+        config["merge_tiles"] = False
+    if args.shared_libs:
+        config["shared_libs"] = True
+    if args.precompress:
+        config["precompress"] = True
+    if args.preset:
+        config["preset"] = args.preset
+    if config.get("preset", DEFAULT_PRESET) not in presets(config):
+        print(f"Erro: predefinição desconhecida: {config['preset']} "
+              f"(disponíveis: {', '.join(presets(config))})", file=sys.stderr)
+        return 2
+
+    inputs = find_inputs(args.inputs)
+    if args.name and len(inputs) > 1 and not args.one_cloud:
+        print("Erro: --name só pode ser usado com um único arquivo (ou com --one-cloud)", file=sys.stderr)
+        return 2
+
+    results = {}
+    engine = ConversionEngine(
+        max_workers=args.jobs or config.get("max_jobs", DEFAULT_MAX_JOBS),
+        on_output=lambda line: print(line, flush=True),
+        on_finished=lambda job_id, ok: results.__setitem__(job_id, ok),
+        history=open_history(config, args.config),
+    )
+    conversion_cache = open_cache(config, args.config)
+    if args.one_cloud and len(inputs) > 1:
+        # Nome padrão: a pasta, se só uma foi passada, senão o primeiro arquivo
+        single_folder = len(args.inputs) == 1 and os.path.isdir(args.inputs[0])
+        project_name = args.name or (os.path.basename(os.path.normpath(args.inputs[0])) if single_folder
+                                     else os.path.splitext(os.path.basename(inputs[0]))[0])
+        jobs = [(project_name, inputs)]
+    else:
+        jobs = [(args.name or os.path.splitext(os.path.basename(las_file))[0], las_file) for las_file in inputs]
+    for project_name, las_file in jobs:
+        steps = conversion_job(las_file, output_dir, project_name, config, conversion_cache)
+        engine.submit(project_name, steps, *input_totals(las_file), details=run_details(las_file, config))
+    engine.wait()
+
+    failed = sum(1 for ok in results.values() if not ok)
+    print(f"{len(results) - failed} conversões concluídas, {failed} com erro.")
+    return 1 if failed else 0
+
+
+def cmd_info(args, config):
+    status = 0
+    for path in args.inputs:
+        try:
+            header = lasheader.read_header(path)
+        except (OSError, ValueError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            status = 1
+            continue
+        print(path)
+        for line in lasheader.describe(header):
+            print(f"  {line}")
+    return status
+
+
+def cmd_merge(args, config):
+    try:
+        compactar.discard([args.output])
+        merged = mesclar.merge(args.inputs, args.output, args.name or os.path.basename(os.path.normpath(args.output)))
+    except (OSError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    print(f"{len(args.inputs)} nuvens juntadas em {args.output} ({merged['points']} pontos)")
+    return 0
+
+
+def cmd_hierarchy(args, config):
+    try:
+        index = hierarquia.HierarchyIndex(args.folder)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    for line in hierarquia.describe(index):
+        print(line)
+
+    if args.box or args.level is not None:
+        lo, hi = (args.box[:3], args.box[3:]) if args.box else (index.root_min, index.root_min + index.root_size)
+        nodes = index.query_box(lo, hi, args.level)
+        print(f"{len(nodes)} nós na consulta, {int(index.num_points[nodes].sum())} pontos")
+        for node in nodes:
+            print(f"  {index.name(node)}: {index.num_points[node]} pontos, "
+                  f"{index.byte_sizes[node]} bytes em {index.byte_offsets[node]}")
+    return 0
+
+
+def cmd_validate(args, config):
+    try:
+        expected = lasheader.read_header(args.source).point_count if args.source else None
+    except (OSError, ValueError) as e:
+        print(f"Erro: não foi possível ler o arquivo de origem: {e}", file=sys.stderr)
+        return 2
+    try:
+        validate_output(args.folder, expected, print)
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    print("Saída válida.")
+    return 0
+
+
+def cmd_serve(args, config):
+    root = args.root or config.get("output_dir", "")
+    if not root:
+        print("Erro: informe a pasta ou configure output_dir", file=sys.stderr)
+        return 2
+    server = servidor.StaticServer(root, args.host, args.port, log=print)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_compress(args, config):
+    folder = args.folder or config.get("output_dir", "")
+    if not os.path.isdir(folder):
+        print("Erro: informe a pasta ou configure output_dir", file=sys.stderr)
+        return 2
+    if compactar.brotli is None:
+        print("Aviso: pacote brotli não instalado, gerando só .gz", file=sys.stderr)
+    count, before, after = compactar.precompress(folder, not args.no_htaccess)
+    print(f"{count} arquivos comprimidos: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+    return 0
+
+
+def cmd_history(args, config):
+    history = open_history(dict(config, history=True), args.config)
+    runs = history.runs(args.last, args.project)
+    for run in reversed(runs):
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["started"]))
+        rate = run["input_points"] / run["wall"] / 1e6 if run["wall"] > 0 else 0
+        line = (f"{started}  {run['project_name']}: {'ok' if run['ok'] else 'erro'}, "
+                f"{progresso.format_duration(run['wall'])}, {rate:.2f} Mpts/s")
+        if run["cpu"] is not None:
+            line += f", CPU {run['cpu']:.1f}s"
+        if run["peak_rss"]:
+            line += f", pico {run['peak_rss'] / 1024 ** 2:.0f} MB"
+        print(line)
+    if runs:
+        print()
+    for line in historico.report(history, args.project):
+        print(line)
+    return 0
+
+
+def cmd_watch(args, config):
+    output_dir = args.output or config.get("output_dir", "")
+    if not (config.get("lastools") and config.get("potree") and output_dir):
+        print("Erro: configure lastools, potree e a pasta de saída (config.json ou opções)", file=sys.stderr)
+        return 2
+    if not os.path.isdir(args.folder):
+        print(f"Erro: pasta não encontrada: {args.folder}", file=sys.stderr)
+        return 2
+    if args.preset:
+        config["preset"] = args.preset
+    if config.get("preset", DEFAULT_PRESET) not in presets(config):
+        print(f"Erro: predefinição desconhecida: {config['preset']} "
+              f"(disponíveis: {', '.join(presets(config))})", file=sys.stderr)
+        return 2
+    # Correção no lugar mudaria a data do arquivo e o vigia o entregaria de
+    # novo; o rascunho sem espaço cai na pasta temporária, nunca na vigiada
+    config["repair_in_place"] = False
+    config["scratch_beside_input"] = False
+
+    names = {}
+    # O job pode terminar (e chamar finished) antes de submit retornar o id
+    registering = threading.Lock()
+
+    def finished(job_id, ok):
+        with registering:
+            name = names.pop(job_id)
+        if ok:
+            print(f"{name} publicado em {os.path.join(output_dir, name + '.html')}", flush=True)
+        else:
+            print(f"{name}: conversão com erro; o arquivo será tentado de novo se for copiado outra vez", flush=True)
+
+    engine = ConversionEngine(
+        max_workers=args.jobs or config.get("max_jobs", DEFAULT_MAX_JOBS),
+        on_output=lambda line: print(line, flush=True),
+        on_finished=finished,
+        history=open_history(config, args.config),
+    )
+    conversion_cache = open_cache(config, args.config)
+
+    def project_name(las_file):
+        return os.path.splitext(os.path.basename(las_file))[0]
+
+    def is_done(las_file, mtime):
+        # Página mais nova que o arquivo: convertido numa execução anterior do vigia
+        try:
+            return os.stat(os.path.join(output_dir, project_name(las_file) + ".html")).st_mtime_ns >= mtime
+        except FileNotFoundError:
+            return False
+
+    def submit(las_file, complete):
+        name = project_name(las_file)
+        print(f"{name}: arquivo pronto, na fila de conversão", flush=True)
+        # Arquivo truncado: o intermediário corrigido tem o tamanho da entrada e
+        # vai para o rascunho, apagado ao fim do job
+        job_config = config if complete else dict(config, stream_repair=True)
+        steps = conversion_job(las_file, output_dir, name, job_config, conversion_cache)
+        with registering:
+            job_id = engine.submit(name, steps, *input_totals(las_file), details=run_details(las_file, job_config))
+            names[job_id] = name
+
+    watch = vigia.FolderWatch(args.folder, submit, args.settle, args.polling, args.interval, is_done)
+    try:
+        watch.run_forever()
+    except KeyboardInterrupt:
+        print("Encerrando o vigia; conversões em andamento são interrompidas.")
+        engine.shutdown()
+    return 0
+
+
+def parse_polygon(text):
+    """"x1,y1 x2,y2 ..." -> [(x1, y1), (x2, y2), ...]"""
+    polygon = [tuple(float(v) for v in pair.split(",")) for pair in text.split()]
+    if len(polygon) < 3 or any(len(point) != 2 for point in polygon):
+        raise argparse.ArgumentTypeError("polígono precisa de pelo menos 3 vértices no formato x,y")
+    return polygon
+
+
+def cmd_extract(args, config):
+    try:
+        count = extrair.extract(args.folder, args.output, args.box, args.polygon, args.level)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    print(f"{count} pontos gravados em {args.output}")
+    return 0
+
+
+def report_job(las_file, workers=None):
+    """Job com uma única etapa que calcula e registra o relatório de pré-conversão"""
+    def scan(log):
+        header, stats = lasstats.scan_file(las_file, workers)
+        for line in lasstats.report(header, stats):
+            log(line)
+
+    return [("Calculando estatísticas dos pontos...", scan)]
+
+
+def cmd_report(args, config):
+    engine = ConversionEngine(on_output=lambda line: print(line, flush=True))
+    for las_file in args.inputs:
+        engine.submit(os.path.basename(las_file), report_job(las_file, args.jobs))
+    engine.wait()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="conversao", description="Conversor LAS/LAZ para Potree")
+    parser.add_argument("--config", default=CONFIG_FILE, help="arquivo de configuração (padrão: config.json)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("converter", help="converte arquivos LAS/LAZ para Potree")
+    convert.add_argument("inputs", nargs="+", help="arquivos .las/.laz ou pastas")
+    convert.add_argument("-o", "--output", help="pasta de saída (padrão: output_dir do config)")
+    convert.add_argument("-n", "--name", help="nome do projeto (padrão: nome do arquivo)")
+    convert.add_argument("-j", "--jobs", type=int, help="conversões simultâneas")
+    convert.add_argument("--lastools", help="caminho do las2las")
+    convert.add_argument("--potree", help="caminho do PotreeConverter")
+    convert.add_argument("--no-cache", action="store_true", help="ignora o cache de conversões")
+    convert.add_argument("--scratch", metavar="PASTA",
+                         help="grava os arquivos corrigidos como temporários nesta pasta, em LAZ quando passam pelo las2las "
+                              "('auto' = tmpfs/temp)")
+    convert.add_argument("--tiles", type=int, metavar="N",
+                         help="divide cada arquivo em até N blocos espaciais convertidos em paralelo "
+                              "(células da octree: 8, 64 ou 512)")
+    convert.add_argument("--no-merge", action="store_true",
+                         help="com --tiles, mantém uma nuvem por bloco em vez de juntar numa única octree")
+    convert.add_argument("--shared-libs", action="store_true",
+                         help="publica as libs do Potree uma única vez na pasta de saída (libs-<hash>) em vez de copiá-las por projeto")
+    convert.add_argument("--precompress", action="store_true",
+                         help="grava versões .br/.gz dos arquivos de texto da página ao fim da conversão")
+    convert.add_argument("--one-cloud", action="store_true",
+                         help="converte todos os arquivos numa única nuvem, com uma só chamada do PotreeConverter")
+    convert.add_argument("--preset", help="predefinição de conversão (método, encoding e atributos; ver config.json)")
+    convert.set_defaults(func=cmd_convert)
+
+    info = commands.add_parser("info", help="mostra o cabeçalho de arquivos LAS/LAZ")
+    info.add_argument("inputs", nargs="+", help="arquivos .las/.laz")
+    info.set_defaults(func=cmd_info)
+
+    merge = commands.add_parser("juntar", help="junta nuvens Potree 2.0 convertidas em blocos numa única octree")
+    merge.add_argument("inputs", nargs="+", help="pastas com metadata.json, hierarchy.bin e octree.bin")
+    merge.add_argument("-o", "--output", required=True, help="pasta da nuvem resultante")
+    merge.add_argument("-n", "--name", help="nome da nuvem (padrão: nome da pasta de saída)")
+    merge.set_defaults(func=cmd_merge)
+
+    tree = commands.add_parser("hierarquia", help="mostra e consulta a hierarquia de uma saída Potree 2.0")
+    tree.add_argument("folder", help="pasta com metadata.json e hierarchy.bin")
+    tree.add_argument("--box", type=float, nargs=6, metavar=("XMIN", "YMIN", "ZMIN", "XMAX", "YMAX", "ZMAX"),
+                      help="lista os nós que interceptam o bounding box")
+    tree.add_argument("--level", type=int, help="nível máximo dos nós listados")
+    tree.set_defaults(func=cmd_hierarchy)
+
+    check = commands.add_parser("validar", help="confere uma saída Potree 2.0 e mostra a saúde da octree")
+    check.add_argument("folder", help="pasta da nuvem (pointclouds/projeto)")
+    check.add_argument("--source", help="arquivo LAS/LAZ de origem, para conferir a contagem de pontos")
+    check.set_defaults(func=cmd_validate)
+
+    extract = commands.add_parser("extrair", help="extrai pontos de uma saída Potree 2.0 para LAS")
+    extract.add_argument("folder", help="pasta com metadata.json, hierarchy.bin e octree.bin")
+    extract.add_argument("-o", "--output", required=True, help="arquivo .las de saída")
+    extract.add_argument("--box", type=float, nargs=6, metavar=("XMIN", "YMIN", "ZMIN", "XMAX", "YMAX", "ZMAX"),
+                         help="extrai só os pontos dentro do bounding box")
+    extract.add_argument("--polygon", type=parse_polygon, metavar="X,Y ...",
+                         help="extrai só os pontos dentro do polígono (em planta)")
+    extract.add_argument("--level", type=int, help="nível máximo de detalhe da octree")
+    extract.set_defaults(func=cmd_extract)
+
+    watch = commands.add_parser("vigiar", help="converte automaticamente os LAS/LAZ copiados para uma pasta")
+    watch.add_argument("folder", help="pasta vigiada")
+    watch.add_argument("-o", "--output", help="pasta publicada pelo servidor web (padrão: output_dir do config)")
+    watch.add_argument("-j", "--jobs", type=int, help="conversões simultâneas")
+    watch.add_argument("--preset", help="predefinição de conversão (ver config.json)")
+    watch.add_argument("--settle", type=float, default=vigia.STABLE_SECONDS, metavar="SEGUNDOS",
+                       help="tempo sem mudanças até o arquivo ser considerado copiado (padrão: %(default)s)")
+    watch.add_argument("--polling", action="store_true",
+                       help="varre a pasta periodicamente em vez de usar o inotify (necessário em pastas de rede)")
+    watch.add_argument("--interval", type=float, default=vigia.POLL_INTERVAL, metavar="SEGUNDOS",
+                       help="intervalo da varredura com --polling (padrão: %(default)s)")
+    watch.set_defaults(func=cmd_watch)
+
+    serve = commands.add_parser("servir", help="serve a pasta de saída por HTTP (alternativa ao xampp)")
+    serve.add_argument("root", nargs="?", help="pasta servida (padrão: output_dir do config)")
+    serve.add_argument("--host", default="127.0.0.1", help="endereço (0.0.0.0 para a rede local)")
+    serve.add_argument("--port", type=int, default=servidor.DEFAULT_PORT)
+    serve.set_defaults(func=cmd_serve)
+
+    compress = commands.add_parser("compactar", help="grava versões .br/.gz dos arquivos de texto das páginas")
+    compress.add_argument("folder", nargs="?", help="pasta de saída (padrão: output_dir do config)")
+    compress.add_argument("--no-htaccess", action="store_true", help="não cria o .htaccess para o xampp")
+    compress.set_defaults(func=cmd_compress)
+
+    history = commands.add_parser("historico", help="execuções anteriores, percentis por etapa e regressões de vazão")
+    history.add_argument("--project", help="só as execuções deste projeto")
+    history.add_argument("--last", type=int, default=20, help="execuções listadas (padrão: 20)")
+    history.set_defaults(func=cmd_history)
+
+    report = commands.add_parser("relatorio", help="estatísticas dos pontos de arquivos LAS sem compressão")
+    report.add_argument("inputs", nargs="+", help="arquivos .las")
+    report.add_argument("-j", "--jobs", type=int, help="processos usados na varredura (padrão: todos os núcleos)")
+    report.set_defaults(func=cmd_report)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args, load_config(args.config))
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
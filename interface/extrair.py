@@ -0,0 +1,151 @@
+"""Extração de pontos de uma saída Potree 2.0 de volta para LAS.
+
+Os nós que interceptam a área pedida vêm do ``HierarchyIndex``; só as
+faixas desses nós são lidas do octree.bin (mmap) e gravadas no LAS um nó
+por vez, então a memória usada depende do maior nó e não da área.
+
+As posições do octree.bin já são inteiros com a escala e o offset do
+metadata.json, os mesmos usados no cabeçalho do LAS gerado.
+"""
+import datetime
+import os
+
+import numpy as np
+
+import hierarquia
+import laspoints
+from lasheader import HEADER_STRUCT
+
+GENERATING_SOFTWARE = "PotreeConverte"
+
+
+def las_format(metadata):
+    """Formato de ponto do LAS 1.2 que guarda os atributos da nuvem"""
+    names = {attribute["name"] for attribute in metadata["attributes"]}
+    return ("gps-time" in names) + 2 * ("rgb" in names)
+
+
+def inside_polygon(x, y, polygon):
+    """Pontos dentro do polígono [(x, y), ...], pela regra par-ímpar"""
+    inside = np.zeros(len(x), dtype=bool)
+    for (x1, y1), (x2, y2) in zip(polygon, polygon[1:] + polygon[:1]):
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            at = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= crosses & (x < at)
+    return inside
+
+
+def to_las(points, point_format):
+    """Converte os pontos de um nó para registros do formato ``point_format``"""
+    names = points.dtype.names
+    records = np.zeros(len(points), dtype=laspoints.POINT_FORMATS[point_format])
+    for axis, name in enumerate("XYZ"):
+        records[name] = points["position"][:, axis]
+
+    def field(name):
+        return points[name] if name in names else 0
+
+    if "intensity" in names:
+        records["intensity"] = points["intensity"]
+    # Retornos 8 a 15 (formatos 6+) não cabem em 3 bits: viram 7, sem truncar os bits
+    returns = np.minimum(np.asarray(field("return number")), 7).astype(np.uint8)
+    count = np.minimum(np.asarray(field("number of returns")), 7).astype(np.uint8)
+    records["bit_fields"] = returns | count << 3
+    records["raw_classification"] = (np.asarray(field("classification")) & 0x1F) | (np.asarray(field("classification flags")) & 0x07) << 5
+    if "scan angle rank" in names:
+        records["scan_angle_rank"] = points["scan angle rank"]
+    elif "scan angle" in names:
+        # Formatos 6+: inteiro em unidades de 0,006 grau
+        records["scan_angle_rank"] = np.clip(np.round(points["scan angle"] * 0.006), -90, 90)
+    if "user data" in names:
+        records["user_data"] = points["user data"]
+    if "point source id" in names:
+        records["point_source_id"] = points["point source id"]
+    if "gps-time" in names and "gps_time" in records.dtype.names:
+        records["gps_time"] = points["gps-time"]
+    if "rgb" in names and "red" in records.dtype.names:
+        for i, color in enumerate(("red", "green", "blue")):
+            records[color] = points["rgb"][:, i]
+    return records
+
+
+def write_header(f, metadata, point_format, count, by_return, lo, hi):
+    scale = metadata["scale"]
+    offset = metadata["offset"]
+    lo = [int(v) * s + o for v, s, o in zip(lo, scale, offset)]
+    hi = [int(v) * s + o for v, s, o in zip(hi, scale, offset)]
+    today = datetime.date.today()
+    f.seek(0)
+    f.write(HEADER_STRUCT.pack(
+        b"LASF", 0, 0, bytes(16), 1, 2, b"", GENERATING_SOFTWARE.encode(),
+        today.timetuple().tm_yday, today.year, HEADER_STRUCT.size, HEADER_STRUCT.size, 0,
+        point_format, np.dtype(laspoints.POINT_FORMATS[point_format]).itemsize,
+        count, *by_return, *scale, *offset,
+        hi[0], lo[0], hi[1], lo[1], hi[2], lo[2],
+    ))
+
+
+def extract(folder, output, box=None, polygon=None, max_level=None, index=None):
+    """Grava em ``output`` os pontos da nuvem dentro de ``box`` e/ou ``polygon``.
+
+    ``box`` é (xmin, ymin, zmin, xmax, ymax, zmax); ``polygon`` é uma lista
+    de (x, y), sem limite em z. ``max_level`` limita o nível de detalhe (a
+    soma dos níveis até ele). Retorna o número de pontos gravados.
+    """
+    index = index or hierarquia.HierarchyIndex(folder)
+    metadata = index.metadata
+    if metadata.get("encoding", "DEFAULT") != "DEFAULT":
+        raise ValueError(f"{folder}: encoding {metadata['encoding']} não suportado (use DEFAULT)")
+
+    lo = index.root_min.copy()
+    hi = index.root_min + index.root_size
+    if box is not None:
+        lo, hi = np.maximum(lo, box[:3]), np.minimum(hi, box[3:])
+    if polygon is not None:
+        xs, ys = zip(*polygon)
+        lo[:2] = np.maximum(lo[:2], (min(xs), min(ys)))
+        hi[:2] = np.minimum(hi[:2], (max(xs), max(ys)))
+
+    nodes = index.query_box(lo, hi, max_level)
+    nodes = nodes[(index.byte_sizes[nodes] > 0) & (index.num_points[nodes] > 0)]
+    # Leitura em ordem de offset: acesso sequencial ao octree.bin
+    nodes = nodes[np.argsort(index.byte_offsets[nodes])]
+
+    dtype = hierarquia.point_dtype(metadata)
+    point_format = las_format(metadata)
+    # Limites em inteiros da nuvem, para filtrar sem converter as coordenadas
+    int_lo = np.ceil((lo - metadata["offset"]) / metadata["scale"] - 1e-9)
+    int_hi = np.floor((hi - metadata["offset"]) / metadata["scale"] + 1e-9)
+
+    count = 0
+    by_return = np.zeros(8, dtype=np.int64)
+    point_lo = np.full(3, np.iinfo(np.int32).max, dtype=np.int64)
+    point_hi = np.full(3, np.iinfo(np.int32).min, dtype=np.int64)
+    octree = np.memmap(os.path.join(folder, "octree.bin"), dtype=np.uint8, mode="r") if len(nodes) else None
+    with open(output, "wb") as f:
+        f.write(bytes(HEADER_STRUCT.size))
+        for node in nodes:
+            start = int(index.byte_offsets[node])
+            points = octree[start:start + int(index.num_points[node]) * dtype.itemsize].view(dtype)
+            position = points["position"]
+            mask = np.all((position >= int_lo) & (position <= int_hi), axis=1)
+            if polygon is not None:
+                x = position[:, 0] * metadata["scale"][0] + metadata["offset"][0]
+                y = position[:, 1] * metadata["scale"][1] + metadata["offset"][1]
+                mask &= inside_polygon(x, y, polygon)
+            if not mask.any():
+                continue
+
+            records = to_las(points[mask], point_format)
+            f.write(records.tobytes())
+            count += len(records)
+            by_return += np.bincount(records["bit_fields"] & 0x07, minlength=8)
+            for axis, name in enumerate("XYZ"):
+                point_lo[axis] = min(point_lo[axis], records[name].min())
+                point_hi[axis] = max(point_hi[axis], records[name].max())
+
+        if not count:
+            point_lo[:] = point_hi[:] = 0
+        write_header(f, metadata, point_format, count, by_return[1:6].tolist(), point_lo, point_hi)
+    return count
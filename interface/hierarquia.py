@@ -0,0 +1,183 @@
+"""Leitura do metadata.json e do hierarchy.bin das saídas Potree 2.0.
+
+O hierarchy.bin é dividido em chunks de registros de 22 bytes em ordem de
+busca em largura. Um registro do tipo proxy aponta para o chunk com a
+continuação da árvore; o primeiro registro desse chunk é o próprio nó.
+
+``HierarchyIndex`` guarda a árvore inteira em arrays NumPy (um elemento por
+nó), para consultas por bounding box e nível sem abrir o navegador.
+"""
+import json
+import os
+
+import numpy as np
+
+NORMAL, LEAF, PROXY = 0, 1, 2
+
+# Tipos dos atributos no metadata.json e o formato correspondente do NumPy
+ATTRIBUTE_TYPES = {
+    "int8": "i1", "int16": "<i2", "int32": "<i4", "int64": "<i8",
+    "uint8": "u1", "uint16": "<u2", "uint32": "<u4", "uint64": "<u8",
+    "float": "<f4", "double": "<f8",
+}
+
+RECORD_DTYPE = np.dtype([
+    ("type", "u1"), ("child_mask", "u1"), ("num_points", "<u4"),
+    ("byte_offset", "<i8"), ("byte_size", "<i8"),
+])
+
+
+def read_metadata(folder):
+    with open(os.path.join(folder, "metadata.json"), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    if not str(metadata.get("version", "")).startswith("2."):
+        raise ValueError(f"{folder}: saída Potree {metadata.get('version')} não suportada (esperado 2.0)")
+    return metadata
+
+
+def point_size(metadata):
+    """Bytes por ponto no octree.bin com encoding DEFAULT"""
+    return sum(attribute["size"] for attribute in metadata["attributes"])
+
+
+def point_dtype(metadata):
+    """dtype de um ponto do octree.bin (encoding DEFAULT), um campo por atributo"""
+    fields = []
+    for attribute in metadata["attributes"]:
+        base = ATTRIBUTE_TYPES.get(attribute["type"])
+        count = attribute.get("numElements", 1)
+        if base is None or np.dtype(base).itemsize * count != attribute["size"]:
+            # Tipo desconhecido: fica acessível como bytes brutos
+            fields.append((attribute["name"], f"V{attribute['size']}"))
+        elif count == 1:
+            fields.append((attribute["name"], base))
+        else:
+            fields.append((attribute["name"], base, count))
+    return np.dtype(fields)
+
+
+def iter_chunks(folder, metadata):
+    """Gera (offset, registros) de cada chunk alcançável a partir da raiz"""
+    with open(os.path.join(folder, "hierarchy.bin"), "rb") as f:
+        data = f.read()
+
+    pending = [(0, metadata["hierarchy"]["firstChunkSize"])]
+    while pending:
+        offset, size = pending.pop()
+        if offset < 0 or offset + size > len(data) or size % RECORD_DTYPE.itemsize:
+            raise ValueError(f"{folder}: chunk da hierarquia fora do arquivo (offset {offset}, {size} bytes)")
+        records = np.frombuffer(data, RECORD_DTYPE, size // RECORD_DTYPE.itemsize, offset)
+        yield offset, records
+        for record in records[records["type"] == PROXY]:
+            pending.append((int(record["byte_offset"]), int(record["byte_size"])))
+
+
+def chunk_nodes(records, root_level, root_position):
+    """Nível e posição inteira (x, y, z no nível) de cada registro de um chunk"""
+    count = len(records)
+    # Filhos de cada registro na ordem em largura: (pai, dígito) em ordem crescente
+    bits = np.unpackbits(records["child_mask"][:, None], axis=1, bitorder="little")
+    bits[records["type"] == PROXY] = 0
+    parents, digits = np.nonzero(bits)
+    if len(parents) != count - 1:
+        raise ValueError("chunk da hierarquia inconsistente com as máscaras de filhos")
+
+    levels = np.empty(count, dtype=np.int16)
+    positions = np.empty((count, 3), dtype=np.int64)
+    levels[0] = root_level
+    positions[0] = root_position
+    # Os filhos do nível anterior ocupam a faixa seguinte de registros; um nível por passada
+    last = 1
+    while last < count:
+        end = 1 + int(np.searchsorted(parents, last))
+        if end == last:
+            raise ValueError("chunk da hierarquia com nós sem pai")
+        children = np.arange(last, end)
+        parent = parents[children - 1]
+        digit = digits[children - 1]
+        levels[children] = levels[parent] + 1
+        positions[children] = positions[parent] * 2 + np.stack([digit >> 2 & 1, digit >> 1 & 1, digit & 1], axis=1)
+        last = end
+    return levels, positions
+
+
+class HierarchyIndex:
+    """Hierarquia de uma saída Potree 2.0 em arrays, um elemento por nó.
+
+    ``levels``, ``positions`` (x, y, z inteiros no nível), ``types``,
+    ``child_masks``, ``num_points``, ``byte_offsets`` e ``byte_sizes``
+    estão na ordem em que os nós aparecem nos chunks. Os proxies são
+    substituídos pelo registro do próprio nó no chunk a que apontam.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.metadata = read_metadata(folder)
+        bbox = self.metadata["boundingBox"]
+        self.root_min = np.array(bbox["min"], dtype=np.float64)
+        self.root_size = np.array(bbox["max"], dtype=np.float64) - self.root_min
+
+        parts = []
+        # Nível e posição da raiz de cada chunk, conhecidos pelo proxy que aponta para ele
+        roots = {0: (0, (0, 0, 0))}
+        self.chunk_count = 0
+        for offset, records in iter_chunks(folder, self.metadata):
+            levels, positions = chunk_nodes(records, *roots.pop(offset))
+            proxies = np.flatnonzero(records["type"] == PROXY)
+            for i in proxies:
+                roots[int(records["byte_offset"][i])] = (int(levels[i]), positions[i])
+            keep = records["type"] != PROXY
+            parts.append((records[keep], levels[keep], positions[keep]))
+            self.chunk_count += 1
+
+        records = np.concatenate([p[0] for p in parts])
+        self.levels = np.concatenate([p[1] for p in parts])
+        self.positions = np.concatenate([p[2] for p in parts])
+        self.types = records["type"]
+        self.child_masks = records["child_mask"]
+        self.num_points = records["num_points"].astype(np.int64)
+        self.byte_offsets = records["byte_offset"]
+        self.byte_sizes = records["byte_size"]
+
+        # Bounding box de cada nó, calculado uma vez para as consultas
+        self.node_sizes = self.root_size / np.exp2(self.levels)[:, None]
+        self.node_mins = self.root_min + self.positions * self.node_sizes
+
+    def __len__(self):
+        return len(self.levels)
+
+    def name(self, node):
+        """Nome do nó no padrão do Potree: "r" seguido dos dígitos dos filhos"""
+        level = int(self.levels[node])
+        x, y, z = (int(v) for v in self.positions[node])
+        digits = [(x >> d & 1) << 2 | (y >> d & 1) << 1 | (z >> d & 1) for d in range(level - 1, -1, -1)]
+        return "r" + "".join(str(d) for d in digits)
+
+    def query_box(self, lo, hi, max_level=None):
+        """Índices dos nós que interceptam o bbox [lo, hi] até o nível ``max_level``"""
+        mask = np.all(self.node_mins <= np.asarray(hi, dtype=np.float64), axis=1)
+        mask &= np.all(self.node_mins + self.node_sizes >= np.asarray(lo, dtype=np.float64), axis=1)
+        if max_level is not None:
+            mask &= self.levels <= max_level
+        return np.flatnonzero(mask)
+
+    def points_per_level(self):
+        """Total de pontos em cada nível, do 0 ao mais profundo"""
+        return np.bincount(self.levels, weights=self.num_points).astype(np.int64)
+
+    def nodes_per_level(self):
+        return np.bincount(self.levels)
+
+
+def describe(index):
+    """Resumo da hierarquia em linhas de texto"""
+    metadata = index.metadata
+    lines = [
+        f"{metadata.get('name', '')}: Potree {metadata['version']}, encoding {metadata.get('encoding', 'DEFAULT')}",
+        f"Pontos: {int(index.num_points.sum()):,} em {len(index):,} nós e {index.chunk_count} chunks".replace(",", "."),
+        "Mínimo: " + ", ".join(f"{v:.3f}" for v in index.root_min),
+        "Máximo: " + ", ".join(f"{v:.3f}" for v in index.root_min + index.root_size),
+    ]
+    for level, (nodes, points) in enumerate(zip(index.nodes_per_level(), index.points_per_level())):
+        lines.append(f"  nível {level}: {nodes} nós, " + f"{points:,} pontos".replace(",", "."))
+    return lines
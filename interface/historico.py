@@ -0,0 +1,266 @@
+"""Histórico das conversões em SQLite, com tempos e uso de recursos por etapa.
+
+Cada job executado pelo ``ConversionEngine`` vira uma linha em ``runs``
+(entrada, opções, máquina) e uma linha por etapa em ``stages``: tempo de
+parede, CPU, pico de memória e bytes lidos/gravados dos processos.
+
+O uso de recursos vem de ``os.wait4`` no Linux/macOS, que devolve o
+rusage exato de cada processo filho (o ``RUSAGE_CHILDREN`` soma todos os
+filhos do programa e misturaria jobs paralelos). No Windows usa o psutil,
+se instalado, amostrando o processo enquanto ele roda; sem ele só o tempo
+de parede é registrado.
+"""
+import json
+import os
+import platform
+import re
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+HISTORY_FILE = "historico.sqlite"
+# Intervalo de amostragem do psutil (Windows)
+SAMPLE_INTERVAL = 0.5
+# Execuções recentes comparadas com as anteriores na detecção de regressões
+RECENT_RUNS = 5
+# Vazão das recentes abaixo de 1/1.2 da anterior (20% mais lentas) é regressão
+REGRESSION_RATIO = 1.2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    project_name TEXT NOT NULL,
+    started REAL NOT NULL,
+    wall REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    input_bytes INTEGER NOT NULL,
+    input_points INTEGER NOT NULL,
+    details TEXT NOT NULL,
+    environment TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    wall REAL NOT NULL,
+    cpu_user REAL,
+    cpu_system REAL,
+    peak_rss INTEGER,
+    read_bytes INTEGER,
+    write_bytes INTEGER,
+    processes INTEGER NOT NULL,
+    reads_input INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (run_id, seq)
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started);
+"""
+
+USAGE_FIELDS = ("cpu_user", "cpu_system", "peak_rss", "read_bytes", "write_bytes")
+
+
+def environment():
+    """Máquina e versões, para separar regressões de trocas de hardware ou driver"""
+    return {
+        "host": platform.node(),
+        "system": platform.platform(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def add_usage(total, usage):
+    """Acumula ``usage`` em ``total``: somas de CPU e bytes, máximo do pico de memória"""
+    if usage is None:
+        return
+    for field in USAGE_FIELDS:
+        if usage.get(field) is None:
+            continue
+        if total.get(field) is None:
+            total[field] = usage[field]
+        elif field == "peak_rss":
+            total[field] = max(total[field], usage[field])
+        else:
+            total[field] += usage[field]
+
+
+class ProcessMonitor:
+    """Acompanha um ``subprocess.Popen``; ``wait`` devolve (código de saída, uso de recursos ou None)"""
+
+    def __init__(self, process):
+        self.process = process
+        self.usage = None
+        self.sampler = None
+        if not hasattr(os, "wait4") and psutil is not None:
+            # No Windows os contadores somem quando o processo termina: amostra enquanto roda
+            self.done = threading.Event()
+            self.sampler = threading.Thread(target=self.sample, daemon=True)
+            self.sampler.start()
+
+    def sample(self):
+        try:
+            handle = psutil.Process(self.process.pid)
+            while True:
+                with handle.oneshot():
+                    times = handle.cpu_times()
+                    memory = handle.memory_info()
+                    io = handle.io_counters()
+                self.usage = {
+                    "cpu_user": times.user,
+                    "cpu_system": times.system,
+                    "peak_rss": getattr(memory, "peak_wset", memory.rss),
+                    "read_bytes": io.read_bytes,
+                    "write_bytes": io.write_bytes,
+                }
+                if self.done.wait(SAMPLE_INTERVAL):
+                    break
+        except (psutil.Error, AttributeError, OSError):
+            pass
+
+    def wait(self):
+        if self.sampler is not None:
+            self.done.set()
+            self.sampler.join()
+            return self.process.wait(), self.usage
+        if not hasattr(os, "wait4"):
+            return self.process.wait(), None
+
+        try:
+            _, status, rusage = os.wait4(self.process.pid, 0)
+        except ChildProcessError:
+            # Já recolhido por outro caminho
+            return self.process.wait(), None
+        self.process.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss vem em KB no Linux e em bytes no macOS; blocos de I/O de 512 bytes
+        return self.process.returncode, {
+            "cpu_user": rusage.ru_utime,
+            "cpu_system": rusage.ru_stime,
+            "peak_rss": rusage.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+            "read_bytes": rusage.ru_inblock * 512,
+            "write_bytes": rusage.ru_oublock * 512,
+        }
+
+
+def stage_key(description):
+    """Descrição da etapa sem números: "Convertendo 4 blocos" e "Convertendo 8 blocos" ficam juntas"""
+    return re.sub(r"\d+", "N", description).rstrip(". ")
+
+
+def percentile(values, q):
+    """Percentil ``q`` (0-100) com interpolação linear"""
+    values = sorted(values)
+    if not values:
+        return None
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def median(values):
+    return percentile(values, 50)
+
+
+class RunHistory:
+    """Banco do histórico em ``path``; uma conexão por operação, como o cache"""
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self.connect()) as db, db:
+            db.executescript(SCHEMA)
+            # Bancos criados antes da coluna reads_input
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(stages)")}
+            if "reads_input" not in columns:
+                db.execute("ALTER TABLE stages ADD COLUMN reads_input INTEGER NOT NULL DEFAULT 1")
+
+    def connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def record(self, project_name, started, wall, ok, input_bytes, input_points, details, stages):
+        """Grava uma execução; ``stages`` é uma lista de dicts com descrição, tempo e uso"""
+        with closing(self.connect()) as db, db:
+            run_id = db.execute(
+                "INSERT INTO runs (project_name, started, wall, ok, input_bytes, input_points, details, environment) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (project_name, started, wall, int(ok), input_bytes, input_points,
+                 json.dumps(details, ensure_ascii=False), json.dumps(environment())),
+            ).lastrowid
+            db.executemany(
+                "INSERT INTO stages (run_id, seq, description, wall, cpu_user, cpu_system, peak_rss, read_bytes, "
+                "write_bytes, processes, reads_input) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, seq, stage["description"], stage["wall"],
+                  *(stage.get(field) for field in USAGE_FIELDS), stage.get("processes", 0),
+                  int(stage.get("reads_input", True)))
+                 for seq, stage in enumerate(stages)],
+            )
+        return run_id
+
+    def runs(self, limit=50, project_name=None):
+        """Execuções mais recentes primeiro, com os totais de CPU e o pico de memória"""
+        query = ("SELECT runs.*, SUM(COALESCE(stages.cpu_user, 0) + COALESCE(stages.cpu_system, 0)) AS cpu, "
+                 "MAX(stages.peak_rss) AS peak_rss FROM runs LEFT JOIN stages ON stages.run_id = runs.id")
+        args = []
+        if project_name:
+            query += " WHERE runs.project_name = ?"
+            args.append(project_name)
+        query += " GROUP BY runs.id ORDER BY runs.started DESC LIMIT ?"
+        args.append(limit)
+        with closing(self.connect()) as db:
+            return [dict(row) for row in db.execute(query, args)]
+
+    def stages(self, project_name=None):
+        """Etapas das execuções bem-sucedidas, da mais antiga para a mais recente"""
+        query = ("SELECT stages.*, runs.input_points, runs.started, runs.environment FROM stages "
+                 "JOIN runs ON runs.id = stages.run_id WHERE runs.ok = 1")
+        args = []
+        if project_name:
+            query += " AND runs.project_name = ?"
+            args.append(project_name)
+        query += " ORDER BY runs.started, stages.seq"
+        with closing(self.connect()) as db:
+            return [dict(row) for row in db.execute(query, args)]
+
+
+def report(history, project_name=None):
+    """Percentis de tempo e vazão por etapa e regressões das últimas execuções, em linhas"""
+    groups = {}
+    for stage in history.stages(project_name):
+        groups.setdefault(stage_key(stage["description"]), []).append(stage)
+    if not groups:
+        return ["Nenhuma execução concluída no histórico."]
+
+    lines = []
+    regressions = []
+    for key, stages in groups.items():
+        walls = [stage["wall"] for stage in stages]
+        # Vazão só das etapas que leem a entrada (não da página, validação...)
+        rates = [stage["input_points"] / stage["wall"] / 1e6 for stage in stages
+                 if stage["wall"] > 0 and stage["input_points"] and stage["reads_input"]]
+        peaks = [stage["peak_rss"] for stage in stages if stage["peak_rss"]]
+        line = (f"{key}: {len(stages)} execuções, tempo p50 {median(walls):.1f}s "
+                f"p90 {percentile(walls, 90):.1f}s")
+        if rates:
+            line += f", vazão p50 {median(rates):.2f} Mpts/s p10 {percentile(rates, 10):.2f} Mpts/s"
+        if peaks:
+            line += f", memória p90 {percentile(peaks, 90) / 1024 ** 2:.0f} MB"
+        lines.append(line)
+
+        # Regressão: mediana das últimas execuções contra a das anteriores
+        if len(rates) >= 2 * RECENT_RUNS:
+            before, recent = median(rates[:-RECENT_RUNS]), median(rates[-RECENT_RUNS:])
+            if recent * REGRESSION_RATIO < before:
+                message = (f"Regressão em {key}: {recent:.2f} Mpts/s nas últimas {RECENT_RUNS} execuções "
+                           f"contra {before:.2f} antes ({100 * (recent / before - 1):.0f}%)")
+                hosts = {stage["environment"] for stage in stages}
+                if len(hosts) > 1:
+                    message += "; houve mudança de máquina ou sistema no período"
+                regressions.append(message)
+    return lines + (regressions or ["Nenhuma regressão de vazão detectada."])
@@ -0,0 +1,306 @@
+"""Leitura do cabeçalho LAS/LAZ e verificação se a correção com las2las é necessária.
+
+O cabeçalho, os VLRs/EVLRs e a tabela de chunks do LAZ são lidos por mmap,
+sem processo externo, rápido o bastante para a interface mostrar os dados
+do arquivo assim que ele é selecionado.
+"""
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+import laspoints
+
+# Bloco público do cabeçalho até o LAS 1.2 (227 bytes)
+HEADER_STRUCT = struct.Struct("<4sHH16sBB32s32sHHHIIBHI5I3d3d6d")
+# Campos extras do LAS 1.4, a partir do byte 235
+EVLR_STRUCT = struct.Struct("<QIQ15Q")
+
+VLR_HEADER_STRUCT = struct.Struct("<H16sHH32s")
+EVLR_HEADER_STRUCT = struct.Struct("<H16sHQ32s")
+# VLR "laszip encoded" 22204 até o tamanho do chunk
+LASZIP_STRUCT = struct.Struct("<HHBBHII")
+CHUNK_TABLE_STRUCT = struct.Struct("<II")
+
+# GeoKeys com o código EPSG: ProjectedCSTypeGeoKey e GeographicTypeGeoKey
+EPSG_GEOKEYS = (3072, 2048)
+
+
+@dataclass
+class Vlr:
+    __slots__ = ("user_id", "record_id", "description", "data_offset", "data_length")
+    user_id: str
+    record_id: int
+    description: str
+    data_offset: int
+    data_length: int
+
+
+@dataclass
+class LasHeader:
+    __slots__ = (
+        "version", "system_identifier", "generating_software", "creation_date",
+        "header_size", "offset_to_points", "compressed", "point_format",
+        "point_record_length", "legacy_point_count", "legacy_points_by_return",
+        "point_count", "points_by_return", "scale", "offset", "min", "max",
+        "file_size", "vlrs", "evlrs", "evlr_start", "evlr_count", "laz_chunk_size", "laz_chunk_count", "crs",
+    )
+    version: tuple
+    system_identifier: str
+    generating_software: str
+    creation_date: tuple
+    header_size: int
+    offset_to_points: int
+    compressed: bool
+    point_format: int
+    point_record_length: int
+    legacy_point_count: int
+    legacy_points_by_return: list
+    point_count: int
+    points_by_return: list
+    scale: tuple
+    offset: tuple
+    min: tuple
+    max: tuple
+    file_size: int
+    vlrs: list
+    evlrs: list
+    # Posição e número de EVLRs declarados no cabeçalho (LAS 1.4; 0 nos demais)
+    evlr_start: int
+    evlr_count: int
+    # Tamanho do chunk do LAZ (0xFFFFFFFF = chunks variáveis) e número de chunks
+    laz_chunk_size: int
+    laz_chunk_count: int
+    # "EPSG:xxxx", WKT ou "" quando o arquivo não declara
+    crs: str
+
+    def find_vlr(self, user_id, record_id):
+        for vlr in self.vlrs + self.evlrs:
+            if vlr.user_id == user_id and vlr.record_id == record_id:
+                return vlr
+        return None
+
+
+def decode_text(raw):
+    return raw.split(b"\0", 1)[0].decode("ascii", "replace").strip()
+
+
+def read_vlrs(data, start, count, extended=False):
+    """VLRs (ou EVLRs) a partir de ``start``; ValueError se os dados de um deles passarem do fim do arquivo"""
+    record = EVLR_HEADER_STRUCT if extended else VLR_HEADER_STRUCT
+    vlrs = []
+    position = start
+    for _ in range(count):
+        if position + record.size > len(data):
+            break
+        _, user_id, record_id, length, description = record.unpack_from(data, position)
+        position += record.size
+        if position + length > len(data):
+            raise ValueError(f"{'EVLR' if extended else 'VLR'} {decode_text(user_id)} {record_id} "
+                             f"passa do fim do arquivo")
+        vlrs.append(Vlr(decode_text(user_id), record_id, decode_text(description), position, length))
+        position += length
+    return vlrs
+
+
+def read_crs(data, header):
+    wkt = header.find_vlr("LASF_Projection", 2112)
+    if wkt is not None:
+        return decode_text(data[wkt.data_offset:wkt.data_offset + wkt.data_length])
+
+    geokeys = header.find_vlr("LASF_Projection", 34735)
+    if geokeys is not None and geokeys.data_length >= 8:
+        keys = struct.unpack_from(f"<{geokeys.data_length // 2}H", data, geokeys.data_offset)
+        # Cabeçalho de 4 shorts e depois entradas (id, local, contagem, valor)
+        for i in range(4, min(len(keys), 4 + 4 * keys[3]), 4):
+            key_id, location, _, value = keys[i:i + 4]
+            if key_id in EPSG_GEOKEYS and location == 0 and value not in (0, 32767):
+                return f"EPSG:{value}"
+    return ""
+
+
+def read_laz_chunks(data, header):
+    laszip = header.find_vlr("laszip encoded", 22204)
+    if laszip is None or laszip.data_length < LASZIP_STRUCT.size:
+        return 0, 0
+    chunk_size = LASZIP_STRUCT.unpack_from(data, laszip.data_offset)[6]
+
+    # Os primeiros 8 bytes dos pontos apontam para a tabela de chunks
+    # (-1 quando o escritor não pôde voltar: ponteiro repetido no fim do arquivo)
+    if header.offset_to_points + 8 > len(data):
+        return chunk_size, 0
+    table = struct.unpack_from("<q", data, header.offset_to_points)[0]
+    if table == -1:
+        table = struct.unpack_from("<q", data, len(data) - 8)[0]
+    if not 0 < table <= len(data) - CHUNK_TABLE_STRUCT.size:
+        return chunk_size, 0
+    return chunk_size, CHUNK_TABLE_STRUCT.unpack_from(data, table)[1]
+
+
+def read_header(path):
+    """Lê cabeçalho, VLRs e EVLRs do arquivo por mmap e devolve um LasHeader"""
+    with open(path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size < HEADER_STRUCT.size:
+            raise ValueError(f"{path} não é um arquivo LAS/LAZ válido")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parse_header(data, path, file_size)
+
+
+def parse_header(data, path, file_size):
+    """LasHeader a partir dos bytes do arquivo; ValueError para cabeçalhos truncados ou inválidos"""
+    if len(data) < HEADER_STRUCT.size or data[:4] != b"LASF":
+        raise ValueError(f"{path} não é um arquivo LAS/LAZ válido")
+    try:
+        return parse_fields(data, file_size)
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+    except struct.error as e:
+        # Rede de segurança: nenhum registro malformado deve escapar como struct.error
+        raise ValueError(f"{path}: cabeçalho malformado ({e})") from None
+
+
+def parse_fields(data, file_size):
+    """Campos do cabeçalho, VLRs e EVLRs; struct.error/ValueError se os dados acabarem antes"""
+    fields = HEADER_STRUCT.unpack_from(data)
+    header = LasHeader(
+        version=(fields[4], fields[5]),
+        system_identifier=decode_text(fields[6]),
+        generating_software=decode_text(fields[7]),
+        creation_date=(fields[8], fields[9]),
+        header_size=fields[10],
+        offset_to_points=fields[11],
+        compressed=bool(fields[13] & 0xC0),
+        point_format=fields[13] & 0x3F,
+        point_record_length=fields[14],
+        legacy_point_count=fields[15],
+        legacy_points_by_return=list(fields[16:21]),
+        point_count=fields[15],
+        points_by_return=list(fields[16:21]),
+        scale=fields[21:24],
+        offset=fields[24:27],
+        # Ordem no arquivo: max x, min x, max y, min y, max z, min z
+        max=(fields[27], fields[29], fields[31]),
+        min=(fields[28], fields[30], fields[32]),
+        file_size=file_size,
+        vlrs=[],
+        evlrs=[],
+        evlr_start=0,
+        evlr_count=0,
+        laz_chunk_size=0,
+        laz_chunk_count=0,
+        crs="",
+    )
+
+    header.vlrs = read_vlrs(data, header.header_size, fields[12])
+    if header.version >= (1, 4) and header.header_size >= 375:
+        if len(data) < 235 + EVLR_STRUCT.size:
+            raise ValueError("cabeçalho LAS 1.4 truncado")
+        evlr_start, evlr_count, point_count, *by_return = EVLR_STRUCT.unpack_from(data, 235)
+        header.point_count = point_count
+        header.points_by_return = by_return
+        header.evlr_start, header.evlr_count = evlr_start, evlr_count
+        if 0 < evlr_start < file_size:
+            header.evlrs = read_vlrs(data, evlr_start, evlr_count, extended=True)
+
+    header.crs = read_crs(data, header)
+    if header.compressed:
+        header.laz_chunk_size, header.laz_chunk_count = read_laz_chunks(data, header)
+    return header
+
+
+def describe(header):
+    """Resumo do arquivo em linhas de texto, para a interface e a linha de comando"""
+    major, minor = header.version
+    lines = [
+        f"LAS {major}.{minor}, formato de ponto {header.point_format} ({header.point_record_length} bytes)"
+        + (", comprimido (LAZ)" if header.compressed else ""),
+        f"Pontos: {header.point_count:,}".replace(",", "."),
+        "Mínimo: " + ", ".join(f"{v:.3f}" for v in header.min),
+        "Máximo: " + ", ".join(f"{v:.3f}" for v in header.max),
+        f"Sistema de coordenadas: {header.crs or 'não informado'}",
+        f"VLRs: {len(header.vlrs)}, EVLRs: {len(header.evlrs)}",
+    ]
+    if header.compressed and header.laz_chunk_count:
+        lines.append(f"Chunks LAZ: {header.laz_chunk_count} de {header.laz_chunk_size:,} pontos".replace(",", "."))
+    if header.generating_software:
+        lines.append(f"Gerado por: {header.generating_software}")
+    return lines
+
+
+def check_file(path):
+    """Retorna a lista de problemas (tipo, mensagem) que exigem correção.
+
+    Lista vazia significa que o cabeçalho está consistente com os pontos e o
+    arquivo pode ir direto para o PotreeConverter. Em arquivos LAZ só o
+    cabeçalho pode ser verificado, então a correção continua obrigatória.
+    """
+    try:
+        header = read_header(path)
+    except (OSError, ValueError) as e:
+        return [("header", str(e))]
+
+    problems = check_header(header)
+    if problems:
+        return problems
+    if header.compressed:
+        return [("laz", "arquivo LAZ: os pontos só podem ser verificados após descompressão")]
+    return check_points(path, header)
+
+
+def check_header(header):
+    problems = []
+    if header.header_size < HEADER_STRUCT.size:
+        problems.append(("header", f"tamanho do cabeçalho inválido ({header.header_size} bytes)"))
+    if header.offset_to_points > header.file_size:
+        problems.append(("header", "início dos pontos além do fim do arquivo"))
+    if 0 in header.scale:
+        problems.append(("header", "escala zero no cabeçalho"))
+    if any(lo > hi for lo, hi in zip(header.min, header.max)):
+        problems.append(("bbox", "mínimo maior que o máximo no cabeçalho"))
+
+    if header.version >= (1, 4) and header.legacy_point_count not in (0, header.point_count):
+        problems.append(("counts", "contagem de pontos legada diferente da contagem de 64 bits"))
+
+    if not header.compressed:
+        stored = (header.file_size - header.offset_to_points) // header.point_record_length
+        if stored < header.point_count:
+            problems.append(("counts", f"cabeçalho indica {header.point_count} pontos, arquivo tem {stored}"))
+    return problems
+
+
+def scan_points(path, header):
+    """Varre os registros de pontos e retorna (min inteiro, max inteiro, contagem por retorno)"""
+    lo = np.full(3, np.iinfo(np.int32).max, dtype=np.int64)
+    hi = np.full(3, np.iinfo(np.int32).min, dtype=np.int64)
+    by_return = np.zeros(16, dtype=np.int64)
+    for chunk in laspoints.iter_points(path, header):
+        for axis, name in enumerate("XYZ"):
+            values = chunk[name]
+            lo[axis] = min(lo[axis], values.min())
+            hi[axis] = max(hi[axis], values.max())
+        by_return += np.bincount(laspoints.return_numbers(chunk, header), minlength=16)
+    return lo, hi, by_return
+
+
+def check_points(path, header):
+    if header.point_count == 0:
+        return []
+
+    lo, hi, by_return = scan_points(path, header)
+    problems = []
+
+    for axis, name in enumerate("xyz"):
+        scale = header.scale[axis]
+        offset = header.offset[axis]
+        # Tolerância de meia unidade de quantização
+        if abs(header.min[axis] - (lo[axis] * scale + offset)) > scale / 2 or \
+                abs(header.max[axis] - (hi[axis] * scale + offset)) > scale / 2:
+            problems.append(("bbox", f"bounding box em {name} diferente dos pontos"))
+
+    returns = len(header.points_by_return)
+    if list(by_return[1:returns + 1]) != header.points_by_return:
+        problems.append(("counts", "contagem de pontos por retorno diferente dos pontos"))
+    return problems
@@ -0,0 +1,134 @@
+"""Leitura dos registros de pontos de arquivos LAS sem compressão com NumPy.
+
+Os pontos são entregues em blocos como arrays estruturados que apontam
+direto para o arquivo mapeado em memória (sem cópia). Cada bloco mapeia só
+a sua janela do arquivo, então o uso de memória não depende do tamanho do
+arquivo.
+"""
+import numpy as np
+
+DEFAULT_CHUNK_POINTS = 1_000_000
+
+# Campos comuns dos formatos 0 a 5
+LEGACY_FIELDS = [
+    ("X", "<i4"), ("Y", "<i4"), ("Z", "<i4"), ("intensity", "<u2"),
+    ("bit_fields", "u1"), ("raw_classification", "u1"), ("scan_angle_rank", "i1"),
+    ("user_data", "u1"), ("point_source_id", "<u2"),
+]
+# Campos comuns dos formatos 6 a 10
+EXTENDED_FIELDS = [
+    ("X", "<i4"), ("Y", "<i4"), ("Z", "<i4"), ("intensity", "<u2"),
+    ("bit_fields", "u1"), ("classification_flags", "u1"), ("classification", "u1"),
+    ("user_data", "u1"), ("scan_angle", "<i2"), ("point_source_id", "<u2"), ("gps_time", "<f8"),
+]
+GPS_TIME = [("gps_time", "<f8")]
+RGB = [("red", "<u2"), ("green", "<u2"), ("blue", "<u2")]
+NIR = [("nir", "<u2")]
+WAVEPACKET = [
+    ("wavepacket_index", "u1"), ("wavepacket_offset", "<u8"), ("wavepacket_size", "<u4"),
+    ("return_point_wave_location", "<f4"), ("x_t", "<f4"), ("y_t", "<f4"), ("z_t", "<f4"),
+]
+
+POINT_FORMATS = {
+    0: LEGACY_FIELDS,
+    1: LEGACY_FIELDS + GPS_TIME,
+    2: LEGACY_FIELDS + RGB,
+    3: LEGACY_FIELDS + GPS_TIME + RGB,
+    4: LEGACY_FIELDS + GPS_TIME + WAVEPACKET,
+    5: LEGACY_FIELDS + GPS_TIME + RGB + WAVEPACKET,
+    6: EXTENDED_FIELDS,
+    7: EXTENDED_FIELDS + RGB,
+    8: EXTENDED_FIELDS + RGB + NIR,
+    9: EXTENDED_FIELDS + WAVEPACKET,
+    10: EXTENDED_FIELDS + RGB + NIR + WAVEPACKET,
+}
+
+# Tipos do VLR "Extra Bytes" (LASF_Spec 4); 11 a 30 são os vetores de 2 e 3 elementos
+EXTRA_BYTES_TYPES = ["u1", "i1", "<u2", "<i2", "<u4", "<i4", "<u8", "<i8", "<f4", "<f8"]
+EXTRA_BYTES_DESCRIPTOR_SIZE = 192
+
+
+def extra_bytes_fields(path, header):
+    """Campos descritos no VLR Extra Bytes, como (nome, formato) do NumPy"""
+    vlr = header.find_vlr("LASF_Spec", 4)
+    if vlr is None:
+        return []
+
+    with open(path, "rb") as f:
+        f.seek(vlr.data_offset)
+        data = f.read(vlr.data_length)
+
+    fields = []
+    for start in range(0, len(data) - EXTRA_BYTES_DESCRIPTOR_SIZE + 1, EXTRA_BYTES_DESCRIPTOR_SIZE):
+        data_type, options = data[start + 2], data[start + 3]
+        name = data[start + 4:start + 36].split(b"\0", 1)[0].decode("ascii", "replace") or f"extra_{start}"
+        if data_type == 0:
+            # Sem tipo: "options" guarda o tamanho em bytes
+            fields.append((name, f"V{options}"))
+        elif data_type <= 10:
+            fields.append((name, EXTRA_BYTES_TYPES[data_type - 1]))
+        elif data_type <= 30:
+            base = EXTRA_BYTES_TYPES[(data_type - 11) % 10]
+            fields.append((name, (base, 2 if data_type <= 20 else 3)))
+    return fields
+
+
+def point_dtype(header, extra_fields=()):
+    """dtype do registro do formato do arquivo, incluindo os bytes extras"""
+    if header.point_format not in POINT_FORMATS:
+        raise ValueError(f"formato de ponto {header.point_format} não suportado")
+
+    fields = POINT_FORMATS[header.point_format] + list(extra_fields)
+    dtype = np.dtype(fields)
+    if dtype.itemsize > header.point_record_length:
+        # VLR de bytes extras inconsistente com o registro: ignora os extras
+        dtype = np.dtype(POINT_FORMATS[header.point_format])
+        if dtype.itemsize > header.point_record_length:
+            raise ValueError(f"registro de {header.point_record_length} bytes menor que o formato {header.point_format}")
+
+    remaining = header.point_record_length - dtype.itemsize
+    if remaining:
+        # Bytes extras sem descrição ficam acessíveis como bytes brutos
+        dtype = np.dtype(dtype.descr + [("extra_bytes", f"V{remaining}")])
+    return dtype
+
+
+def iter_points(path, header, chunk_points=DEFAULT_CHUNK_POINTS, start=0, stop=None, step=1):
+    """Gera blocos de pontos de ``start`` a ``stop`` como arrays estruturados.
+
+    Cada bloco é um ``np.memmap`` somente leitura sobre a sua janela do
+    arquivo. Com ``step`` > 1 o bloco é uma vista com passo (amostragem
+    regular), ainda sem cópia.
+    """
+    if header.compressed:
+        raise ValueError(f"{path} é LAZ; os pontos precisam ser descomprimidos antes")
+
+    dtype = point_dtype(header, extra_bytes_fields(path, header))
+    stop = header.point_count if stop is None else min(stop, header.point_count)
+    # Blocos alinhados ao passo, para a amostragem continuar regular entre blocos
+    chunk_points = max(step, chunk_points - chunk_points % step)
+    for first in range(start, stop, chunk_points):
+        count = min(chunk_points, stop - first)
+        yield np.memmap(path, dtype=dtype, mode="r", shape=(count,),
+                        offset=header.offset_to_points + first * header.point_record_length)[::step]
+
+
+def return_numbers(points, header):
+    """Número do retorno de cada ponto (3 bits nos formatos 0-5, 4 bits nos 6-10)"""
+    return points["bit_fields"] & (0x0F if header.point_format >= 6 else 0x07)
+
+
+def classifications(points, header):
+    """Classe de cada ponto (5 bits nos formatos 0-5, byte inteiro nos 6-10)"""
+    if header.point_format >= 6:
+        return points["classification"]
+    return points["raw_classification"] & 0x1F
+
+
+def coordinates(points, header):
+    """Coordenadas reais (x, y, z) de um bloco, como array float64 N x 3"""
+    xyz = np.empty((len(points), 3), dtype=np.float64)
+    for axis, name in enumerate("XYZ"):
+        np.multiply(points[name], header.scale[axis], out=xyz[:, axis])
+        xyz[:, axis] += header.offset[axis]
+    return xyz
@@ -0,0 +1,70 @@
+"""Correção do bounding box no próprio cabeçalho, sem reescrever os pontos."""
+import os
+import shutil
+import struct
+
+import lasheader
+
+# max x, min x, max y, min y, max z, min z a partir do byte 179
+BOUNDS_OFFSET = 179
+BOUNDS_STRUCT = struct.Struct("<6d")
+
+# ioctl FICLONE do Linux (btrfs, xfs): cópia copy-on-write instantânea
+FICLONE = 0x40049409
+
+# Saídas da correção: <nome>_fixed.las ao lado da entrada ou <nome>_XXXX_fixed.la[sz] no rascunho
+FIXED_SUFFIXES = ("_fixed.las", "_fixed.laz")
+
+
+def is_fixed_output(name):
+    """Arquivo gerado pela correção, que não deve ser tratado como entrada"""
+    return name.lower().endswith(FIXED_SUFFIXES)
+
+
+def can_patch(path, problems):
+    """A correção no cabeçalho só vale para LAS sem compressão com problema apenas no bbox"""
+    if not problems or any(kind != "bbox" for kind, _ in problems):
+        return False
+    return not lasheader.read_header(path).compressed
+
+
+def clone_file(src, dst):
+    """Copia src para dst usando reflink quando o sistema de arquivos permite"""
+    try:
+        import fcntl
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(src, dst)
+
+
+def compute_bounds(path, header):
+    """Bounding box real dos pontos, como o ``-repair_bb`` do LAStools calcula"""
+    lo, hi, _ = lasheader.scan_points(path, header)
+    lo = [int(v) * scale + offset for v, scale, offset in zip(lo, header.scale, header.offset)]
+    hi = [int(v) * scale + offset for v, scale, offset in zip(hi, header.scale, header.offset)]
+    return lo, hi
+
+
+def patch_bounds(src, dst=None):
+    """Reescreve apenas os 48 bytes do bbox no cabeçalho.
+
+    Sem ``dst`` o arquivo é alterado no lugar; com ``dst`` é feita antes uma
+    cópia (reflink quando possível) e só a cópia é alterada.
+    """
+    header = lasheader.read_header(src)
+    if header.compressed:
+        raise ValueError(f"{src} é LAZ; o bbox só pode ser corrigido com las2las")
+
+    lo, hi = compute_bounds(src, header)
+    if dst is not None and os.path.abspath(dst) != os.path.abspath(src):
+        clone_file(src, dst)
+    else:
+        dst = src
+
+    with open(dst, "r+b") as f:
+        f.seek(BOUNDS_OFFSET)
+        f.write(BOUNDS_STRUCT.pack(hi[0], lo[0], hi[1], lo[1], hi[2], lo[2]))
+    return lo, hi
@@ -0,0 +1,109 @@
+"""Estatísticas dos pontos de um LAS sem compressão, calculadas em paralelo.
+
+A região de pontos é dividida em faixas alinhadas aos registros; cada
+processo do pool mapeia o arquivo e reduz a sua faixa, e os resultados
+parciais são combinados no final.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import lasheader
+import laspoints
+
+# Abaixo disso o custo de subir os processos supera o ganho
+MIN_POINTS_PER_WORKER = 2_000_000
+
+CLASS_NAMES = {
+    0: "Nunca classificado", 1: "Não classificado", 2: "Solo", 3: "Vegetação baixa",
+    4: "Vegetação média", 5: "Vegetação alta", 6: "Edificação", 7: "Ruído baixo",
+    8: "Ponto-chave", 9: "Água", 10: "Ferrovia", 11: "Rodovia", 12: "Sobreposição",
+    13: "Fio (blindagem)", 14: "Fio (condutor)", 15: "Torre de transmissão",
+    16: "Conector de fio", 17: "Ponte", 18: "Ruído alto",
+}
+
+
+def empty_stats():
+    return {
+        "count": 0,
+        "min": np.full(3, np.iinfo(np.int32).max, dtype=np.int64),
+        "max": np.full(3, np.iinfo(np.int32).min, dtype=np.int64),
+        "returns": np.zeros(16, dtype=np.int64),
+        "classes": np.zeros(256, dtype=np.int64),
+        "intensity": [np.iinfo(np.uint16).max, 0],
+    }
+
+
+def merge_stats(total, part):
+    total["count"] += part["count"]
+    np.minimum(total["min"], part["min"], out=total["min"])
+    np.maximum(total["max"], part["max"], out=total["max"])
+    total["returns"] += part["returns"]
+    total["classes"] += part["classes"]
+    total["intensity"][0] = min(total["intensity"][0], part["intensity"][0])
+    total["intensity"][1] = max(total["intensity"][1], part["intensity"][1])
+    return total
+
+
+def scan_range(path, start, stop):
+    """Estatísticas dos pontos [start, stop); roda dentro dos processos do pool"""
+    header = lasheader.read_header(path)
+    stats = empty_stats()
+    for chunk in laspoints.iter_points(path, header, start=start, stop=stop):
+        if not len(chunk):
+            continue
+        stats["count"] += len(chunk)
+        for axis, name in enumerate("XYZ"):
+            stats["min"][axis] = min(stats["min"][axis], chunk[name].min())
+            stats["max"][axis] = max(stats["max"][axis], chunk[name].max())
+        stats["returns"] += np.bincount(laspoints.return_numbers(chunk, header), minlength=16)
+        stats["classes"] += np.bincount(laspoints.classifications(chunk, header), minlength=256)
+        intensity = chunk["intensity"]
+        stats["intensity"][0] = min(stats["intensity"][0], int(intensity.min()))
+        stats["intensity"][1] = max(stats["intensity"][1], int(intensity.max()))
+    return stats
+
+
+def scan_file(path, workers=None):
+    """Estatísticas do arquivo inteiro, dividindo os pontos entre ``workers`` processos"""
+    header = lasheader.read_header(path)
+    if header.compressed:
+        raise ValueError(f"{path} é LAZ; o relatório só lê LAS sem compressão")
+
+    count = header.point_count
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, count // MIN_POINTS_PER_WORKER))
+    if workers == 1:
+        return header, scan_range(path, 0, count)
+
+    # Mais faixas que processos para equilibrar a carga entre eles
+    parts = workers * 4
+    bounds = [count * i // parts for i in range(parts + 1)]
+    total = empty_stats()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(scan_range, [path] * parts, bounds[:-1], bounds[1:]):
+            merge_stats(total, part)
+    return header, total
+
+
+def report(header, stats):
+    """Relatório de pré-conversão em linhas de texto"""
+    lo = [int(v) * s + o for v, s, o in zip(stats["min"], header.scale, header.offset)]
+    hi = [int(v) * s + o for v, s, o in zip(stats["max"], header.scale, header.offset)]
+    lines = [
+        f"Pontos lidos: {stats['count']:,}".replace(",", "."),
+        "Mínimo real: " + ", ".join(f"{v:.3f}" for v in lo),
+        "Máximo real: " + ", ".join(f"{v:.3f}" for v in hi),
+        f"Intensidade: {stats['intensity'][0]} a {stats['intensity'][1]}",
+        "Retornos: " + ", ".join(f"{n}º: {c}" for n, c in enumerate(stats["returns"]) if c),
+        "Classes:",
+    ]
+    for code in np.flatnonzero(stats["classes"]):
+        share = 100 * stats["classes"][code] / max(stats["count"], 1)
+        lines.append(f"  {code} {CLASS_NAMES.get(code, '')}: {stats['classes'][code]} ({share:.1f}%)")
+
+    for axis, name in enumerate("xyz"):
+        if abs(header.min[axis] - lo[axis]) > header.scale[axis] / 2 or abs(header.max[axis] - hi[axis]) > header.scale[axis] / 2:
+            lines.append(f"Atenção: bounding box do cabeçalho em {name} não confere com os pontos")
+    return lines
@@ -0,0 +1,186 @@
+"""Junção de nuvens Potree 2.0 convertidas em blocos numa única octree.
+
+Os blocos precisam ser células alinhadas de uma mesma octree (como os que
+``tiles.split_file`` gera): mesmo tamanho de cubo, mesma escala, mesmos
+atributos e encoding DEFAULT. A nova raiz envolve todos os blocos; os níveis
+acima deles ficam sem pontos e cada bloco entra como um proxy que aponta
+para a sua própria hierarquia, copiada com os offsets deslocados.
+
+Os nós do octree.bin são copiados sem reprocessamento; só as posições
+inteiras são somadas ao deslocamento entre o offset do bloco e o da raiz.
+"""
+import json
+import math
+import os
+
+import numpy as np
+
+import hierarquia
+
+# Folga relativa no alinhamento dos cubos (arredondamento do conversor)
+ALIGN_TOLERANCE = 1e-6
+
+
+def check_compatible(sources, metadatas):
+    first = metadatas[0]
+    layout = [(a["name"], a["size"], a["type"]) for a in first["attributes"]]
+    for folder, metadata in zip(sources, metadatas):
+        if metadata.get("encoding", "DEFAULT") != "DEFAULT":
+            raise ValueError(f"{folder}: encoding {metadata['encoding']} não suportado (use DEFAULT)")
+        if metadata["attributes"][0]["name"] != "position":
+            raise ValueError(f"{folder}: o primeiro atributo não é a posição")
+        if [(a["name"], a["size"], a["type"]) for a in metadata["attributes"]] != layout:
+            raise ValueError(f"{folder}: atributos diferentes de {sources[0]}")
+        if metadata["scale"] != first["scale"]:
+            raise ValueError(f"{folder}: escala diferente de {sources[0]}")
+
+
+def tile_grid(sources, metadatas):
+    """(mínimo da raiz, aresta dos blocos, nível dos blocos, índice inteiro de cada bloco)"""
+    sizes = [m["boundingBox"]["max"][0] - m["boundingBox"]["min"][0] for m in metadatas]
+    size = sizes[0]
+    if any(abs(s - size) > size * ALIGN_TOLERANCE for s in sizes):
+        raise ValueError("os blocos têm cubos de tamanhos diferentes")
+
+    root_min = [min(m["boundingBox"]["min"][axis] for m in metadatas) for axis in range(3)]
+    indices = []
+    for folder, metadata in zip(sources, metadatas):
+        index = []
+        for axis in range(3):
+            position = (metadata["boundingBox"]["min"][axis] - root_min[axis]) / size
+            if abs(position - round(position)) > ALIGN_TOLERANCE * max(1, position):
+                raise ValueError(f"{folder}: bloco não alinhado à grade dos demais")
+            index.append(round(position))
+        indices.append(tuple(index))
+    if len(set(indices)) != len(indices):
+        raise ValueError("dois blocos ocupam a mesma célula")
+
+    cells = max(max(index) for index in indices) + 1
+    level = max(1, math.ceil(math.log2(cells)))
+    return root_min, size, level, indices
+
+
+def node_path(index, level):
+    """Caminho dos filhos da raiz até a célula: um dígito (x << 2 | y << 1 | z) por nível"""
+    path = []
+    for depth in range(level - 1, -1, -1):
+        ix, iy, iz = ((v >> depth) & 1 for v in index)
+        path.append(ix << 2 | iy << 1 | iz)
+    return tuple(path)
+
+
+def top_chunk(paths):
+    """Nós da raiz até os blocos, na ordem em largura esperada pelo Potree"""
+    nodes = {()}
+    for path in paths:
+        for depth in range(len(path)):
+            nodes.add(path[:depth])
+    masks = dict.fromkeys(nodes, 0)
+    for path in list(nodes) + list(paths):
+        if path:
+            masks[path[:-1]] |= 1 << path[-1]
+    return sorted(nodes | set(paths), key=lambda p: (len(p), p)), masks
+
+
+def merge_attributes(metadatas):
+    attributes = [dict(a) for a in metadatas[0]["attributes"]]
+    for metadata in metadatas[1:]:
+        for merged, attribute in zip(attributes, metadata["attributes"]):
+            if "min" in merged and "min" in attribute:
+                merged["min"] = [min(a, b) for a, b in zip(merged["min"], attribute["min"])]
+                merged["max"] = [max(a, b) for a, b in zip(merged["max"], attribute["max"])]
+    return attributes
+
+
+def copy_points(source, target, base, records, shift, record_size):
+    """Copia os nós de ``records`` para ``target`` a partir de ``base``, deslocando as posições"""
+    dtype = np.dtype([("position", "<i4", 3), ("rest", f"V{record_size - 12}")])
+    nodes = records[(records["type"] != hierarquia.PROXY) & (records["byte_size"] > 0)]
+    for node in np.sort(nodes, order="byte_offset"):
+        offset, size = int(node["byte_offset"]), int(node["byte_size"])
+        if size % record_size:
+            raise ValueError(f"nó com {size} bytes não é múltiplo do ponto de {record_size} bytes")
+        source.seek(offset)
+        points = np.frombuffer(source.read(size), dtype).copy()
+        if len(points) * record_size != size:
+            raise ValueError("octree.bin menor que a hierarquia indica")
+        if any(shift):
+            points["position"] += shift
+        target.seek(base + offset)
+        target.write(points.tobytes())
+
+
+def merge(sources, output_dir, name):
+    """Junta as saídas Potree 2.0 em ``sources`` numa única nuvem em ``output_dir``"""
+    if len(sources) < 2:
+        raise ValueError("a junção precisa de pelo menos duas nuvens")
+    metadatas = [hierarquia.read_metadata(folder) for folder in sources]
+    check_compatible(sources, metadatas)
+    root_min, size, level, indices = tile_grid(sources, metadatas)
+    paths = [node_path(index, level) for index in indices]
+    scale = metadatas[0]["scale"]
+    record_size = hierarquia.point_size(metadatas[0])
+
+    chunks = [list(hierarquia.iter_chunks(folder, m)) for folder, m in zip(sources, metadatas)]
+    nodes, masks = top_chunk(paths)
+    top = np.zeros(len(nodes), hierarquia.RECORD_DTYPE)
+    hierarchy_base = top.nbytes
+    octree_base = 0
+    bases = []
+    for folder, metadata, path, tile_chunks in zip(sources, metadatas, paths, chunks):
+        root = tile_chunks[0][1][0]
+        # O bloco entra como proxy para o primeiro chunk da sua hierarquia
+        top[nodes.index(path)] = (hierarquia.PROXY, root["child_mask"], root["num_points"],
+                                  hierarchy_base, metadata["hierarchy"]["firstChunkSize"])
+        bases.append((hierarchy_base, octree_base))
+        hierarchy_base += os.path.getsize(os.path.join(folder, "hierarchy.bin"))
+        octree_base += os.path.getsize(os.path.join(folder, "octree.bin"))
+    for i, path in enumerate(nodes):
+        if path not in paths:
+            top[i] = (hierarquia.NORMAL, masks[path], 0, 0, 0)
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "hierarchy.bin"), "wb") as hierarchy, \
+            open(os.path.join(output_dir, "octree.bin"), "wb") as octree:
+        hierarchy.write(top.tobytes())
+        for folder, metadata, tile_chunks, (h_base, o_base) in zip(sources, metadatas, chunks, bases):
+            with open(os.path.join(folder, "hierarchy.bin"), "rb") as f:
+                data = bytearray(f.read())
+            shift = np.array([round((metadata["offset"][axis] - root_min[axis]) / scale[axis])
+                              for axis in range(3)], dtype=np.int32)
+
+            with open(os.path.join(folder, "octree.bin"), "rb") as source:
+                for offset, records in tile_chunks:
+                    copy_points(source, octree, o_base, records, shift, record_size)
+                    records = records.copy()
+                    proxies = records["type"] == hierarquia.PROXY
+                    records["byte_offset"][proxies] += h_base
+                    records["byte_offset"][~proxies] += o_base
+                    data[offset:offset + records.nbytes] = records.tobytes()
+            hierarchy.write(data)
+        # Garante o tamanho total mesmo se o último nó não for o último do arquivo
+        octree.truncate(octree_base)
+
+    spacing = metadatas[0]["spacing"] * 2 ** level
+    cube = size * 2 ** level
+    merged = {
+        "version": "2.0",
+        "name": name,
+        "description": "",
+        "points": sum(m["points"] for m in metadatas),
+        "projection": metadatas[0].get("projection", ""),
+        "hierarchy": {
+            "firstChunkSize": top.nbytes,
+            "stepSize": metadatas[0]["hierarchy"]["stepSize"],
+            "depth": max(m["hierarchy"].get("depth", 0) for m in metadatas) + level,
+        },
+        "offset": root_min,
+        "scale": scale,
+        "spacing": spacing,
+        "boundingBox": {"min": root_min, "max": [v + cube for v in root_min]},
+        "encoding": "DEFAULT",
+        "attributes": merge_attributes(metadatas),
+    }
+    with open(os.path.join(output_dir, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent="\t")
+    return merged
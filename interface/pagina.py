@@ -0,0 +1,250 @@
+"""Página HTML do Potree gerada a partir do modelo que acompanha o PotreeConverter.
+
+Usada quando a conversão não passa pelo ``--generate-page`` do conversor,
+por exemplo na conversão em blocos, em que uma única página carrega todas
+as nuvens de pontos.
+
+No modo de libs compartilhadas, as libs do Potree são publicadas uma única
+vez por pasta de saída, em ``libs-<hash do conteúdo>``, em vez de copiadas a
+cada projeto; as páginas apontam para essa pasta.
+
+As configurações do visualizador (orçamento de pontos, tamanho mínimo dos
+nós, EDL, câmera inicial) saem do metadata.json das nuvens, no lugar das
+fixas do modelo, tanto nas páginas geradas aqui quanto nas do conversor.
+"""
+import functools
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import uuid
+
+from lasrepair import clone_file
+
+POINTCLOUD_MARKER = "<!-- INCLUDE POINTCLOUD -->"
+# Linha do modelo antes da qual entram as configurações; a URL ainda pode sobrescrevê-las
+SETTINGS_ANCHOR = "viewer.loadSettingsFromURL();"
+# Configurações fixas do modelo, trocadas pelas calculadas
+FIXED_SETTINGS = re.compile(r"^[ \t]*viewer\.(setEDLEnabled|setFOV|setPointBudget|setMinNodeSize)\(.*\);[ \t]*\r?\n", re.M)
+
+# Até aqui a nuvem cabe inteira no orçamento e é carregada por completo
+FULL_LOAD_POINTS = 3_000_000
+DEFAULT_POINT_BUDGET = 2_000_000
+# Acima disso o orçamento cai para manter notebooks fracos interativos
+HUGE_POINTS = 100_000_000
+HUGE_POINT_BUDGET = 1_000_000
+# Tamanho mínimo na tela (pixels) de um nó para ser carregado; 30 é o padrão do Potree
+MIN_NODE_SIZE = 30
+# Nuvens com altura menor que isso em relação à largura são vistas mais de cima
+FLAT_RATIO = 0.2
+FOV = 60
+
+LOAD_TEMPLATE = """
+		const pointclouds = {clouds};
+		Promise.all(pointclouds.map(([url, name]) => Potree.loadPointCloud(url, name))).then(results => {{
+			let scene = viewer.scene;
+			results.forEach((e, i) => {{
+				let pointcloud = e.pointcloud;
+				let material = pointcloud.material;
+				material.size = 1;
+				material.pointSizeType = Potree.PointSizeType.ADAPTIVE;
+				material.shape = Potree.PointShape.SQUARE;
+				material.activeAttributeName = pointclouds[i][2];
+				scene.addPointCloud(pointcloud);
+			}});
+			viewer.fitToScreen();
+		}});
+"""
+
+
+def template_file(potree):
+    """Modelo de página que acompanha o executável do PotreeConverter"""
+    return os.path.join(os.path.dirname(potree), "resources", "page_template", "viewer_template.html")
+
+
+def fingerprint(libs_dir):
+    """Caminhos, tamanhos e datas dos arquivos; barato de calcular a cada página"""
+    files = []
+    for root, _, names in os.walk(libs_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            files.append((os.path.relpath(path, libs_dir).replace(os.sep, "/"), stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(files))
+
+
+@functools.lru_cache(maxsize=None)
+def content_hash(libs_dir, files):
+    """Hash do conteúdo das libs; refeito só quando o ``fingerprint`` muda"""
+    digest = hashlib.blake2b(digest_size=6)
+    for relative, _, _ in files:
+        digest.update(relative.encode() + b"\0")
+        with open(os.path.join(libs_dir, relative), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_file(src, dst):
+    """Hardlink quando origem e destino estão no mesmo volume, senão cópia (reflink se possível)"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        clone_file(src, dst)
+
+
+def libs_name(libs_dir):
+    """Nome da pasta compartilhada das libs: ``libs-<hash do conteúdo>``"""
+    return f"libs-{content_hash(libs_dir, fingerprint(libs_dir))}"
+
+
+def deploy_libs(libs_dir, output_dir):
+    """Publica as libs em ``output_dir/libs-<hash>`` se ainda não estiverem lá; retorna o nome da pasta"""
+    files = fingerprint(libs_dir)
+    name = f"libs-{content_hash(libs_dir, files)}"
+    target = os.path.join(output_dir, name)
+    if os.path.isdir(target):
+        return name
+
+    # Monta numa pasta temporária e renomeia: outro job pode estar publicando ao mesmo tempo.
+    # mkdir com o modo padrão (0777 menos a umask): o mkdtemp cria com 0700 e o
+    # rename mantém o modo, deixando as libs inacessíveis para o Apache/nginx
+    os.makedirs(output_dir, exist_ok=True)
+    staging = os.path.join(output_dir, f".{name}_{uuid.uuid4().hex[:8]}")
+    os.mkdir(staging)
+    try:
+        for relative, _, _ in files:
+            dst = os.path.join(staging, relative)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            link_file(os.path.join(libs_dir, relative), dst)
+        os.rename(staging, target)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(target):
+            raise
+    return name
+
+
+def load_metadata(output_dir, folder):
+    """metadata.json de uma nuvem já convertida, ou None"""
+    try:
+        with open(os.path.join(output_dir, folder, "metadata.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_metadata(output_dir, clouds):
+    """metadata.json das nuvens já convertidas (as que faltarem ficam de fora)"""
+    metadatas = [load_metadata(output_dir, folder) for _, folder in clouds]
+    return [metadata for metadata in metadatas if metadata is not None]
+
+
+def extent(metadata):
+    """(min, max) dos pontos: o das posições, mais justo que o boundingBox cúbico"""
+    for attribute in metadata.get("attributes", []):
+        if attribute.get("name") == "position" and "min" in attribute:
+            return attribute["min"], attribute["max"]
+    box = metadata["boundingBox"]
+    return box["min"], box["max"]
+
+
+def has_rgb(metadata):
+    return any(attribute.get("name") == "rgb" for attribute in metadata.get("attributes", []))
+
+
+def viewer_settings(metadatas):
+    """Configurações do visualizador para as nuvens, a partir dos metadata.json.
+
+    Nuvens pequenas cabem inteiras no orçamento e são carregadas por
+    completo; nas muito grandes o orçamento cai e os nós pequenos na tela
+    ficam para depois. O EDL dá a noção de profundidade às nuvens sem cor e
+    só é desligado nas coloridas muito grandes, onde custa mais que ajuda.
+    """
+    settings = {"fov": FOV, "point_budget": DEFAULT_POINT_BUDGET, "min_node_size": MIN_NODE_SIZE,
+                "edl": True, "pitch": -math.pi / 4}
+    if not metadatas:
+        return settings
+
+    points = sum(metadata.get("points", 0) for metadata in metadatas)
+    depth = max(metadata.get("hierarchy", {}).get("depth", 0) for metadata in metadatas)
+    colored = all(has_rgb(metadata) for metadata in metadatas)
+    if points <= FULL_LOAD_POINTS:
+        # Arredondado para cima em 100 mil, com folga para os pontos repetidos nos níveis
+        settings["point_budget"] = max(DEFAULT_POINT_BUDGET // 4, -(-points * 5 // 4 // 100_000) * 100_000)
+        settings["min_node_size"] = MIN_NODE_SIZE // 3
+    elif points >= HUGE_POINTS:
+        settings["point_budget"] = HUGE_POINT_BUDGET
+        # Octrees profundas têm muitos nós pequenos; cada um é uma requisição
+        settings["min_node_size"] = MIN_NODE_SIZE * (2 if depth >= 8 else 1)
+        settings["edl"] = not colored
+
+    lo = [min(extent(metadata)[0][axis] for metadata in metadatas) for axis in range(3)]
+    hi = [max(extent(metadata)[1][axis] for metadata in metadatas) for axis in range(3)]
+    width = max(hi[0] - lo[0], hi[1] - lo[1])
+    if width > 0 and (hi[2] - lo[2]) / width < FLAT_RATIO:
+        # Terreno: vista mais de cima; construções e fachadas, mais de lado
+        settings["pitch"] = -math.pi / 3
+    else:
+        settings["pitch"] = -math.pi / 6
+    return settings
+
+
+def settings_script(settings, indent="\t\t"):
+    lines = [
+        f"viewer.setEDLEnabled({'true' if settings['edl'] else 'false'});",
+        f"viewer.setFOV({settings['fov']});",
+        f"viewer.setPointBudget({settings['point_budget']});",
+        f"viewer.setMinNodeSize({settings['min_node_size']});",
+        # O fitToScreen depois da carga mantém a direção da vista
+        f"viewer.scene.view.pitch = {settings['pitch']:.4f};",
+    ]
+    return "".join(f"{line}\n{indent}" for line in lines)
+
+
+def apply_settings(html, metadatas):
+    """Troca as configurações fixas do modelo pelas calculadas para as nuvens"""
+    if SETTINGS_ANCHOR not in html:
+        return html
+    html = FIXED_SETTINGS.sub("", html)
+    return html.replace(SETTINGS_ANCHOR, settings_script(viewer_settings(metadatas)) + SETTINGS_ANCHOR, 1)
+
+
+def tune_page(output_dir, project_name, clouds):
+    """Ajusta as configurações de uma página já gerada (pelo ``--generate-page`` do conversor)"""
+    page = os.path.join(output_dir, f"{project_name}.html")
+    with open(page, "r", encoding="utf-8") as f:
+        html = f.read()
+    tuned = apply_settings(html, read_metadata(output_dir, clouds))
+    if tuned != html:
+        with open(page, "w", encoding="utf-8") as f:
+            f.write(tuned)
+    return page
+
+
+def write_page(output_dir, project_name, clouds, template, libs="libs"):
+    """Grava ``output_dir/project_name.html`` carregando as nuvens ``clouds``.
+
+    ``clouds`` é uma lista de (nome, pasta da nuvem relativa a ``output_dir``);
+    ``libs`` é a pasta das libs do Potree, também relativa a ``output_dir``.
+    """
+    with open(template, "r", encoding="utf-8") as f:
+        html = f.read()
+    if libs != "libs":
+        html = html.replace('"./libs/', f'"./{libs}/')
+
+    html = apply_settings(html, read_metadata(output_dir, clouds))
+    entries = []
+    for name, folder in clouds:
+        metadata = load_metadata(output_dir, folder)
+        # Nuvens sem cor são coloridas pela elevação
+        attribute = "elevation" if metadata is not None and not has_rgb(metadata) else "rgba"
+        entries.append([f"./{folder.replace(os.sep, '/')}/metadata.json", name, attribute])
+    html = html.replace(POINTCLOUD_MARKER, LOAD_TEMPLATE.format(clouds=json.dumps(entries)), 1)
+
+    page = os.path.join(output_dir, f"{project_name}.html")
+    with open(page, "w", encoding="utf-8") as f:
+        f.write(html)
+    return page
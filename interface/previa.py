@@ -0,0 +1,146 @@
+"""Prévia rápida de um LAS/LAZ em planta, antes da conversão.
+
+Em vez de ler o arquivo inteiro, lê alguns blocos de pontos contíguos
+espalhados por ele (poucas leituras pequenas no disco, mesmo em arquivos
+de vários GB) até um orçamento fixo de pontos. Os pontos viram um raster
+de elevação sombreado pela densidade, com ``np.bincount``.
+
+LAZ não pode ser lido direto: o las2las descomprime alguns trechos
+(``-subseq``, que usa a tabela de chunks do LAZ para pular o resto) e
+entrega cada um como LAS pelo stdout.
+"""
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import lasheader
+import laspoints
+
+PREVIEW_POINTS = 400_000
+# Blocos contíguos lidos de um LAS; cada um ocupa poucas páginas do disco
+LAS_BLOCKS = 256
+# Trechos descomprimidos de um LAZ, em processos do las2las paralelos
+LAZ_PIECES = 4
+RASTER_SIZE = 512
+
+# Rampa de cores da elevação, do mais baixo ao mais alto
+ELEVATION_RAMP = np.array([
+    (43, 131, 186), (171, 221, 164), (255, 255, 191), (253, 174, 97), (215, 25, 28),
+], dtype=np.float64)
+
+
+class Preview:
+    """Raster RGB (altura x largura x 3, uint8) e os dados da amostra"""
+
+    __slots__ = ("image", "sampled", "total", "seconds")
+
+    def __init__(self, image, sampled, total, seconds):
+        self.image = image
+        self.sampled = sampled
+        self.total = total
+        self.seconds = seconds
+
+    def describe(self):
+        share = 100 * self.sampled / self.total if self.total else 100
+        text = f"Prévia com {self.sampled:,} de {self.total:,} pontos ({share:.1f}%) em {self.seconds:.2f}s"
+        return text.replace(",", ".")
+
+
+def block_starts(count, blocks, block_points):
+    """Início de ``blocks`` blocos de ``block_points`` espalhados por ``count`` pontos"""
+    if count <= blocks * block_points:
+        return np.arange(0, count, block_points)
+    return np.linspace(0, count - block_points, blocks).astype(np.int64)
+
+
+def sample_las(path, header, budget=PREVIEW_POINTS):
+    """Arrays (X, Y, Z) inteiros de uma amostra de até ``budget`` pontos de um LAS"""
+    dtype = laspoints.point_dtype(header, laspoints.extra_bytes_fields(path, header))
+    # A contagem do cabeçalho pode passar do fim do arquivo (arquivo truncado)
+    count = min(header.point_count, (header.file_size - header.offset_to_points) // header.point_record_length)
+    if count <= 0:
+        return np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros(0, np.int32)
+
+    points = np.memmap(path, dtype=dtype, mode="r", shape=(count,), offset=header.offset_to_points)
+    block_points = max(1, budget // LAS_BLOCKS)
+    sample = np.concatenate([points[start:start + block_points]
+                             for start in block_starts(count, LAS_BLOCKS, block_points)])
+    return sample["X"], sample["Y"], sample["Z"]
+
+
+def read_piece(las_tools, path, start, stop):
+    """Pontos ``start`` a ``stop`` de um LAZ, descomprimidos pelo las2las como LAS no stdout"""
+    result = subprocess.run(
+        [las_tools, "-i", path, "-subseq", str(start), str(stop), "-stdout", "-olas"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        check=True,
+    )
+    data = result.stdout
+    header = lasheader.parse_header(data, path, len(data))
+    # Pelo stdout o las2las não volta para corrigir a contagem do cabeçalho
+    count = (len(data) - header.offset_to_points) // header.point_record_length
+    dtype = laspoints.point_dtype(header)
+    points = np.frombuffer(data, dtype=dtype, count=count, offset=header.offset_to_points)
+    return points["X"], points["Y"], points["Z"]
+
+
+def sample_laz(path, header, las_tools, budget=PREVIEW_POINTS):
+    """Como ``sample_las``, com alguns trechos do LAZ descomprimidos em paralelo"""
+    piece_points = max(1, budget // LAZ_PIECES)
+    starts = block_starts(header.point_count, LAZ_PIECES, piece_points)
+    with ThreadPoolExecutor(len(starts)) as pool:
+        pieces = list(pool.map(lambda start: read_piece(las_tools, path, int(start), int(start) + piece_points),
+                               starts))
+    return tuple(np.concatenate([piece[axis] for piece in pieces]) for axis in range(3))
+
+
+def raster(x, y, z, size=RASTER_SIZE):
+    """Imagem RGB em planta: cor pela maior elevação da célula, brilho pela densidade"""
+    if not len(x):
+        return np.zeros((1, 1, 3), dtype=np.uint8)
+    # Limites da própria amostra: o bbox do cabeçalho pode estar errado
+    x0, x1 = int(x.min()), int(x.max())
+    y0, y1 = int(y.min()), int(y.max())
+    span = max(x1 - x0, y1 - y0, 1)
+    width = max(1, round(size * (x1 - x0) / span))
+    height = max(1, round(size * (y1 - y0) / span))
+    cell_x = np.minimum((x.astype(np.int64) - x0) * width // (x1 - x0 + 1), width - 1)
+    # Linha 0 no topo da imagem: norte para cima
+    cell_y = height - 1 - np.minimum((y.astype(np.int64) - y0) * height // (y1 - y0 + 1), height - 1)
+    cells = cell_y * width + cell_x
+
+    density = np.bincount(cells, minlength=width * height)
+    # Ordenados por célula e z: o último de cada célula é o mais alto
+    order = np.lexsort((z, cells))
+    sorted_cells = cells[order]
+    last = np.append(np.flatnonzero(sorted_cells[1:] != sorted_cells[:-1]), len(order) - 1)
+    top = np.zeros(width * height, dtype=np.float64)
+    top[sorted_cells[last]] = z[order[last]]
+
+    filled = density > 0
+    lo, hi = np.percentile(top[filled], (2, 98))
+    level = np.clip((top - lo) / (hi - lo if hi > lo else 1), 0, 1) * (len(ELEVATION_RAMP) - 1)
+    rgb = np.stack([np.interp(level, np.arange(len(ELEVATION_RAMP)), ELEVATION_RAMP[:, c]) for c in range(3)], axis=1)
+    shade = np.log1p(density) / np.log1p(density.max())
+    rgb *= (0.35 + 0.65 * shade)[:, None]
+    rgb[~filled] = 0
+    return np.ascontiguousarray(rgb.reshape(height, width, 3).astype(np.uint8))
+
+
+def preview(path, las_tools=None, budget=PREVIEW_POINTS, size=RASTER_SIZE):
+    """Prévia de ``path``; LAZ precisa do caminho do las2las"""
+    began = time.perf_counter()
+    header = lasheader.read_header(path)
+    if header.compressed:
+        if not las_tools:
+            raise ValueError("configure o las2las para a prévia de arquivos LAZ")
+        x, y, z = sample_laz(path, header, las_tools, budget)
+    else:
+        x, y, z = sample_las(path, header, budget)
+    image = raster(x, y, z, size)
+    return Preview(image, len(x), header.point_count, time.perf_counter() - began)
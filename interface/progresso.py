@@ -0,0 +1,136 @@
+"""Progresso das conversões a partir da saída do PotreeConverter e do las2las."""
+import re
+import time
+
+# [ 45%, 12s], [INDEXING: 80%, duration: 3s, throughput: 5MPs][RAM: 1.2GB (highest 1.5GB), CPU: 95%]
+POTREE_PROGRESS = re.compile(
+    r"^\[\s*(?P<total>\d+(?:\.\d+)?)%,\s*(?P<elapsed>\d+(?:\.\d+)?)s\],\s*"
+    r"\[(?P<phase>[^:\]]+):\s*(?P<percent>\d+(?:\.\d+)?)%"
+    r"(?:,\s*duration:\s*(?P<duration>\d+(?:\.\d+)?)s)?"
+    r"(?:,\s*throughput:\s*(?P<throughput>\d+(?:\.\d+)?)MPs)?"
+)
+# #points: 170'655
+POTREE_POINTS = re.compile(r"^#points:\s*(?P<points>[\d',.]+)")
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m{seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m"
+
+
+class ProgressTracker:
+    """Modelo de progresso de um job: etapa, percentual, vazão e ETA.
+
+    ``start_stage`` marca o início de cada etapa do job e ``feed`` recebe as
+    linhas de saída dos processos. Ao final, ``summary`` devolve o tempo e a
+    vazão de cada etapa para comparar execuções entre máquinas; etapas que
+    não leem a entrada (``reads_input=False``) aparecem só com o tempo.
+    """
+
+    def __init__(self, input_bytes=0, input_points=0):
+        self.input_bytes = input_bytes
+        self.input_points = input_points
+        self.stages = []
+        self.stage = None
+        self.stage_reads_input = True
+        self.stage_start = None
+        self.phase = ""
+        self.percent = None
+        self.points_per_sec = None
+        self.bytes_per_sec = None
+        self.eta = None
+
+    def start_stage(self, name, reads_input=True):
+        self.finish_stage()
+        self.stage = name
+        self.stage_reads_input = reads_input
+        self.stage_start = time.monotonic()
+        self.phase = name
+        self.percent = None
+        self.points_per_sec = None
+        self.bytes_per_sec = None
+        self.eta = None
+
+    def finish_stage(self):
+        if self.stage is not None:
+            self.stages.append((self.stage, time.monotonic() - self.stage_start, self.stage_reads_input))
+            self.stage = None
+
+    def feed(self, line):
+        """Interpreta uma linha de saída; retorna True se o progresso mudou"""
+        match = POTREE_POINTS.match(line)
+        if match:
+            self.input_points = int(re.sub(r"\D", "", match.group("points")) or 0)
+            return False
+
+        match = POTREE_PROGRESS.match(line)
+        if not match:
+            return False
+
+        total = float(match.group("total"))
+        elapsed = float(match.group("elapsed"))
+        self.phase = match.group("phase").strip()
+        self.percent = total
+        if match.group("throughput"):
+            self.points_per_sec = float(match.group("throughput")) * 1e6
+        elif self.input_points and elapsed > 0:
+            self.points_per_sec = self.input_points * total / 100 / elapsed
+        if self.input_bytes and elapsed > 0:
+            self.bytes_per_sec = self.input_bytes * total / 100 / elapsed
+        self.eta = elapsed * (100 - total) / total if total > 0 else None
+        return True
+
+    def combine(self, parts):
+        """Progresso de uma etapa com vários processos: média dos percentuais"""
+        self.percent = sum(part.percent or 0 for part in parts) / len(parts)
+        self.points_per_sec = sum(part.points_per_sec or 0 for part in parts) or None
+        etas = [part.eta for part in parts if part.eta is not None]
+        self.eta = max(etas) if etas else None
+
+    def snapshot(self):
+        return {
+            "phase": self.phase,
+            "percent": self.percent,
+            "points_per_sec": self.points_per_sec,
+            "bytes_per_sec": self.bytes_per_sec,
+            "eta": self.eta,
+        }
+
+    def summary(self):
+        """Uma linha por etapa com duração e vazão sobre o tamanho da entrada"""
+        self.finish_stage()
+        lines = []
+        total = 0.0
+        for name, seconds, reads_input in self.stages:
+            total += seconds
+            lines.append(f"{name.rstrip('.')}: {seconds:.1f}s{self.throughput(seconds) if reads_input else ''}")
+        lines.append(f"Total: {total:.1f}s{self.throughput(total)}")
+        return lines
+
+    def throughput(self, seconds):
+        if seconds <= 0:
+            return ""
+        parts = []
+        if self.input_bytes:
+            parts.append(f"{self.input_bytes / 1e6 / seconds:.1f} MB/s")
+        if self.input_points:
+            parts.append(f"{self.input_points / 1e6 / seconds:.2f} Mpts/s")
+        return f" ({', '.join(parts)})" if parts else ""
+
+
+def describe(snapshot):
+    """Texto curto para a barra de status da interface"""
+    parts = [snapshot["phase"]]
+    if snapshot["points_per_sec"]:
+        parts.append(f"{snapshot['points_per_sec'] / 1e6:.2f} Mpts/s")
+    if snapshot["bytes_per_sec"]:
+        parts.append(f"{snapshot['bytes_per_sec'] / 1e6:.1f} MB/s")
+    if snapshot["eta"] is not None:
+        parts.append(f"ETA {format_duration(snapshot['eta'])}")
+    return " | ".join(parts)
@@ -0,0 +1,282 @@
+"""Servidor HTTP estático em asyncio para as pastas de saída do Potree.
+
+Alternativa leve ao xampp para visualizar as conversões. Cada conexão é
+atendida por uma corrotina, com keep-alive, então centenas de requisições
+simultâneas do visualizador cabem num único núcleo. O corpo dos arquivos
+vai por ``loop.sendfile`` (os.sendfile no Linux, TransmitFile no Windows),
+sem passar pelo Python.
+
+Suporta GET/HEAD, ``Range`` com uma faixa (o Potree pede cada nó do
+octree.bin assim), ETag forte com ``If-None-Match``/``If-Range`` e
+Cache-Control por tipo de arquivo. Arquivos de texto com versões .br/.gz
+ao lado (ver compactar.py) são negociados pelo ``Accept-Encoding``.
+"""
+import asyncio
+import email.utils
+import mimetypes
+import os
+import re
+import threading
+import urllib.parse
+
+DEFAULT_PORT = 8000
+# Conexões ociosas além disso são fechadas
+KEEP_ALIVE_TIMEOUT = 15
+MAX_HEADER_SIZE = 64 * 1024
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CONTENT_TYPES = {
+    ".bin": "application/octet-stream",
+    ".json": "application/json",
+    ".js": "text/javascript",
+    ".mjs": "text/javascript",
+    ".wasm": "application/wasm",
+}
+# Versões pré-comprimidas procuradas ao lado do arquivo, na ordem de preferência
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE = (".js", ".mjs", ".css", ".json", ".html", ".svg", ".wasm")
+REASONS = {
+    200: "OK", 206: "Partial Content", 304: "Not Modified", 400: "Bad Request",
+    403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 416: "Range Not Satisfiable",
+}
+
+
+def content_type(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in CONTENT_TYPES:
+        return CONTENT_TYPES[extension]
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def cache_control(relative):
+    """libs-<hash> nunca muda de conteúdo; o resto é revalidado pelo ETag.
+
+    Os dados dos nós (octree.bin, hierarchy.bin) mudam quando o projeto é
+    convertido de novo com o mesmo nome, e a URL continua a mesma; por isso
+    não são marcados como imutáveis, mas a revalidação com ETag forte
+    responde 304 sem corpo.
+    """
+    if relative.split("/", 1)[0].startswith("libs-"):
+        return "public, max-age=31536000, immutable"
+    return "no-cache"
+
+
+def etag(stat, encoding=None):
+    if encoding:
+        return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}-{encoding}"'
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def accepted_encodings(header):
+    """Codificações aceitas no ``Accept-Encoding`` (as com q=0 ficam de fora)"""
+    accepted = set()
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        params = params.replace(" ", "").lower()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def negotiate(path, headers):
+    """(codificação, arquivo) a servir: a versão pré-comprimida se o cliente aceitar e ela estiver atualizada.
+
+    Pedidos com Range recebem sempre o original, já que as faixas se
+    referem aos bytes sem compressão que o visualizador espera.
+    """
+    if "range" in headers or "accept-encoding" not in headers:
+        return None, path
+    accepted = accepted_encodings(headers["accept-encoding"])
+    for encoding, suffix in PRECOMPRESSED:
+        if encoding not in accepted and "*" not in accepted:
+            continue
+        try:
+            if os.stat(path + suffix).st_mtime_ns >= os.stat(path).st_mtime_ns:
+                return encoding, path + suffix
+        except OSError:
+            continue
+    return None, path
+
+
+def parse_range(header, size):
+    """(início, fim exclusivo) da faixa pedida; None para o arquivo inteiro; ValueError se insatisfazível"""
+    match = RANGE.match(header.strip())
+    if not match:
+        # Várias faixas ou unidade desconhecida: responde o arquivo inteiro
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        start = max(0, size - int(last))
+        stop = size
+    else:
+        start = int(first)
+        stop = min(size, int(last) + 1) if last else size
+    if start >= size or start >= stop:
+        raise ValueError("faixa fora do arquivo")
+    return start, stop
+
+
+class StaticServer:
+    """Serve os arquivos de ``root``; ``start``/``serve_forever`` no loop atual"""
+
+    def __init__(self, root, host="127.0.0.1", port=DEFAULT_PORT, log=None):
+        self.root = os.path.realpath(root)
+        self.host = host
+        self.port = port
+        self.log = log or (lambda message: None)
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=MAX_HEADER_SIZE)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.log(f"Servindo {self.root} em http://{self.host}:{self.port}/")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def resolve(self, target):
+        """Caminho no disco para a URL pedida, ou None se sair da raiz"""
+        relative = urllib.parse.unquote(urllib.parse.urlsplit(target).path).lstrip("/")
+        path = os.path.realpath(os.path.join(self.root, relative))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return None, relative
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        return path, relative
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                keep_alive = await self.respond(head, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, head, writer):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            await self.send_status(writer, 400, False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        if method not in ("GET", "HEAD"):
+            await self.send_status(writer, 405, keep_alive, {"Allow": "GET, HEAD"})
+            return keep_alive
+
+        path, relative = self.resolve(target)
+        if path is None:
+            await self.send_status(writer, 403, keep_alive)
+            return keep_alive
+        compressible = path.lower().endswith(COMPRESSIBLE)
+        encoding, served = negotiate(path, headers) if compressible else (None, path)
+        try:
+            f = open(served, "rb")
+        except OSError:
+            await self.send_status(writer, 404, keep_alive)
+            return keep_alive
+
+        with f:
+            stat = os.fstat(f.fileno())
+            tag = etag(stat, encoding)
+            response = {
+                "Content-Type": content_type(path),
+                "ETag": tag,
+                "Last-Modified": email.utils.formatdate(stat.st_mtime, usegmt=True),
+                "Cache-Control": cache_control(relative),
+                "Accept-Ranges": "bytes",
+            }
+            if encoding:
+                response["Content-Encoding"] = encoding
+            if compressible:
+                response["Vary"] = "Accept-Encoding"
+            if tag in headers.get("if-none-match", ""):
+                await self.send_status(writer, 304, keep_alive, response)
+                return keep_alive
+
+            status, start, stop = 200, 0, stat.st_size
+            if "range" in headers and headers.get("if-range", tag) == tag:
+                try:
+                    byte_range = parse_range(headers["range"], stat.st_size)
+                except ValueError:
+                    response["Content-Range"] = f"bytes */{stat.st_size}"
+                    await self.send_status(writer, 416, keep_alive, response)
+                    return keep_alive
+                if byte_range is not None:
+                    status, (start, stop) = 206, byte_range
+                    response["Content-Range"] = f"bytes {start}-{stop - 1}/{stat.st_size}"
+
+            response["Content-Length"] = str(stop - start)
+            writer.write(self.status_head(status, keep_alive, response))
+            if method == "GET" and stop > start:
+                await writer.drain()
+                await asyncio.get_running_loop().sendfile(writer.transport, f, start, stop - start)
+            else:
+                await writer.drain()
+        return keep_alive
+
+    def status_head(self, status, keep_alive, headers):
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}", "Server: PotreeConverte",
+                 f"Date: {email.utils.formatdate(usegmt=True)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def send_status(self, writer, status, keep_alive, headers=None):
+        headers = dict(headers or {})
+        if status != 304:
+            headers.setdefault("Content-Length", "0")
+        writer.write(self.status_head(status, keep_alive, headers))
+        await writer.drain()
+
+
+class ServerThread(threading.Thread):
+    """Servidor num loop asyncio próprio, em thread separada (usado pela interface)"""
+
+    def __init__(self, root, host="127.0.0.1", port=DEFAULT_PORT, log=None):
+        super().__init__(daemon=True)
+        self.server = StaticServer(root, host, port, log)
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.error = None
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.server.start())
+        except OSError as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        self.loop.run_forever()
+        self.server.server.close()
+        self.loop.run_until_complete(self.server.server.wait_closed())
+        self.loop.close()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
@@ -0,0 +1,109 @@
+"""Dados sintéticos para os testes: arquivos LAS e saídas Potree 2.0 mínimas.
+
+Os módulos da interface são importados pelo nome (como o PotreeConverte.py
+faz), então a pasta interface/ entra no sys.path.
+"""
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hierarquia  # noqa: E402
+import laspoints  # noqa: E402
+from lasheader import HEADER_STRUCT, VLR_HEADER_STRUCT  # noqa: E402
+
+SCALE = [0.01, 0.01, 0.01]
+# Posição (3 x int32) e intensidade: 14 bytes por ponto
+ATTRIBUTES = [
+    {"name": "position", "description": "", "size": 12, "numElements": 3, "elementSize": 4, "type": "int32",
+     "min": [0, 0, 0], "max": [10, 10, 10]},
+    {"name": "intensity", "description": "", "size": 2, "numElements": 1, "elementSize": 2, "type": "uint16",
+     "min": [0], "max": [65535]},
+]
+
+
+def geokeys_vlr(epsg):
+    """VLR GeoKeyDirectory com ProjectedCSTypeGeoKey = ``epsg``"""
+    data = struct.pack("<8H", 1, 1, 0, 1, 3072, 0, 1, epsg)
+    return VLR_HEADER_STRUCT.pack(0, b"LASF_Projection", 34735, len(data), b"") + data
+
+
+def las_bytes(points, vlrs=b"", vlr_count=None, scale=SCALE, offset=(0.0, 0.0, 0.0)):
+    """Arquivo LAS 1.2 formato 0 com os pontos inteiros ``points`` (N x 3) e os VLRs já empacotados"""
+    records = np.zeros(len(points), dtype=laspoints.POINT_FORMATS[0])
+    for axis, name in enumerate("XYZ"):
+        records[name] = points[:, axis]
+    records["bit_fields"] = 1
+    lo = [int(v) * s + o for v, s, o in zip(points.min(axis=0), scale, offset)]
+    hi = [int(v) * s + o for v, s, o in zip(points.max(axis=0), scale, offset)]
+    if vlr_count is None:
+        vlr_count = 1 if vlrs else 0
+    header = HEADER_STRUCT.pack(
+        b"LASF", 0, 0, bytes(16), 1, 2, b"", b"testes", 1, 2024,
+        HEADER_STRUCT.size, HEADER_STRUCT.size + len(vlrs), vlr_count,
+        0, records.itemsize, len(records), len(records), 0, 0, 0, 0, *scale, *offset,
+        hi[0], lo[0], hi[1], lo[1], hi[2], lo[2],
+    )
+    return header + vlrs + records.tobytes()
+
+
+def write_cloud(folder, origin, size, points, spacing=1.0, attributes=ATTRIBUTES, values=None):
+    """Saída Potree 2.0 com um único nó (a raiz) contendo ``points`` inteiros relativos a ``origin``.
+
+    ``values`` dá o valor de outros atributos por nome; os que faltarem ficam
+    zerados (a intensidade padrão é o índice do ponto).
+    """
+    os.makedirs(folder, exist_ok=True)
+    dtype = hierarquia.point_dtype({"attributes": attributes})
+    data = np.zeros(len(points), dtype)
+    data["position"] = points
+    if "intensity" in dtype.names:
+        data["intensity"] = np.arange(len(points)) % 65536
+    for name, value in (values or {}).items():
+        data[name] = value
+    with open(os.path.join(folder, "octree.bin"), "wb") as f:
+        f.write(data.tobytes())
+
+    root = np.zeros(1, hierarquia.RECORD_DTYPE)
+    root[0] = (hierarquia.LEAF, 0, len(points), 0, data.nbytes)
+    with open(os.path.join(folder, "hierarchy.bin"), "wb") as f:
+        f.write(root.tobytes())
+
+    metadata = {
+        "version": "2.0",
+        "name": os.path.basename(folder),
+        "description": "",
+        "points": len(points),
+        "projection": "",
+        "hierarchy": {"firstChunkSize": root.nbytes, "stepSize": 4, "depth": 0},
+        "offset": list(origin),
+        "scale": SCALE,
+        "spacing": spacing,
+        "boundingBox": {"min": list(origin), "max": [v + size for v in origin]},
+        "encoding": "DEFAULT",
+        "attributes": attributes,
+    }
+    with open(os.path.join(folder, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+    return metadata
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(1234)
+
+
+@pytest.fixture
+def tiles(tmp_path, rng):
+    """Dois blocos de 10 m lado a lado em x, com 300 e 200 pontos: (pastas, posições inteiras)"""
+    # Posições inteiras dentro do cubo (escala 0,01): 0 a 999 em cada eixo
+    points = [rng.integers(0, 1000, size=(n, 3)) for n in (300, 200)]
+    sources = [str(tmp_path / "bloco_0"), str(tmp_path / "bloco_1")]
+    write_cloud(sources[0], (100.0, 200.0, 0.0), 10.0, points[0])
+    write_cloud(sources[1], (110.0, 200.0, 0.0), 10.0, points[1])
+    return sources, points
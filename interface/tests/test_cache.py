@@ -0,0 +1,79 @@
+import itertools
+import os
+
+import pytest
+
+import cache
+
+
+def publish(output_dir, project_name, content):
+    """Simula a saída do PotreeConverter: a nuvem e a página do projeto"""
+    cloud = output_dir / "pointclouds" / project_name
+    cloud.mkdir(parents=True, exist_ok=True)
+    (cloud / "metadata.json").write_text(content, encoding="utf-8")
+    (output_dir / f"{project_name}.html").write_text(f"<html>{project_name}</html>", encoding="utf-8")
+
+
+@pytest.fixture
+def conversion_cache(tmp_path, monkeypatch):
+    # Relógio que sempre avança: a ordem de uso não depende da resolução do time.time()
+    clock = itertools.count(1_000_000)
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(clock)))
+    return cache.ConversionCache(str(tmp_path / "base"), max_bytes=250)
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    (tmp_path / "nuvem.las").write_bytes(b"LASF" + bytes(500))
+    (tmp_path / "PotreeConverter").write_bytes(b"\x7fELF")
+    return str(tmp_path / "nuvem.las"), str(tmp_path / "PotreeConverter")
+
+
+def test_key_follows_content_and_flags(tmp_path, conversion_cache, inputs):
+    las, potree = inputs
+    key = conversion_cache.key([las], potree, ["--generate-page", "a"])
+    assert conversion_cache.key([las], potree, ["--generate-page", "a"]) == key
+    assert conversion_cache.key([las], potree, ["--generate-page", "b"]) != key
+
+    # Mesmo conteúdo em outro caminho: mesma chave
+    copy = tmp_path / "copia.las"
+    copy.write_bytes(open(las, "rb").read())
+    assert conversion_cache.key([str(copy)], potree, ["--generate-page", "a"]) == key
+
+    with open(las, "ab") as f:
+        f.write(b"\1")
+    assert conversion_cache.key([las], potree, ["--generate-page", "a"]) != key
+
+
+def test_miss_then_hit(tmp_path, conversion_cache, inputs):
+    las, potree = inputs
+    key = conversion_cache.key([las], potree, [])
+    output = tmp_path / "saida"
+    assert not conversion_cache.restore(key, str(output), "nuvem")
+
+    publish(output, "nuvem", "{}")
+    conversion_cache.store(key, str(output), "nuvem")
+
+    # Restaurado em outra pasta e com outro nome de projeto
+    other = tmp_path / "outra"
+    assert conversion_cache.restore(key, str(other), "copia")
+    assert (other / "pointclouds" / "copia" / "metadata.json").read_text(encoding="utf-8") == "{}"
+    assert (other / "copia.html").read_text(encoding="utf-8") == "<html>nuvem</html>"
+
+
+def test_least_recently_used_is_evicted(tmp_path, conversion_cache):
+    output = tmp_path / "saida"
+    # Cada entrada ocupa 100 bytes da nuvem mais a página; o limite de 250 comporta duas
+    for key in ("a", "b"):
+        publish(output, key, "x" * 100)
+        conversion_cache.store(key, str(output), key)
+    # "a" é usada de novo e passa a ser a mais recente
+    assert conversion_cache.restore("a", str(tmp_path / "restaurada"), "a")
+
+    publish(output, "c", "x" * 100)
+    conversion_cache.store("c", str(output), "c")
+
+    assert conversion_cache.restore("a", str(tmp_path / "r"), "a")
+    assert conversion_cache.restore("c", str(tmp_path / "r"), "c")
+    assert not conversion_cache.restore("b", str(tmp_path / "r"), "b")
+    assert not os.path.exists(os.path.join(conversion_cache.root, "b"))
@@ -0,0 +1,95 @@
+import gzip
+import os
+
+import compactar
+import conversao
+import pagina
+
+# Texto repetitivo: comprime bem e passa do tamanho mínimo
+TEXT = "viewer.setPointBudget(1000000);\n" * 200
+
+
+def write(path, text=TEXT):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def test_compress_file_keeps_siblings_fresh(tmp_path):
+    path = write(str(tmp_path / "potree.js"))
+    original, compressed = compactar.compress_file(path)
+    assert original == len(TEXT) and compressed < original
+    assert gzip.decompress(open(path + ".gz", "rb").read()).decode() == TEXT
+
+    # Original reescrito depois da compressão: a versão .gz é refeita
+    write(path, TEXT * 2)
+    os.utime(path, ns=(os.stat(path + ".gz").st_mtime_ns + 10**9,) * 2)
+    compactar.compress_file(path)
+    assert gzip.decompress(open(path + ".gz", "rb").read()).decode() == TEXT * 2
+
+
+def test_small_and_incompressible_files_are_skipped(tmp_path):
+    small = write(str(tmp_path / "pequeno.js"), "var a = 1;")
+    noise = str(tmp_path / "ruido.json")
+    with open(noise, "wb") as f:
+        f.write(os.urandom(4096))
+    assert compactar.compress_file(small) == (0, 0)
+    compactar.compress_file(noise)
+    assert not os.path.exists(small + ".gz")
+    assert not os.path.exists(noise + ".gz")
+
+
+def test_discard(tmp_path):
+    cloud = tmp_path / "pointclouds" / "nuvem"
+    metadata = write(str(cloud / "metadata.json"))
+    page = write(str(tmp_path / "nuvem.html"))
+    compactar.compress_paths([str(cloud), page])
+    # .gz sem o original ao lado não é uma versão comprimida; fica
+    write(str(cloud / "dados.gz"), "x")
+
+    assert compactar.discard([str(cloud), page]) == 2
+    assert sorted(os.listdir(cloud)) == ["dados.gz", "metadata.json"]
+    assert not os.path.exists(page + ".gz")
+    assert os.path.exists(metadata)
+
+
+def test_job_precompresses_only_its_own_files(tmp_path):
+    output = tmp_path / "saida"
+    potree = tmp_path / "conversor" / "PotreeConverter"
+    write(str(potree.parent / "resources" / "page_template" / "libs" / "potree.js"))
+    write(str(output / "pointclouds" / "nuvem" / "metadata.json"))
+    write(str(output / "nuvem.html"))
+    write(str(output / "libs" / "potree.js"))
+    # Outra nuvem, que outro job pode estar escrevendo
+    other = write(str(output / "pointclouds" / "outra" / "metadata.json"))
+
+    config = {"lastools": "las2las", "potree": str(potree), "precompress": True}
+    job = conversao.ConversionJob(str(tmp_path / "nuvem.las"), str(output), "nuvem", config)
+    messages = []
+    for _, command, *_ in conversao.publish_steps(job):
+        command(messages.append)
+
+    assert os.path.exists(output / "pointclouds" / "nuvem" / "metadata.json.gz")
+    assert os.path.exists(output / "nuvem.html.gz")
+    assert os.path.exists(output / "libs" / "potree.js.gz")
+    assert os.path.exists(output / ".htaccess")
+    assert not os.path.exists(other + ".gz")
+    assert messages and messages[0].startswith("3 arquivos comprimidos")
+
+
+def test_job_precompresses_its_shared_libs(tmp_path):
+    output = tmp_path / "saida"
+    potree = tmp_path / "conversor" / "PotreeConverter"
+    libs = potree.parent / "resources" / "page_template" / "libs"
+    write(str(libs / "potree.js"))
+    name = pagina.deploy_libs(str(libs), str(output))
+    write(str(output / "libs" / "antiga.js"))
+
+    config = {"lastools": "las2las", "potree": str(potree), "precompress": True, "shared_libs": True}
+    job = conversao.ConversionJob(str(tmp_path / "nuvem.las"), str(output), "nuvem", config)
+    for _, command, *_ in conversao.publish_steps(job):
+        command(lambda message: None)
+
+    assert os.path.exists(output / name / "potree.js.gz")
+    assert not os.path.exists(output / "libs" / "antiga.js.gz")
@@ -0,0 +1,106 @@
+import sys
+import threading
+import time
+
+import pytest
+
+import conversao
+from conftest import las_bytes
+
+
+def python_command(code):
+    return [sys.executable, "-c", code]
+
+
+def engine_with_results(**kwargs):
+    results = {}
+    lines = []
+    engine = conversao.ConversionEngine(on_output=lines.append,
+                                        on_finished=lambda job_id, ok: results.__setitem__(job_id, ok), **kwargs)
+    return engine, results, lines
+
+
+def test_steps_run_in_order():
+    engine, results, lines = engine_with_results()
+    job = engine.submit("a", [
+        ("Primeira", lambda log: log("python")),
+        ("Segunda", python_command("print('processo')")),
+    ])
+    engine.wait()
+    assert results == {job: True}
+    assert lines.index("[a] python") < lines.index("[a] processo")
+
+
+def test_no_process_starts_after_shutdown(tmp_path):
+    marker = tmp_path / "rodou"
+    engine, results, lines = engine_with_results()
+    # A etapa Python encerra o engine; o processo da etapa seguinte não pode começar
+    job = engine.submit("a", [
+        ("Estatísticas", lambda log: engine.shutdown()),
+        ("Conversão", python_command(f"open({str(marker)!r}, 'w').close()")),
+    ])
+    engine.wait()
+    assert results == {job: False}
+    assert not marker.exists()
+    assert "[a] Conversão cancelada." in lines
+
+
+def test_shutdown_kills_running_process():
+    engine, results, lines = engine_with_results()
+    started = threading.Event()
+    job = engine.submit("a", [
+        ("Início", lambda log: started.set()),
+        ("Conversão", python_command("import time; print('rodando', flush=True); time.sleep(60)")),
+    ])
+    started.wait(10)
+    while "[a] rodando" not in lines:
+        time.sleep(0.05)
+    engine.shutdown()
+    engine.wait()
+    assert results == {job: False}
+    assert "[a] Conversão cancelada." in lines
+    assert not any("retornou código" in line for line in lines)
+
+
+def test_shutdown_cancels_jobs_of_replaced_executor():
+    engine, results, _ = engine_with_results()
+    release = threading.Event()
+
+    def hold(log):
+        release.wait(10)
+
+    first = engine.submit("a", [("Espera", hold)])
+    queued = engine.submit("b", [("Nunca", lambda log: None)])
+    # O job "b" continua na fila do executor antigo
+    engine.set_max_workers(2)
+    engine.shutdown()
+    release.set()
+    engine.wait()
+    assert results == {first: True}
+    assert queued not in results
+
+
+def test_tiled_merge_rejects_uncompressed(tmp_path, rng):
+    las_file = tmp_path / "cidade.las"
+    las_file.write_bytes(las_bytes(rng.integers(0, 100_000, size=(1000, 3))))
+    config = {"lastools": "las2las", "potree": "PotreeConverter", "tiles": 8, "preset": "bruto",
+              "presets": {"bruto": {"encoding": "UNCOMPRESSED"}}}
+
+    job = conversao.ConversionJob(str(las_file), str(tmp_path / "saida"), "cidade", config)
+    with pytest.raises(ValueError, match="UNCOMPRESSED"):
+        conversao.plan_steps(job, conversao.JobLog(lambda message: None))
+
+    # No engine o job termina com erro antes de dividir o arquivo
+    engine, results, lines = engine_with_results()
+    steps = conversao.conversion_job(str(las_file), str(tmp_path / "saida"), "cidade", config)
+    job_id = engine.submit("cidade", steps)
+    engine.wait()
+    assert results == {job_id: False}
+    assert any("UNCOMPRESSED" in line for line in lines)
+    assert not any("blocos gerados" in line for line in lines)
+
+    # Sem a junção os blocos são convertidos separados, em UNCOMPRESSED
+    job = conversao.ConversionJob(str(las_file), str(tmp_path / "saida"), "cidade", dict(config, merge_tiles=False))
+    steps = conversao.plan_steps(job, conversao.JobLog(lambda message: None))
+    assert "UNCOMPRESSED" in job.converter_flags
+    assert steps[0][0] == "Dividindo em blocos..."
@@ -0,0 +1,126 @@
+import numpy as np
+
+import extrair
+import lasheader
+import laspoints
+import mesclar
+import validar
+from conftest import write_cloud
+
+
+def test_extract_merged(tmp_path, tiles):
+    sources, points = tiles
+    output = str(tmp_path / "junta")
+    mesclar.merge(sources, output, "junta")
+    assert validar.validate(output, 500)[0] == []
+
+    las = str(tmp_path / "tudo.las")
+    assert extrair.extract(output, las) == 500
+    header = lasheader.read_header(las)
+    assert header.point_count == 500
+    assert lasheader.check_file(las) == []
+
+    # As coordenadas voltam exatamente às dos blocos
+    extracted = next(iter(laspoints.iter_points(las, header)))
+    xyz = np.round(laspoints.coordinates(extracted, header), 2)
+    expected = np.concatenate([
+        points[0] * 0.01 + (100.0, 200.0, 0.0),
+        points[1] * 0.01 + (110.0, 200.0, 0.0),
+    ])
+    assert sorted(map(tuple, xyz)) == sorted(map(tuple, np.round(expected, 2)))
+
+
+def test_extract_box(tmp_path, tiles):
+    sources, points = tiles
+    output = str(tmp_path / "junta")
+    mesclar.merge(sources, output, "junta")
+
+    # Só o primeiro bloco: x até 109,995 deixa de fora o x = 110,00 do segundo
+    box = (100.0, 200.0, 0.0, 109.995, 210.0, 10.0)
+    assert extrair.extract(output, str(tmp_path / "bloco.las"), box=box) == 300
+
+    half = (100.0, 200.0, 0.0, 120.0, 205.0, 10.0)
+    expected = sum(int(np.count_nonzero(p[:, 1] <= 500)) for p in points)
+    assert extrair.extract(output, str(tmp_path / "metade.las"), box=half) == expected
+
+
+def test_extract_polygon(tmp_path, tiles):
+    sources, points = tiles
+    output = str(tmp_path / "junta")
+    mesclar.merge(sources, output, "junta")
+
+    # Triângulo sobre o primeiro bloco: x - 100 < y - 200
+    polygon = [(100.0, 200.0), (110.0, 210.0), (100.0, 210.0)]
+    count = extrair.extract(output, str(tmp_path / "triangulo.las"), polygon=polygon)
+    assert count == int(np.count_nonzero(points[0][:, 0] < points[0][:, 1]))
+
+
+def attribute(name, kind, size, count=1):
+    return {"name": name, "description": "", "size": size, "numElements": count, "elementSize": size // count,
+            "type": kind}
+
+
+# Atributos como o PotreeConverter os grava para LAS de formato 1 (legado) e 6 (estendido)
+LEGACY_ATTRIBUTES = [
+    attribute("position", "int32", 12, 3), attribute("intensity", "uint16", 2),
+    attribute("return number", "uint8", 1), attribute("number of returns", "uint8", 1),
+    attribute("classification", "uint8", 1), attribute("scan angle rank", "int8", 1),
+    attribute("user data", "uint8", 1), attribute("point source id", "uint16", 2),
+    attribute("gps-time", "double", 8),
+]
+EXTENDED_ATTRIBUTES = [
+    attribute("position", "int32", 12, 3), attribute("intensity", "uint16", 2),
+    attribute("return number", "uint8", 1), attribute("number of returns", "uint8", 1),
+    attribute("classification flags", "uint8", 1), attribute("classification", "uint8", 1),
+    attribute("user data", "uint8", 1), attribute("scan angle", "int16", 2),
+    attribute("point source id", "uint16", 2), attribute("gps-time", "double", 8),
+]
+
+
+def extract_single(tmp_path, attributes, values, count):
+    folder = str(tmp_path / "nuvem")
+    positions = np.stack([np.arange(count)] * 3, axis=1)
+    write_cloud(folder, (0.0, 0.0, 0.0), 10.0, positions, attributes=attributes, values=values)
+    las = str(tmp_path / "nuvem.las")
+    assert extrair.extract(folder, las) == count
+    header = lasheader.read_header(las)
+    return header, np.concatenate(list(laspoints.iter_points(las, header)))
+
+
+def test_legacy_attributes_roundtrip(tmp_path):
+    values = {
+        "return number": [1, 2, 3, 1], "number of returns": [3, 3, 3, 1],
+        "classification": [2, 5, 6, 9], "scan angle rank": [-90, -12, 0, 45],
+        "user data": [7, 8, 9, 10], "point source id": [11, 12, 13, 14],
+        "gps-time": [1.5, 2.5, 3.5, 4.5],
+    }
+    header, points = extract_single(tmp_path, LEGACY_ATTRIBUTES, values, 4)
+
+    assert header.point_format == 1
+    assert laspoints.return_numbers(points, header).tolist() == values["return number"]
+    assert (points["bit_fields"] >> 3 & 0x07).tolist() == values["number of returns"]
+    assert laspoints.classifications(points, header).tolist() == values["classification"]
+    assert points["scan_angle_rank"].tolist() == values["scan angle rank"]
+    assert points["user_data"].tolist() == values["user data"]
+    assert points["point_source_id"].tolist() == values["point source id"]
+    assert points["gps_time"].tolist() == values["gps-time"]
+    assert header.points_by_return == [2, 1, 1, 0, 0]
+
+
+def test_extended_attributes_to_legacy(tmp_path):
+    values = {
+        # Retornos acima de 7 só existem nos formatos 6+
+        "return number": [1, 7, 9, 15], "number of returns": [2, 8, 12, 15],
+        "classification": [2, 6, 9, 17],
+        # Ângulo em unidades de 0,006 grau: -180°, -30°, 0,006° e 12°
+        "scan angle": [-30000, -5000, 1, 2000],
+        "gps-time": [10.0, 11.0, 12.0, 13.0],
+    }
+    header, points = extract_single(tmp_path, EXTENDED_ATTRIBUTES, values, 4)
+
+    assert header.point_format == 1
+    assert laspoints.return_numbers(points, header).tolist() == [1, 7, 7, 7]
+    assert (points["bit_fields"] >> 3 & 0x07).tolist() == [2, 7, 7, 7]
+    assert points["scan_angle_rank"].tolist() == [-90, -30, 0, 12]
+    assert laspoints.classifications(points, header).tolist() == values["classification"]
+    assert points["gps_time"].tolist() == values["gps-time"]
@@ -0,0 +1,101 @@
+import json
+
+import numpy as np
+import pytest
+
+import hierarquia
+from conftest import write_cloud
+from hierarquia import LEAF, NORMAL, PROXY, RECORD_DTYPE
+
+
+def write_hierarchy(folder, chunks, first_chunk_size):
+    """Substitui o hierarchy.bin de ``folder`` pelos chunks dados e ajusta o metadata.json"""
+    with open(folder / "hierarchy.bin", "wb") as f:
+        for records in chunks:
+            f.write(np.array(records, RECORD_DTYPE).tobytes())
+    metadata = json.loads((folder / "metadata.json").read_text(encoding="utf-8"))
+    metadata["hierarchy"]["firstChunkSize"] = first_chunk_size
+    metadata["points"] = sum(r[2] for records in chunks for r in records if r[0] != PROXY)
+    (folder / "metadata.json").write_text(json.dumps(metadata), encoding="utf-8")
+
+
+@pytest.fixture
+def cloud(tmp_path):
+    """Raiz com filhos r0 (folha) e r7 (proxy para um segundo chunk com r7 e o filho r71)"""
+    folder = tmp_path / "nuvem"
+    write_cloud(str(folder), (0.0, 0.0, 0.0), 8.0, np.zeros((0, 3)))
+    item = RECORD_DTYPE.itemsize
+    first = [
+        (NORMAL, 1 << 0 | 1 << 7, 100, 0, 1400),
+        (LEAF, 0, 20, 1400, 280),
+        (PROXY, 1 << 1, 30, 3 * item, 2 * item),
+    ]
+    second = [
+        (NORMAL, 1 << 1, 30, 1680, 420),
+        (LEAF, 0, 5, 2100, 70),
+    ]
+    write_hierarchy(folder, [first, second], len(first) * item)
+    return folder
+
+
+def test_hierarchy_decoder(cloud):
+    index = hierarquia.HierarchyIndex(str(cloud))
+
+    assert len(index) == 4
+    assert index.chunk_count == 2
+    assert [index.name(node) for node in range(len(index))] == ["r", "r0", "r7", "r71"]
+    assert index.levels.tolist() == [0, 1, 1, 2]
+    assert index.positions.tolist() == [[0, 0, 0], [0, 0, 0], [1, 1, 1], [2, 2, 3]]
+    # O proxy é trocado pelo registro do nó no chunk seguinte
+    assert index.types.tolist() == [NORMAL, LEAF, NORMAL, LEAF]
+    assert index.byte_offsets.tolist() == [0, 1400, 1680, 2100]
+    assert index.points_per_level().tolist() == [100, 50, 5]
+    assert index.nodes_per_level().tolist() == [1, 2, 1]
+
+    np.testing.assert_allclose(index.node_mins[3], [4, 4, 6])
+    np.testing.assert_allclose(index.node_sizes[3], [2, 2, 2])
+
+
+def test_query_box(cloud):
+    index = hierarquia.HierarchyIndex(str(cloud))
+    names = lambda nodes: sorted(index.name(node) for node in nodes)  # noqa: E731
+
+    assert names(index.query_box((5, 5, 7), (5, 5, 7))) == ["r", "r7", "r71"]
+    assert names(index.query_box((1, 1, 1), (2, 2, 2))) == ["r", "r0"]
+    assert names(index.query_box((5, 5, 7), (5, 5, 7), max_level=1)) == ["r", "r7"]
+    assert names(index.query_box((20, 20, 20), (30, 30, 30))) == []
+
+
+def test_proxy_outside_file(cloud):
+    item = RECORD_DTYPE.itemsize
+    write_hierarchy(cloud, [[
+        (NORMAL, 1 << 7, 0, 0, 0),
+        (PROXY, 0, 0, 10 * item, item),
+    ]], 2 * item)
+
+    with pytest.raises(ValueError, match="fora do arquivo"):
+        hierarquia.HierarchyIndex(str(cloud))
+
+
+def test_inconsistent_child_mask(cloud):
+    item = RECORD_DTYPE.itemsize
+    # A raiz diz ter dois filhos, mas o chunk só traz um
+    write_hierarchy(cloud, [[
+        (NORMAL, 1 << 0 | 1 << 1, 0, 0, 0),
+        (LEAF, 0, 1, 0, 14),
+    ]], 2 * item)
+
+    with pytest.raises(ValueError, match="inconsistente"):
+        hierarquia.HierarchyIndex(str(cloud))
+
+
+def test_point_dtype():
+    metadata = {"attributes": [
+        {"name": "position", "size": 12, "numElements": 3, "type": "int32"},
+        {"name": "rgb", "size": 6, "numElements": 3, "type": "uint16"},
+        {"name": "desconhecido", "size": 3, "type": "int24"},
+    ]}
+    dtype = hierarquia.point_dtype(metadata)
+    assert dtype.itemsize == hierarquia.point_size(metadata) == 21
+    assert dtype["position"].shape == (3,)
+    assert dtype["desconhecido"].kind == "V"
@@ -0,0 +1,89 @@
+import struct
+
+import numpy as np
+import pytest
+
+import lasheader
+from conftest import SCALE, geokeys_vlr, las_bytes
+from lasheader import EVLR_STRUCT, HEADER_STRUCT, VLR_HEADER_STRUCT
+
+
+def write(tmp_path, data, name="nuvem.las"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_header_roundtrip(tmp_path, rng):
+    points = rng.integers(0, 100_000, size=(500, 3))
+    path = write(tmp_path, las_bytes(points, geokeys_vlr(31983), offset=(300_000.0, 7_000_000.0, 0.0)))
+
+    header = lasheader.read_header(path)
+    assert header.version == (1, 2)
+    assert header.point_format == 0
+    assert header.point_record_length == 20
+    assert header.point_count == 500
+    assert header.points_by_return == [500, 0, 0, 0, 0]
+    assert header.scale == tuple(SCALE)
+    assert header.min[0] == pytest.approx(300_000 + points[:, 0].min() * 0.01)
+    assert header.max[1] == pytest.approx(7_000_000 + points[:, 1].max() * 0.01)
+    assert header.generating_software == "testes"
+    assert header.crs == "EPSG:31983"
+
+    vlr = header.find_vlr("LASF_Projection", 34735)
+    assert vlr.data_offset == HEADER_STRUCT.size + VLR_HEADER_STRUCT.size
+    assert vlr.data_length == 16
+    assert lasheader.check_file(path) == []
+
+
+def test_stale_bbox_and_missing_points(tmp_path, rng):
+    points = rng.integers(0, 1000, size=(100, 3))
+    data = bytearray(las_bytes(points))
+    # max x no cabeçalho além dos pontos
+    struct.pack_into("<d", data, 179, 1e6)
+    path = write(tmp_path, bytes(data[:-20 * 10]))
+
+    kinds = {kind for kind, _ in lasheader.check_file(path)}
+    assert kinds == {"counts"}
+
+    path = write(tmp_path, bytes(data), "bbox.las")
+    assert [kind for kind, _ in lasheader.check_file(path)] == ["bbox"]
+
+
+def test_truncated_vlr(tmp_path):
+    # VLR declara 1000 bytes de dados, mas o arquivo termina 10 bytes depois do cabeçalho dele
+    vlr = VLR_HEADER_STRUCT.pack(0, b"LASF_Projection", 34735, 1000, b"") + bytes(10)
+    path = write(tmp_path, las_bytes(np.zeros((1, 3), dtype=np.int64), vlr)[:HEADER_STRUCT.size + len(vlr)])
+
+    with pytest.raises(ValueError, match="passa do fim do arquivo"):
+        lasheader.read_header(path)
+    assert [kind for kind, _ in lasheader.check_file(path)] == ["header"]
+
+
+def test_truncated_las14_header(tmp_path):
+    data = bytearray(HEADER_STRUCT.size + 8)
+    HEADER_STRUCT.pack_into(data, 0, b"LASF", 0, 0, bytes(16), 1, 4, b"", b"", 1, 2024,
+                            375, 375, 0, 6, 30, 0, 0, 0, 0, 0, 0, *SCALE, 0, 0, 0, 1, 0, 1, 0, 1, 0)
+    path = write(tmp_path, bytes(data))
+
+    with pytest.raises(ValueError, match="LAS 1.4 truncado"):
+        lasheader.read_header(path)
+
+
+def test_las14_point_count(tmp_path):
+    data = bytearray(375)
+    HEADER_STRUCT.pack_into(data, 0, b"LASF", 0, 0, bytes(16), 1, 4, b"", b"", 1, 2024,
+                            375, 375, 0, 6, 30, 0, 0, 0, 0, 0, 0, *SCALE, 0, 0, 0, 1, 0, 1, 0, 1, 0)
+    EVLR_STRUCT.pack_into(data, 235, 0, 0, 5_000_000_000, 5_000_000_000, *[0] * 14)
+    path = write(tmp_path, bytes(data))
+
+    header = lasheader.read_header(path)
+    assert header.legacy_point_count == 0
+    assert header.point_count == 5_000_000_000
+    assert header.points_by_return[0] == 5_000_000_000
+
+
+def test_not_las(tmp_path):
+    path = write(tmp_path, b"PK" + bytes(300), "outro.zip")
+    with pytest.raises(ValueError, match="não é um arquivo LAS"):
+        lasheader.read_header(path)
@@ -0,0 +1,67 @@
+import struct
+
+import pytest
+
+import lasheader
+import lasrepair
+from conftest import geokeys_vlr, las_bytes
+
+OFFSET = (350_000.0, 7_390_000.0, 700.0)
+
+
+@pytest.fixture
+def stale(tmp_path, rng):
+    """LAS com o bbox do cabeçalho maior que o dos pontos (como após um recorte sem -repair_bb)"""
+    points = rng.integers(-50_000, 50_000, size=(1000, 3))
+    data = bytearray(las_bytes(points, geokeys_vlr(31983), offset=OFFSET))
+    struct.pack_into("<6d", data, lasrepair.BOUNDS_OFFSET, 360_000, 340_000, 7_400_000, 7_380_000, 900, 500)
+    path = tmp_path / "recorte.las"
+    path.write_bytes(bytes(data))
+    return str(path), points, bytes(data)
+
+
+def test_patch_matches_repair_bb(stale):
+    path, points, original = stale
+    assert [kind for kind, _ in lasheader.check_file(path)] == ["bbox"] * 3
+    assert lasrepair.can_patch(path, lasheader.check_file(path))
+
+    lo, hi = lasrepair.patch_bounds(path)
+
+    # O -repair_bb grava os extremos quantizados dos pontos: inteiro * escala + offset
+    expected_lo = [int(v) * 0.01 + o for v, o in zip(points.min(axis=0), OFFSET)]
+    expected_hi = [int(v) * 0.01 + o for v, o in zip(points.max(axis=0), OFFSET)]
+    header = lasheader.read_header(path)
+    assert list(header.min) == expected_lo == lo
+    assert list(header.max) == expected_hi == hi
+    assert lasheader.check_file(path) == []
+
+    # Só os 48 bytes do bbox mudam; VLRs e pontos ficam intactos
+    patched = open(path, "rb").read()
+    end = lasrepair.BOUNDS_OFFSET + lasrepair.BOUNDS_STRUCT.size
+    assert len(patched) == len(original)
+    assert patched[:lasrepair.BOUNDS_OFFSET] == original[:lasrepair.BOUNDS_OFFSET]
+    assert patched[end:] == original[end:]
+
+
+def test_patch_to_copy_keeps_source(tmp_path, stale):
+    path, _, original = stale
+    target = str(tmp_path / "recorte_fixed.las")
+    lasrepair.patch_bounds(path, target)
+
+    assert open(path, "rb").read() == original
+    assert lasheader.check_file(target) == []
+
+
+def test_only_bbox_problems_are_patched(tmp_path, stale):
+    path, _, original = stale
+    assert not lasrepair.can_patch(path, [("bbox", ""), ("counts", "")])
+    assert not lasrepair.can_patch(path, [])
+
+    # LAZ (bit 7 do formato de ponto): os pontos não podem ser lidos aqui
+    laz = bytearray(original)
+    laz[104] |= 0x80
+    (tmp_path / "recorte.laz").write_bytes(bytes(laz))
+    assert not lasrepair.can_patch(str(tmp_path / "recorte.laz"), [("bbox", "")])
+    with pytest.raises(ValueError, match="LAZ"):
+        lasrepair.patch_bounds(str(tmp_path / "recorte.laz"))
+
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pytest
+
+import hierarquia
+import mesclar
+from conftest import write_cloud
+
+
+def merged_points(folder):
+    """Coordenadas reais de todos os pontos de uma nuvem, lidas nó a nó do octree.bin"""
+    index = hierarquia.HierarchyIndex(folder)
+    dtype = hierarquia.point_dtype(index.metadata)
+    octree = np.fromfile(os.path.join(folder, "octree.bin"), dtype=np.uint8)
+    parts = []
+    for node in np.flatnonzero(index.num_points):
+        start = int(index.byte_offsets[node])
+        points = octree[start:start + int(index.byte_sizes[node])].view(dtype)
+        parts.append(points["position"] * index.metadata["scale"] + index.metadata["offset"])
+    return np.concatenate(parts)
+
+
+def test_merge(tmp_path, tiles):
+    sources, points = tiles
+    output = str(tmp_path / "junta")
+    metadata = mesclar.merge(sources, output, "junta")
+
+    assert metadata["points"] == 500
+    assert metadata["boundingBox"]["min"] == [100.0, 200.0, 0.0]
+    assert metadata["boundingBox"]["max"] == [120.0, 220.0, 20.0]
+
+    index = hierarquia.HierarchyIndex(output)
+    assert int(index.num_points.sum()) == 500
+    # Cada bloco entra como filho da nova raiz, na célula da sua posição
+    assert sorted(index.name(node) for node in np.flatnonzero(index.num_points)) == ["r0", "r4"]
+
+    # As posições deslocadas para o offset da raiz voltam às coordenadas dos blocos
+    expected = np.concatenate([
+        points[0] * 0.01 + (100.0, 200.0, 0.0),
+        points[1] * 0.01 + (110.0, 200.0, 0.0),
+    ])
+    xyz = merged_points(output)
+    assert sorted(map(tuple, np.round(xyz, 2))) == sorted(map(tuple, np.round(expected, 2)))
+
+
+def test_merge_rejects_misaligned(tmp_path, rng):
+    sources = [str(tmp_path / "a"), str(tmp_path / "b")]
+    write_cloud(sources[0], (0.0, 0.0, 0.0), 10.0, rng.integers(0, 1000, size=(10, 3)))
+    write_cloud(sources[1], (5.0, 0.0, 0.0), 10.0, rng.integers(0, 1000, size=(10, 3)))
+
+    with pytest.raises(ValueError, match="não alinhado"):
+        mesclar.merge(sources, str(tmp_path / "junta"), "junta")
@@ -0,0 +1,99 @@
+import math
+import os
+import stat
+import sys
+
+import pytest
+
+import pagina
+
+
+@pytest.fixture
+def libs(tmp_path):
+    folder = tmp_path / "libs"
+    (folder / "potree").mkdir(parents=True)
+    (folder / "potree" / "potree.js").write_text("// potree", encoding="utf-8")
+    (folder / "three.js").write_text("// three", encoding="utf-8")
+    return folder
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="modos POSIX")
+def test_deploy_libs_is_readable_by_the_web_server(tmp_path, libs):
+    umask = os.umask(0o022)
+    try:
+        name = pagina.deploy_libs(str(libs), str(tmp_path / "saida"))
+    finally:
+        os.umask(umask)
+
+    target = tmp_path / "saida" / name
+    assert stat.S_IMODE(os.stat(target).st_mode) == 0o755
+    assert stat.S_IMODE(os.stat(target / "potree").st_mode) == 0o755
+
+
+def test_deploy_libs_once_per_content(tmp_path, libs):
+    output = tmp_path / "saida"
+    name = pagina.deploy_libs(str(libs), str(output))
+    assert name.startswith("libs-")
+    assert (output / name / "potree" / "potree.js").read_text(encoding="utf-8") == "// potree"
+    assert pagina.deploy_libs(str(libs), str(output)) == name
+    # Nenhuma pasta de montagem sobra ao lado
+    assert sorted(os.listdir(output)) == [name]
+
+    (libs / "three.js").write_text("// three r2", encoding="utf-8")
+    assert pagina.deploy_libs(str(libs), str(output)) != name
+
+
+def metadata(points, size=(100.0, 100.0, 10.0), rgb=False, depth=5):
+    attributes = [{"name": "position"}] + ([{"name": "rgb"}] if rgb else [])
+    return {"points": points, "attributes": attributes, "hierarchy": {"depth": depth},
+            "boundingBox": {"min": [0.0, 0.0, 0.0], "max": list(size)}}
+
+
+def test_point_budget_follows_cloud_size():
+    small = pagina.viewer_settings([metadata(1_000_000)])
+    assert small["point_budget"] == 1_300_000
+    assert small["min_node_size"] == pagina.MIN_NODE_SIZE // 3
+    # Nuvens pequenas em vários arquivos somam os pontos
+    assert pagina.viewer_settings([metadata(100_000)] * 2)["point_budget"] == pagina.DEFAULT_POINT_BUDGET // 4
+
+    medium = pagina.viewer_settings([metadata(20_000_000)])
+    assert medium["point_budget"] == pagina.DEFAULT_POINT_BUDGET
+    assert medium["min_node_size"] == pagina.MIN_NODE_SIZE
+
+    huge = pagina.viewer_settings([metadata(200_000_000, depth=9)])
+    assert huge["point_budget"] == pagina.HUGE_POINT_BUDGET
+    assert huge["min_node_size"] == pagina.MIN_NODE_SIZE * 2
+
+
+def test_edl_off_only_for_huge_colored_clouds():
+    assert pagina.viewer_settings([metadata(200_000_000)])["edl"]
+    assert pagina.viewer_settings([metadata(1_000_000, rgb=True)])["edl"]
+    assert not pagina.viewer_settings([metadata(200_000_000, rgb=True)])["edl"]
+    # Uma nuvem sem cor no meio mantém o EDL
+    assert pagina.viewer_settings([metadata(150_000_000, rgb=True), metadata(50_000_000)])["edl"]
+
+
+def test_pitch_follows_extent():
+    assert pagina.viewer_settings([metadata(1000, size=(500.0, 300.0, 20.0))])["pitch"] == -math.pi / 3
+    assert pagina.viewer_settings([metadata(1000, size=(30.0, 30.0, 40.0))])["pitch"] == -math.pi / 6
+
+
+def test_apply_settings_replaces_fixed_lines():
+    html = ("<script>\r\n"
+            "\t\tviewer.setEDLEnabled(true);\r\n"
+            "\t\tviewer.setFOV(60);\r\n"
+            "\t\tviewer.setPointBudget(1*1000*1000);\r\n"
+            "\t\tviewer.setBackground(\"skybox\");\r\n"
+            f"\t\t{pagina.SETTINGS_ANCHOR}\r\n"
+            "</script>")
+    tuned = pagina.apply_settings(html, [metadata(200_000_000, rgb=True)])
+
+    assert "1*1000*1000" not in tuned and "setEDLEnabled(true)" not in tuned
+    assert 'viewer.setBackground("skybox");' in tuned
+    # Calculadas logo antes da leitura da URL, que ainda pode sobrescrevê-las
+    script = pagina.settings_script(pagina.viewer_settings([metadata(200_000_000, rgb=True)]))
+    assert script + pagina.SETTINGS_ANCHOR in tuned
+    assert tuned.count("setPointBudget(") == 1 and "setEDLEnabled(false)" in tuned
+
+    # Modelo sem a âncora: página intacta
+    assert pagina.apply_settings("<html></html>", [metadata(1000)]) == "<html></html>"
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+import servidor
+
+
+async def request(port, target, headers=None, method="GET"):
+    """(status, cabeçalhos, corpo) de uma requisição com Connection: close"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    lines = [f"{method} {target} HTTP/1.1", "Host: localhost", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split(" ")[1])
+    response = {}
+    for line in head[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            response[name.strip().lower()] = value.strip()
+    body = await reader.read()
+    writer.close()
+    return status, response, body
+
+
+@pytest.fixture
+def site(tmp_path):
+    root = tmp_path / "site"
+    (root / "nuvem").mkdir(parents=True)
+    (root / "nuvem" / "octree.bin").write_bytes(bytes(range(256)) * 4)
+    (root / "index.html").write_text("<html></html>", encoding="utf-8")
+    (tmp_path / "segredo.txt").write_text("fora da raiz", encoding="utf-8")
+    return root
+
+
+def serve(site, *requests):
+    """Sobe o servidor numa porta livre e devolve as respostas das requisições (target, cabeçalhos)"""
+    async def run():
+        server = servidor.StaticServer(str(site), port=0)
+        await server.start()
+        try:
+            return [await request(server.port, target, headers) for target, headers in requests]
+        finally:
+            server.server.close()
+            await server.server.wait_closed()
+    return asyncio.run(run())
+
+
+def test_range(site):
+    data = (site / "nuvem" / "octree.bin").read_bytes()
+    (status, headers, body), (suffix_status, _, suffix) = serve(
+        site, ("/nuvem/octree.bin", {"Range": "bytes=100-199"}), ("/nuvem/octree.bin", {"Range": "bytes=-24"}))
+
+    assert status == 206
+    assert headers["content-range"] == "bytes 100-199/1024"
+    assert headers["content-length"] == "100"
+    assert body == data[100:200]
+    assert suffix_status == 206
+    assert suffix == data[-24:]
+
+
+def test_full_file_and_etag(site):
+    (status, headers, body), = serve(site, ("/nuvem/octree.bin", {}))
+    assert status == 200
+    assert headers["accept-ranges"] == "bytes"
+    assert len(body) == 1024
+
+    (status, _, body), (stale, _, _) = serve(
+        site, ("/nuvem/octree.bin", {"If-None-Match": headers["etag"]}),
+        ("/nuvem/octree.bin", {"Range": "bytes=0-9", "If-Range": '"outro"'}))
+    assert status == 304 and body == b""
+    # If-Range com ETag antigo: responde o arquivo inteiro
+    assert stale == 200
+
+
+def test_unsatisfiable_range(site):
+    (status, headers, body), = serve(site, ("/nuvem/octree.bin", {"Range": "bytes=5000-"}))
+    assert status == 416
+    assert headers["content-range"] == "bytes */1024"
+    assert body == b""
+
+
+@pytest.mark.parametrize("target", ["/../segredo.txt", "/%2e%2e/segredo.txt", "/nuvem/..%2f..%2fsegredo.txt"])
+def test_traversal(site, target):
+    (status, _, body), = serve(site, (target, {}))
+    assert status == 403
+    assert b"fora da raiz" not in body
+
+
+def test_index_and_missing(site):
+    (status, headers, body), (missing, _, _) = serve(site, ("/", {}), ("/nuvem/nada.bin", {}))
+    assert status == 200
+    assert headers["content-type"].startswith("text/html")
+    assert body == b"<html></html>"
+    assert missing == 404
+
+
+def test_parse_range():
+    assert servidor.parse_range("bytes=0-", 10) == (0, 10)
+    assert servidor.parse_range("bytes=2-100", 10) == (2, 10)
+    assert servidor.parse_range("bytes=-100", 10) == (0, 10)
+    assert servidor.parse_range("bytes=0-1,4-5", 10) is None
+    with pytest.raises(ValueError):
+        servidor.parse_range("bytes=10-", 10)
+    with pytest.raises(ValueError):
+        servidor.parse_range("bytes=5-2", 10)
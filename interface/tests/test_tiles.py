@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+import lasheader
+import laspoints
+import tiles
+from conftest import las_bytes
+
+
+@pytest.mark.parametrize("requested, level", [
+    (1, 0), (2, 1), (7, 1), (8, 1), (63, 1), (64, 2), (256, 2), (512, 3), (10_000, 3),
+])
+def test_tile_level_never_exceeds_request(requested, level):
+    assert tiles.tile_level(requested) == level
+    assert 8 ** level <= max(requested, 8)
+
+
+@pytest.fixture
+def cloud(tmp_path, rng):
+    # Pontos espalhados em 3D: todas as células do cubo recebem pontos
+    points = rng.integers(0, 100_000, size=(20_000, 3))
+    path = tmp_path / "cidade.las"
+    path.write_bytes(las_bytes(points, offset=(500_000.0, 7_400_000.0, 10.0)))
+    return str(path), points
+
+
+@pytest.mark.parametrize("requested, expected", [(8, 8), (20, 8), (64, 64)])
+def test_split_count(tmp_path, cloud, requested, expected):
+    path, _ = cloud
+    header = lasheader.read_header(path)
+    paths = tiles.split_file(path, header, str(tmp_path / "blocos"), requested)
+    assert len(paths) == expected
+
+
+def test_split_keeps_points_and_aligns_tiles(tmp_path, cloud):
+    path, points = cloud
+    header = lasheader.read_header(path)
+    paths = tiles.split_file(path, header, str(tmp_path / "blocos"), 8)
+
+    parts = []
+    sizes = set()
+    for tile in paths:
+        tile_header = lasheader.read_header(tile)
+        chunk = np.concatenate(list(laspoints.iter_points(tile, tile_header)))
+        assert tile_header.point_count == len(chunk)
+        xyz = laspoints.coordinates(chunk, tile_header)
+        # Pontos dentro do bbox da célula, que cai na grade de quantização do arquivo
+        assert np.all(xyz >= np.array(tile_header.min) - 1e-9)
+        assert np.all(xyz <= np.array(tile_header.max) + 1e-9)
+        for axis in range(3):
+            units = (tile_header.min[axis] - header.offset[axis]) / header.scale[axis]
+            assert abs(units - round(units)) < 1e-6
+        sizes.add(round(tile_header.max[0] - tile_header.min[0], 6))
+        parts.append(np.stack([chunk["X"], chunk["Y"], chunk["Z"]], axis=1))
+
+    # Cubos de mesmo tamanho e nenhum ponto perdido ou repetido
+    assert len(sizes) == 1
+    merged = np.concatenate(parts)
+    assert sorted(map(tuple, merged)) == sorted(map(tuple, points))
+    assert os.path.basename(paths[0]) == "cidade_0_0_0.las"
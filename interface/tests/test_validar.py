@@ -0,0 +1,69 @@
+import json
+import os
+
+import pytest
+
+import conversao
+import validar
+from conftest import las_bytes, write_cloud
+
+
+@pytest.fixture
+def cloud(tmp_path, rng):
+    folder = str(tmp_path / "pointclouds" / "nuvem")
+    points = rng.integers(0, 1000, size=(300, 3))
+    write_cloud(folder, (100.0, 200.0, 0.0), 10.0, points)
+    return folder, points
+
+
+def kinds(problems):
+    return [kind for kind, _ in problems]
+
+
+def test_valid_output(cloud):
+    folder, points = cloud
+    problems, lines = validar.validate(folder, len(points))
+    assert problems == []
+    assert lines
+
+
+def test_point_counts(cloud):
+    folder, points = cloud
+    assert kinds(validar.validate(folder, len(points) + 1)[0]) == ["counts"]
+
+    path = os.path.join(folder, "metadata.json")
+    with open(path, encoding="utf-8") as f:
+        metadata = json.load(f)
+    metadata["points"] = len(points) - 1
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+    assert kinds(validar.validate(folder)[0]) == ["counts"]
+
+
+def test_truncated_and_missing_files(cloud):
+    folder, _ = cloud
+    path = os.path.join(folder, "octree.bin")
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 14)
+    assert kinds(validar.validate(folder)[0]) == ["octree"]
+
+    os.remove(os.path.join(folder, "hierarchy.bin"))
+    assert validar.validate(folder) == ([("missing", "hierarchy.bin não encontrado")], [])
+
+
+def test_command_exit_codes(tmp_path, cloud, capsys):
+    folder, points = cloud
+    source = tmp_path / "nuvem.las"
+    source.write_bytes(las_bytes(points))
+    config = str(tmp_path / "config.json")
+
+    assert conversao.main(["--config", config, "validar", folder, "--source", str(source)]) == 0
+
+    # Origem ausente ou inválida: mensagem de erro em vez de traceback
+    assert conversao.main(["--config", config, "validar", folder, "--source", str(tmp_path / "falta.las")]) == 2
+    source.write_bytes(b"nada")
+    assert conversao.main(["--config", config, "validar", folder, "--source", str(source)]) == 2
+    assert "Erro:" in capsys.readouterr().err
+
+    os.remove(os.path.join(folder, "octree.bin"))
+    assert conversao.main(["--config", config, "validar", folder]) == 1
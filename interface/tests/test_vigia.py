@@ -0,0 +1,164 @@
+import json
+import os
+import struct
+import tempfile
+import time
+
+import pytest
+
+import conversao
+import vigia
+from conftest import las_bytes
+from lasheader import EVLR_HEADER_STRUCT, EVLR_STRUCT, HEADER_STRUCT, LASZIP_STRUCT, VLR_HEADER_STRUCT
+
+
+def test_fixed_outputs_are_not_candidates():
+    assert vigia.is_candidate("Levantamento.LAS")
+    assert vigia.is_candidate("nuvem.laz")
+    assert not vigia.is_candidate("nuvem_fixed.las")
+    assert not vigia.is_candidate("NUVEM_FIXED.LAZ")
+    # Nome gerado pelo mkstemp no rascunho
+    assert not vigia.is_candidate("trunc_k3j2h1x0_fixed.laz")
+    assert not vigia.is_candidate("leiame.txt")
+
+
+def test_find_inputs_skips_fixed_outputs(tmp_path):
+    for name in ("a.las", "b.LAZ", "a_fixed.las", "b_q1w2e3r4_fixed.laz", "c.txt"):
+        (tmp_path / name).write_bytes(b"")
+    names = [os.path.basename(path) for path in conversao.find_inputs([str(tmp_path)])]
+    assert names == ["a.las", "b.LAZ"]
+
+
+def test_scratch_never_falls_back_to_watched_folder(tmp_path):
+    las_file = str(tmp_path / "entrada.las")
+    missing = str(tmp_path / "nao_existe")
+
+    # Fora do vigia a pasta do arquivo continua sendo o último recurso
+    assert conversao.scratch_directory(las_file, {"scratch_dir": missing}, 0) == str(tmp_path)
+    config = {"scratch_dir": missing, "scratch_beside_input": False}
+    assert conversao.scratch_directory(las_file, config, 0) == tempfile.gettempdir()
+
+
+@pytest.fixture
+def points(rng):
+    return rng.integers(0, 1000, size=(100, 3))
+
+
+def laz_bytes(points, table_pointer=None):
+    """LAZ mínimo: cabeçalho, VLR do laszip, pontos "comprimidos" e a tabela de chunks no fim"""
+    data = LASZIP_STRUCT.pack(2, 0, 3, 4, 3, 0, 50_000) + bytes(20)
+    vlr = VLR_HEADER_STRUCT.pack(0, b"laszip encoded", 22204, len(data), b"") + data
+    header = bytearray(las_bytes(points, vlr)[:HEADER_STRUCT.size + len(vlr)])
+    header[104] |= 0x80
+    compressed = bytes(range(256)) * 4
+    table = len(header) + 8 + len(compressed)
+    pointer = struct.pack("<q", table if table_pointer is None else table_pointer)
+    # Tabela: versão e número de chunks (as entradas comprimidas vêm depois)
+    return bytes(header) + pointer + compressed + struct.pack("<II", 0, 1) + bytes(16)
+
+
+def las14_bytes(points, evlr=b""):
+    """LAS 1.4 com um EVLR depois dos pontos"""
+    data = las_bytes(points)
+    header = bytearray(data[:HEADER_STRUCT.size])
+    header[25] = 4
+    struct.pack_into("<HI", header, 94, 375, 375)
+    records = data[HEADER_STRUCT.size:]
+    extended = EVLR_STRUCT.pack(375 + len(records) if evlr else 0, 1 if evlr else 0, len(points), *[0] * 15)
+    return bytes(header) + bytes(8) + extended + records + evlr
+
+
+def test_laz_needs_its_chunk_table(tmp_path, points):
+    path = tmp_path / "nuvem.laz"
+    data = laz_bytes(points)
+    path.write_bytes(data)
+    assert vigia.complete_las(str(path))
+
+    # Cópia parada antes da tabela de chunks
+    path.write_bytes(data[:-30])
+    assert not vigia.complete_las(str(path))
+
+    # Escritor que não voltou ao início: ponteiro -1 e o mesmo ponteiro nos 8 bytes finais
+    data = laz_bytes(points, table_pointer=-1)
+    table = len(data) - 24
+    path.write_bytes(data + struct.pack("<q", table))
+    assert vigia.complete_las(str(path))
+    path.write_bytes(data[:-10])
+    assert not vigia.complete_las(str(path))
+
+
+def test_evlrs_must_be_in_the_file(tmp_path, points):
+    wkt = b'PROJCS["SIRGAS 2000 / UTM zone 23S"]\0'
+    evlr = EVLR_HEADER_STRUCT.pack(0, b"LASF_Projection", 2112, len(wkt), b"") + wkt
+    path = tmp_path / "nuvem.las"
+    data = las14_bytes(points, evlr)
+    path.write_bytes(data)
+    assert vigia.complete_las(str(path))
+
+    # Pontos todos no disco, mas os EVLRs ainda não (ou só parte deles)
+    path.write_bytes(data[:-len(evlr)])
+    assert not vigia.complete_las(str(path))
+    path.write_bytes(data[:-10])
+    assert not vigia.complete_las(str(path))
+
+
+def test_truncated_files_are_submitted_as_incomplete(tmp_path, points):
+    data = las_bytes(points)
+    (tmp_path / "inteiro.las").write_bytes(data)
+    (tmp_path / "cortado.las").write_bytes(data[:-50])
+    submitted = {}
+    # Sem tempo de espera: o truncado é entregue na mesma rodada
+    watch = vigia.FolderWatch(str(tmp_path), lambda path, complete: submitted.__setitem__(
+        os.path.basename(path), complete), stable_seconds=0, polling=True, log=lambda message: None)
+    watch.poll(timeout=0)
+    assert submitted == {"inteiro.las": True, "cortado.las": False}
+
+
+def test_watch_repairs_in_scratch_only_truncated_files(tmp_path, points, monkeypatch, capsys):
+    folder = tmp_path / "chegada"
+    folder.mkdir()
+    data = las_bytes(points)
+    (folder / "inteiro.las").write_bytes(data)
+    (folder / "cortado.las").write_bytes(data[:-50])
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"lastools": "las2las", "potree": "PotreeConverter",
+                                  "cache": False, "history": False}), encoding="utf-8")
+
+    stream_repair = {}
+    failed = []
+
+    def fail(log):
+        failed.append(log)
+        raise OSError("falha simulada")
+
+    def conversion_job(las_file, output_dir, name, job_config, conversion_cache):
+        stream_repair[name] = job_config.get("stream_repair", False)
+        # Falha imediata: o job pode terminar antes de submit retornar o id
+        return [("Falhando", fail)]
+
+    class Watch:
+        def __init__(self, folder, submit, *args):
+            self.folder = folder
+            self.submit = submit
+
+        def run_forever(self):
+            self.submit(os.path.join(self.folder, "inteiro.las"), True)
+            self.submit(os.path.join(self.folder, "cortado.las"), False)
+            deadline = time.monotonic() + 5
+            while len(failed) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(conversao, "conversion_job", conversion_job)
+    monkeypatch.setattr(vigia, "FolderWatch", Watch)
+    assert conversao.main(["--config", str(config), "vigiar", str(folder), "-o", str(tmp_path / "saida"),
+                           "-j", "2"]) == 0
+    assert stream_repair == {"inteiro": False, "cortado": True}
+
+    output = ""
+    deadline = time.monotonic() + 5
+    while output.count("conversão com erro") < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+        output += capsys.readouterr().out
+    assert "inteiro: conversão com erro" in output
+    assert "cortado: conversão com erro" in output
@@ -0,0 +1,162 @@
+"""Divisão de um LAS sem compressão em blocos espaciais para conversão em paralelo.
+
+Os blocos são células de uma octree sobre o cubo do arquivo (o mesmo cubo
+que o PotreeConverter monta a partir do bounding box). O cabeçalho de cada
+bloco recebe o bounding box da célula, e não o dos pontos, para que a
+octree de cada bloco coincida com um ramo da octree do arquivo inteiro.
+
+Os limites das células caem na grade de quantização do arquivo (offset +
+k * escala): o PotreeConverter quantiza cada bloco a partir do mínimo do
+bbox, e um mínimo fora da grade deslocaria os pontos em até uma unidade.
+"""
+import math
+import os
+import struct
+
+import numpy as np
+
+import laspoints
+from lasrepair import BOUNDS_OFFSET, BOUNDS_STRUCT
+
+# 8^3 = 512 blocos; acima disso o custo por processo domina
+MAX_LEVEL = 3
+# Registros acumulados em memória antes de gravar nos blocos. Os arquivos são
+# abertos um de cada vez: até 8^3 blocos abertos juntos passariam do limite de
+# arquivos abertos do sistema (1024 no Linux, menos no Windows)
+BUFFER_BYTES = 256 * 1024 ** 2
+
+# Contagem legada (byte 107) e por retorno; no LAS 1.4, início e número de
+# EVLRs (byte 235) e as contagens de 64 bits
+LEGACY_COUNTS_OFFSET = 107
+LEGACY_COUNTS_STRUCT = struct.Struct("<I5I")
+EXTENDED_COUNTS_OFFSET = 235
+EXTENDED_COUNTS_STRUCT = struct.Struct("<QIQ15Q")
+
+
+def tile_level(tiles):
+    """Maior nível da octree com no máximo ``tiles`` células (8^nível).
+
+    As células são cubos, já que a junção monta os blocos como ramos de uma
+    octree; a divisão anda de 8 em 8 e qualquer pedido acima de 1 usa pelo
+    menos o nível 1.
+    """
+    level = 1 if tiles > 1 else 0
+    while 8 ** (level + 1) <= tiles and level < MAX_LEVEL:
+        level += 1
+    return level
+
+
+def cube(header, level):
+    """(mínimo, aresta) do cubo que envolve o bounding box, com as células alinhadas à quantização"""
+    n = 1 << level
+    size = max(hi - lo for lo, hi in zip(header.min, header.max))
+    # Aresta da célula múltipla da maior escala; com escalas iguais nos três
+    # eixos (o caso comum) todos os limites ficam na grade de cada eixo
+    unit = max(header.scale)
+    step = max(math.ceil(size / n / unit), 1) * unit
+    lo = [offset + math.floor((value - offset) / scale) * scale
+          for value, offset, scale in zip(header.min, header.offset, header.scale)]
+    return lo, step * n
+
+
+def cell_indices(points, header, lo, size, level):
+    """Índice da célula de cada ponto: (ix * n + iy) * n + iz, com n = 2^level"""
+    n = 1 << level
+    # uint16 cabe 8^4 células e permite o radix sort do NumPy
+    cells = np.zeros(len(points), dtype=np.uint16)
+    for axis, name in enumerate("XYZ"):
+        # Direto dos inteiros do arquivo: (X - base) * fator = (x - mínimo) / aresta * n
+        base = (lo[axis] - header.offset[axis]) / header.scale[axis]
+        factor = header.scale[axis] * n / size
+        index = (points[name] - base) * factor
+        np.clip(index, 0, n - 1, out=index)
+        cells *= n
+        cells += index.astype(np.uint16)
+    return cells
+
+
+def cell_bounds(cell, lo, size, level):
+    n = 1 << level
+    ix, iy, iz = cell // (n * n), cell // n % n, cell % n
+    step = size / n
+    cell_lo = [lo[0] + ix * step, lo[1] + iy * step, lo[2] + iz * step]
+    return cell_lo, [v + step for v in cell_lo], (ix, iy, iz)
+
+
+def split_file(path, header, output_dir, tiles):
+    """Divide ``path`` em blocos dentro de ``output_dir``.
+
+    ``tiles`` é o número de blocos desejado, arredondado para baixo para
+    8, 64 ou 512 (de 2 a 7 vale 8); células vazias não geram arquivo, então
+    o total pode ser menor. Retorna a lista de caminhos dos blocos.
+    """
+    if header.compressed:
+        raise ValueError(f"{path} é LAZ; a divisão em blocos só lê LAS sem compressão")
+
+    level = tile_level(tiles)
+    lo, size = cube(header, level)
+    counts = np.zeros((8 ** level, 16), dtype=np.int64)
+
+    with open(path, "rb") as f:
+        prefix = f.read(header.offset_to_points)
+
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    paths = {}
+    pending = {}
+    buffered = 0
+
+    def flush():
+        for cell in sorted(pending):
+            if cell not in paths:
+                paths[cell] = create_tile(output_dir, stem, prefix, cell, lo, size, level)
+            with open(paths[cell], "ab") as f:
+                f.writelines(pending[cell])
+        pending.clear()
+
+    # Uma passada: registros ordenados por célula e acumulados em fatias;
+    # as contagens vão para o cabeçalho no final
+    for chunk in laspoints.iter_points(path, header):
+        index = cell_indices(chunk, header, lo, size, level)
+        order = np.argsort(index, kind="stable")
+        index = index[order]
+        records = np.asarray(chunk)[order]
+        returns = laspoints.return_numbers(records, header)
+        present, starts = np.unique(index, return_index=True)
+        for cell, start, stop in zip(present.tolist(), starts.tolist(), starts[1:].tolist() + [len(index)]):
+            pending.setdefault(cell, []).append(records[start:stop].tobytes())
+            counts[cell] += np.bincount(returns[start:stop], minlength=16)
+        buffered += records.nbytes
+        if buffered >= BUFFER_BYTES:
+            flush()
+            buffered = 0
+    flush()
+
+    for cell, tile in paths.items():
+        with open(tile, "r+b") as f:
+            write_counts(f, header, counts[cell])
+    return sorted(paths.values())
+
+
+def create_tile(output_dir, stem, prefix, cell, lo, size, level):
+    """Cria o arquivo do bloco com o cabeçalho e os VLRs do original e o bbox da célula"""
+    cell_lo, cell_hi, (ix, iy, iz) = cell_bounds(cell, lo, size, level)
+    tile = os.path.join(output_dir, f"{stem}_{ix}_{iy}_{iz}.las")
+    with open(tile, "wb") as f:
+        f.write(prefix)
+        f.seek(BOUNDS_OFFSET)
+        f.write(BOUNDS_STRUCT.pack(cell_hi[0], cell_lo[0], cell_hi[1], cell_lo[1], cell_hi[2], cell_lo[2]))
+    return tile
+
+
+def write_counts(f, header, by_return):
+    total = int(by_return.sum())
+    legacy = by_return[1:6].tolist()
+    if header.version >= (1, 4) and header.header_size >= 375:
+        f.seek(EXTENDED_COUNTS_OFFSET)
+        # Os EVLRs do original não são copiados para os blocos
+        f.write(EXTENDED_COUNTS_STRUCT.pack(0, 0, total, *by_return[1:16].tolist()))
+        if header.legacy_point_count == 0 or header.point_format >= 6 or total > 0xFFFFFFFF:
+            total, legacy = 0, [0] * 5
+    f.seek(LEGACY_COUNTS_OFFSET)
+    f.write(LEGACY_COUNTS_STRUCT.pack(total, *legacy))
@@ -0,0 +1,60 @@
+"""Validação da saída do PotreeConverter e relatório de saúde da octree.
+
+Confere metadata.json, hierarchy.bin e octree.bin entre si (tamanhos,
+faixas dos nós, soma dos pontos) e contra a contagem do arquivo de origem,
+numa passada vetorizada sobre o ``HierarchyIndex``.
+"""
+import os
+
+import numpy as np
+
+import hierarquia
+
+# Folhas acima disso pesam no carregamento de um único nó no navegador
+MAX_LEAF_POINTS = 100_000
+
+
+def validate(folder, expected_points=None):
+    """Retorna (problemas, relatório): problemas como (tipo, mensagem) e o relatório em linhas"""
+    for name in ("metadata.json", "hierarchy.bin", "octree.bin"):
+        if not os.path.isfile(os.path.join(folder, name)):
+            return [("missing", f"{name} não encontrado")], []
+    try:
+        index = hierarquia.HierarchyIndex(folder)
+    except (ValueError, KeyError) as e:
+        return [("hierarchy", f"hierarquia ilegível: {e}")], []
+
+    problems = []
+    metadata = index.metadata
+    octree_size = os.path.getsize(os.path.join(folder, "octree.bin"))
+    total = int(index.num_points.sum())
+
+    # Nós que apontam além do fim do octree.bin
+    ends = index.byte_offsets + index.byte_sizes
+    truncated = np.count_nonzero(ends > octree_size)
+    if truncated:
+        problems.append(("octree", f"octree.bin truncado: {truncated} nós além de {octree_size} bytes"))
+    if metadata.get("encoding", "DEFAULT") == "DEFAULT":
+        wrong = np.count_nonzero(index.byte_sizes != index.num_points * hierarquia.point_size(metadata))
+        if wrong:
+            problems.append(("octree", f"{wrong} nós com tamanho diferente de pontos × bytes por ponto"))
+
+    if total != metadata.get("points", total):
+        problems.append(("counts", f"hierarquia soma {total} pontos, metadata.json indica {metadata['points']}"))
+    if expected_points is not None and total != expected_points:
+        problems.append(("counts", f"hierarquia soma {total} pontos, arquivo de origem tem {expected_points}"))
+
+    lines = hierarquia.describe(index)
+    used = int(index.byte_sizes.sum())
+    if used < octree_size:
+        lines.append(f"octree.bin: {octree_size - used:,} bytes sem nó".replace(",", "."))
+
+    leaves = index.child_masks == 0
+    leaf_points = index.num_points[leaves]
+    if len(leaf_points):
+        lines.append(f"Folhas: {len(leaf_points)}, nível mais profundo {int(index.levels.max())}, "
+                     f"maior folha com {int(leaf_points.max())} pontos")
+        oversized = np.count_nonzero(leaf_points > MAX_LEAF_POINTS)
+        if oversized:
+            lines.append(f"Atenção: {oversized} folhas com mais de {MAX_LEAF_POINTS} pontos")
+    return problems, lines
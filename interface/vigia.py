@@ -0,0 +1,255 @@
+"""Vigia de pasta: converte os LAS/LAZ que chegam numa pasta, sem interface.
+
+As equipes de campo copiam os arquivos para uma pasta compartilhada; o
+vigia percebe cada arquivo novo (inotify no Linux, varredura periódica nos
+demais casos), espera a cópia terminar e entrega o arquivo para conversão.
+
+Um arquivo só é considerado pronto quando tamanho e data ficam parados por
+``stable_seconds`` e o cabeçalho já descreve um arquivo inteiro: no LAS,
+todos os pontos cabem no arquivo; no LAZ, a tabela de chunks do fim já
+chegou; e os EVLRs do LAS 1.4 terminam dentro do arquivo. Parado assim
+por ``TRUNCATED_WAIT`` vezes esse tempo, é um arquivo truncado, convertido
+com correção. Em pastas de rede (SMB/CIFS) o inotify não recebe os eventos
+de outras máquinas; nelas use a varredura (``polling``).
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+import lasheader
+import lasrepair
+
+STABLE_SECONDS = 10
+# Arquivo incompleto pelo cabeçalho é esperado por este múltiplo de
+# stable_seconds; parado assim tanto tempo, é um arquivo truncado, não uma cópia
+TRUNCATED_WAIT = 6
+POLL_INTERVAL = 5
+# Varredura completa mesmo com inotify, para eventos perdidos
+RESCAN_INTERVAL = 60
+EXTENSIONS = (".las", ".laz")
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_STRUCT = struct.Struct("iIII")
+
+
+def is_candidate(name):
+    lower = name.lower()
+    return lower.endswith(EXTENSIONS) and not lasrepair.is_fixed_output(lower)
+
+
+def scan(folder):
+    """{caminho: (tamanho, mtime)} dos LAS/LAZ da pasta"""
+    files = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and is_candidate(entry.name):
+                stat = entry.stat()
+                files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+class PollingWatcher:
+    """Varre a pasta a cada ``interval`` segundos; funciona em qualquer sistema e em pastas de rede"""
+
+    def __init__(self, folder, interval=POLL_INTERVAL):
+        self.folder = folder
+        self.interval = interval
+        self.last_scan = 0
+
+    def changes(self, timeout):
+        """Caminhos que podem ter mudado; None pede uma varredura completa"""
+        wait = self.last_scan + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if wait > timeout:
+                return set()
+        self.last_scan = time.monotonic()
+        return None
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """inotify via ctypes: acorda só quando algo muda na pasta"""
+
+    def __init__(self, folder):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.folder = folder
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch falhou em {folder}")
+
+    def changes(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        paths = set()
+        offset = 0
+        while offset + EVENT_STRUCT.size <= len(data):
+            _, mask, _, length = EVENT_STRUCT.unpack_from(data, offset)
+            name = data[offset + EVENT_STRUCT.size:offset + EVENT_STRUCT.size + length].split(b"\0", 1)[0]
+            offset += EVENT_STRUCT.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Eventos perdidos: varredura completa
+                return None
+            if name and is_candidate(os.fsdecode(name)):
+                paths.add(os.path.join(self.folder, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+def open_watcher(folder, polling=False, interval=POLL_INTERVAL):
+    """inotify quando disponível (e não pedida a varredura), senão varredura periódica"""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(folder, interval)
+
+
+def complete_las(path):
+    """False se o cabeçalho ainda não estiver todo no disco ou descrever mais dados do que o arquivo tem"""
+    try:
+        header = lasheader.read_header(path)
+    except (OSError, ValueError):
+        return False
+    # EVLRs declarados que ainda não chegaram (início além do fim ou registros cortados)
+    if header.evlr_count and len(header.evlrs) < header.evlr_count:
+        return False
+    if header.compressed:
+        # LAZ: o tamanho dos pontos comprimidos é desconhecido, mas a tabela de
+        # chunks vem depois deles; sem ela dentro do arquivo, a cópia não acabou
+        return header.point_count == 0 or header.laz_chunk_count > 0
+    return header.offset_to_points + header.point_count * header.point_record_length <= header.file_size
+
+
+class FolderWatch:
+    """Acompanha ``folder`` e chama ``submit(caminho, completo)`` para cada arquivo pronto.
+
+    ``completo`` é False para os entregues como truncados, depois de
+    ``TRUNCATED_WAIT`` sem o cabeçalho fechar com o arquivo.
+
+    Um arquivo volta a ser entregue se mudar depois de entregue (nova
+    cópia com o mesmo nome). ``is_done(caminho, mtime)`` diz se o arquivo
+    já foi convertido antes do vigia começar, para não repetir o trabalho
+    a cada reinício.
+    """
+
+    def __init__(self, folder, submit, stable_seconds=STABLE_SECONDS, polling=False, interval=POLL_INTERVAL,
+                 is_done=None, log=print):
+        self.folder = folder
+        self.submit = submit
+        self.stable_seconds = stable_seconds
+        self.log = log
+        self.watcher = open_watcher(folder, polling, interval)
+        self.last_rescan = time.monotonic()
+        # caminho -> (tamanho, mtime, instante da última mudança)
+        self.pending = {}
+        # caminho -> (tamanho, mtime) entregue
+        self.submitted = {}
+        self.stopped = False
+
+        for path, state in scan(folder).items():
+            if is_done is not None and is_done(path, state[1]):
+                self.submitted[path] = state
+            else:
+                self.pending[path] = state + (time.monotonic(),)
+        kind = "inotify" if isinstance(self.watcher, InotifyWatcher) else "varredura"
+        self.log(f"Vigiando {folder} ({kind}); {len(self.pending)} arquivos aguardando conversão")
+
+    def observe(self, path, size, mtime):
+        if self.submitted.get(path) == (size, mtime):
+            return
+        previous = self.pending.get(path)
+        if previous is None or previous[:2] != (size, mtime):
+            self.pending[path] = (size, mtime, time.monotonic())
+
+    def refresh(self, paths):
+        """Atualiza o estado dos caminhos que mudaram (todos, se ``paths`` for None)"""
+        if paths is None:
+            current = scan(self.folder)
+            for path in list(self.pending):
+                if path not in current:
+                    del self.pending[path]
+            for path, (size, mtime) in current.items():
+                self.observe(path, size, mtime)
+            return
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self.pending.pop(path, None)
+                continue
+            self.observe(path, stat.st_size, stat.st_mtime_ns)
+
+    def ready(self):
+        """(caminho, completo) dos arquivos parados há ``stable_seconds`` e completos ou dados como truncados"""
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime, since) in list(self.pending.items()):
+            if now - since < self.stable_seconds:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self.pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime):
+                # O inotify pode não ter visto a última escrita (pasta de rede)
+                self.pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+                continue
+            complete = complete_las(path)
+            if not complete:
+                if now - since < self.stable_seconds * TRUNCATED_WAIT:
+                    continue
+                self.log(f"{os.path.basename(path)}: arquivo menor que o cabeçalho indica, "
+                         f"convertendo com correção")
+            ready.append((path, complete))
+        return ready
+
+    def poll(self, timeout=1.0):
+        """Uma rodada: espera mudanças por até ``timeout`` segundos e entrega os arquivos prontos"""
+        paths = self.watcher.changes(timeout)
+        if time.monotonic() - self.last_rescan >= RESCAN_INTERVAL:
+            paths = None
+        if paths is None:
+            self.last_rescan = time.monotonic()
+        self.refresh(paths)
+        for path, complete in self.ready():
+            size, mtime, _ = self.pending.pop(path)
+            self.submitted[path] = (size, mtime)
+            self.submit(path, complete)
+
+    def run_forever(self):
+        try:
+            while not self.stopped:
+                self.poll()
+        finally:
+            self.watcher.close()
+
+    def stop(self):
+        self.stopped = True